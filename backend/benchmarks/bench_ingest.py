@@ -0,0 +1,82 @@
+"""Ingest throughput: legacy per-document loop vs bulk_insert_transactions.
+
+    python -m fraud_ai_system.backend.benchmarks.bench_ingest --n 10000
+    python -m fraud_ai_system.backend.benchmarks.bench_ingest --uri mongodb://localhost:27017
+
+Without --uri the run uses mongomock, which shows Python-side overhead
+only; point it at a real mongod to see the round-trip savings.
+"""
+import argparse
+import json
+import time
+
+from fraud_ai_system.backend.src import db
+from fraud_ai_system.backend.src.db_handler import bulk_insert_transactions
+
+
+def legacy_insert(col, txns):
+    """The pre-bulk implementation: find_one + insert_one per transaction."""
+    inserted = 0
+    for txn in txns:
+        txn_id = txn.get("transaction_id") or txn.get("transactionId")
+        if not txn_id or col.find_one({"transactionId": txn_id}):
+            continue
+        col.insert_one(txn)
+        inserted += 1
+    return inserted
+
+
+def make_docs(n, offset=0):
+    return [
+        {"transactionId": f"BENCH{offset + i:09d}", "amount": float(i % 5000), "status": "SUCCESS"}
+        for i in range(n)
+    ]
+
+
+def run(n, chunk_size, dup_ratio=0.1):
+    database = db.get_db()
+    results = {}
+
+    col = database["bench_legacy"]
+    col.drop()
+    docs = make_docs(n)
+    legacy_insert(col, docs[: int(n * dup_ratio)])
+    docs = make_docs(n)
+    t0 = time.perf_counter()
+    legacy_insert(col, docs)
+    elapsed = time.perf_counter() - t0
+    results["legacy"] = {"seconds": elapsed, "txn_per_sec": n / elapsed if elapsed else None}
+    col.drop()
+
+    database["bench_bulk"].drop()
+    bulk_insert_transactions(make_docs(int(n * dup_ratio)), collection="bench_bulk", chunk_size=chunk_size)
+    t0 = time.perf_counter()
+    counts = bulk_insert_transactions(make_docs(n), collection="bench_bulk", chunk_size=chunk_size)
+    elapsed = time.perf_counter() - t0
+    results["bulk"] = {"seconds": elapsed, "txn_per_sec": n / elapsed if elapsed else None, **counts}
+    database["bench_bulk"].drop()
+
+    results["speedup"] = results["legacy"]["seconds"] / results["bulk"]["seconds"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=10_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--uri", help="MongoDB URI; defaults to an in-memory mongomock client")
+    args = parser.parse_args()
+
+    if args.uri:
+        from pymongo import MongoClient
+        db.init_client(MongoClient(args.uri, **db.client_options()))
+    else:
+        import mongomock
+        db.init_client(mongomock.MongoClient())
+
+    print(json.dumps(run(args.n, args.chunk_size), indent=2))
+    db.close_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Scoring read path: full vs projected documents, dict vs lazy (RawBSONDocument) decoding.
+
+    python -m fraud_ai_system.backend.benchmarks.bench_read --n 1000
+
+Each variant decodes the BSON a find() would return for a batch and scores
+it with process_transactions, so the numbers cover what the scanner does
+per batch minus the round trip. Memory is the size of the decoded batch
+before and after scoring (lazy documents grow as fields are read).
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import bson
+import mongomock
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from fraud_ai_system.backend.benchmarks.synthetic import generate_transactions
+from fraud_ai_system.backend.src.apply_rules import process_transactions
+from fraud_ai_system.backend.src.features import SCORING_PROJECTION
+
+VARIANTS = (
+    ("full_dict", False, False),
+    ("full_lazy", False, True),
+    ("projected_dict", True, False),
+    ("projected_lazy", True, True),
+)
+
+
+def _wire(txns, projected):
+    """Concatenated BSON of the batch as the server would send it."""
+    col = mongomock.MongoClient().bench.read
+    col.insert_many([dict(txn) for txn in txns])
+    docs = col.find({}, SCORING_PROJECTION if projected else None).sort("_id", 1)
+    return b"".join(bson.encode(doc) for doc in docs)
+
+
+def _best(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(n, repeats=10, seed=42, model=None):
+    txns = generate_transactions(n, seed=seed)
+    wire = {projected: _wire(txns, projected) for projected in (False, True)}
+    results = {}
+    for name, projected, lazy in VARIANTS:
+        data = wire[projected]
+        options = CodecOptions(document_class=RawBSONDocument) if lazy else CodecOptions()
+        decode = lambda: bson.decode_all(data, options)
+
+        gc.collect()
+        tracemalloc.start()
+        docs = decode()
+        decoded = tracemalloc.get_traced_memory()[0]
+        process_transactions(docs, model)
+        scored = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del docs
+
+        decode_seconds = _best(decode, repeats)
+        total_seconds = _best(lambda: process_transactions(decode(), model), repeats)
+        results[name] = {
+            "wire_bytes": len(data),
+            "decode_seconds": decode_seconds,
+            "decode_score_seconds": total_seconds,
+            "txn_per_sec": n / total_seconds if total_seconds else None,
+            "decoded_kb": decoded / 1024,
+            "after_score_kb": scored / 1024,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args.n, args.repeats, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
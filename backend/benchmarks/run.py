@@ -0,0 +1,193 @@
+"""Benchmark suite for the scoring, ingest and scan hot paths.
+
+    python -m fraud_ai_system.backend.benchmarks.run --out bench_results.json
+    python -m fraud_ai_system.backend.benchmarks.run --sizes 1,1000 --uri mongodb://localhost:27017
+
+Scoring runs at each --sizes batch size; ingest, scan-loop and read-path
+(projection / lazy decoding) runs at each --db-sizes against mongomock
+(or --uri). Results are written as JSON with
+one row per (benchmark, size) so runs can be diffed.
+"""
+import argparse
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from fraud_ai_system.backend.benchmarks import bench_ingest, bench_read
+from fraud_ai_system.backend.benchmarks.synthetic import generate_transactions
+from fraud_ai_system.backend.src import db
+from fraud_ai_system.backend.src.apply_rules import apply_rules, apply_rules_batch, process_transactions
+from fraud_ai_system.backend.src.ml_model import build_feature_matrix, predict, predict_batch
+from fraud_ai_system.backend.src.model_registry import get_model
+
+
+def _repeats(size):
+    return max(3, min(1000, 20_000 // max(size, 1)))
+
+
+def _row(name, size, durations, per_item=None):
+    """Summarise call durations (seconds); per_item latencies (seconds) override the percentiles."""
+    samples = per_item if per_item is not None else durations
+    median = statistics.median(durations)
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1e6, [50, 95, 99]).tolist()
+    return {
+        "name": name,
+        "size": size,
+        "repeats": len(durations),
+        "median_seconds": median,
+        "txn_per_sec": size / median if median else None,
+        "p50_us": p50,
+        "p95_us": p95,
+        "p99_us": p99,
+    }
+
+
+def _time_batch(fn, txns, repeats):
+    durations = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(txns)
+        durations.append(time.perf_counter() - t0)
+    return durations
+
+
+def _time_scalar(fn, txns, repeats):
+    durations, per_item = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for txn in txns:
+            t1 = time.perf_counter()
+            fn(txn)
+            per_item.append(time.perf_counter() - t1)
+        durations.append(time.perf_counter() - t0)
+    return durations, per_item
+
+
+def _benchmark_model(txns):
+    """Registry model when one is deployed, else a small fitted stand-in on the same features."""
+    model = get_model()
+    if model is not None:
+        return model, "registry"
+    from sklearn.linear_model import LogisticRegression
+    X = build_feature_matrix(txns)
+    y = ((X[:, 0] > 2e5) | ((X[:, 1] >= 1) & (X[:, 1] <= 5))).astype(int)
+    if y.min() == y.max():
+        y[0] = 1 - y[0]
+    return LogisticRegression(max_iter=200).fit(X, y), "stand-in"
+
+
+def bench_scoring(sizes, seed):
+    rows = []
+    pool = generate_transactions(max(sizes), seed=seed)
+    model, model_source = _benchmark_model(pool[:5000])
+    for size in sizes:
+        txns = pool[:size]
+        reps = _repeats(size)
+        scalar_reps = max(1, min(reps, 5_000 // max(size, 1)))
+
+        rows.append(_row("rules_scalar", size, *_time_scalar(apply_rules, txns, scalar_reps)))
+        rows.append(_row("rules_batch", size, _time_batch(apply_rules_batch, txns, reps)))
+        rows.append(_row("ml_scalar", size, *_time_scalar(lambda t: predict(model, t), txns, scalar_reps)))
+        rows.append(_row("ml_batch", size, _time_batch(lambda b: predict_batch(model, b), txns, reps)))
+        rows.append(_row("combined_batch", size,
+                         _time_batch(lambda b: process_transactions(b, model), txns, reps)))
+    return rows, model_source
+
+
+def bench_db(sizes, seed, chunk_size):
+    from fraud_ai_system.backend.src.incremental_scanner import IncrementalScanner
+
+    rows = []
+    database = db.get_db()
+    for size in sizes:
+        ingest = bench_ingest.run(size, chunk_size)
+        for path in ("legacy", "bulk"):
+            secs = ingest[path]["seconds"]
+            rows.append({"name": f"ingest_{path}", "size": size, "repeats": 1, "median_seconds": secs,
+                         "txn_per_sec": size / secs if secs else None})
+
+        database["predict"].drop()
+        database["fraud_data"].drop()
+        database["scan_checkpoints"].drop()
+        database["predict"].insert_many(copy.deepcopy(generate_transactions(size, seed=seed)))
+        scanner = IncrementalScanner(name=f"bench_{size}")
+        t0 = time.perf_counter()
+        scanned = scanner.drain()
+        secs = time.perf_counter() - t0
+        rows.append({"name": "scan_drain", "size": scanned, "repeats": 1, "median_seconds": secs,
+                     "txn_per_sec": scanned / secs if secs else None})
+    return rows
+
+
+def bench_reads(sizes, seed):
+    rows = []
+    for size in sizes:
+        for variant, res in bench_read.run(size, repeats=_repeats(size), seed=seed).items():
+            secs = res["decode_score_seconds"]
+            rows.append({"name": f"read_{variant}", "size": size, "repeats": _repeats(size), "median_seconds": secs,
+                         "txn_per_sec": res["txn_per_sec"], "decode_seconds": res["decode_seconds"],
+                         "decoded_kb": res["decoded_kb"], "after_score_kb": res["after_score_kb"]})
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,1000,100000", help="scoring batch sizes")
+    parser.add_argument("--db-sizes", default="1,1000", help="ingest / scan sizes ('' to skip)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uri", help="MongoDB URI; defaults to an in-memory mongomock client")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    db_sizes = [int(s) for s in args.db_sizes.split(",") if s]
+
+    if args.uri:
+        from pymongo import MongoClient
+        db.init_client(MongoClient(args.uri, **db.client_options()))
+    else:
+        import mongomock
+        db.init_client(mongomock.MongoClient())
+
+    rows, model_source = bench_scoring(sizes, args.seed)
+    if db_sizes:
+        rows += bench_db(db_sizes, args.seed, args.chunk_size)
+        rows += bench_reads(db_sizes, args.seed)
+    db.close_client()
+
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "model": model_source,
+            "mongo": "uri" if args.uri else "mongomock",
+        },
+        "results": rows,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    for row in rows:
+        print(f"{row['name']:<16} n={row['size']:<7} {row['txn_per_sec'] or 0:>12,.0f} txn/s")
+    print(f"📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
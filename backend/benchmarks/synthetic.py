@@ -0,0 +1,102 @@
+"""Seeded synthetic transactions in the db_model.Transaction shape.
+
+Documents use the stored (alias) field names plus the flat fields the rules
+and model read (timestamp, CreatedAT, ipAddress, imeiNumber, lat/long), so
+every scoring path sees realistic inputs.
+"""
+import random
+import string
+from datetime import datetime, timedelta
+
+PUBLIC_IP_BLOCKS = ("49.36", "103.21", "117.97", "152.58", "182.64", "223.187")
+PRIVATE_IP_BLOCKS = ("10.0", "192.168", "172.16")
+IFSC_BANKS = ("SBIN", "HDFC", "ICIC", "UTIB", "PUNB", "KKBK")
+
+# India bounding box
+LAT_RANGE = (8.0, 35.0)
+LON_RANGE = (68.0, 97.0)
+
+
+def _hour(rng):
+    # Mostly daytime traffic with a thin night tail
+    if rng.random() < 0.08:
+        return rng.randint(1, 5)
+    return min(23, max(0, int(rng.gauss(14, 4))))
+
+
+def _utr(rng):
+    roll = rng.random()
+    if roll < 0.03:
+        return ""
+    if roll < 0.06:
+        return "".join(rng.choices(string.ascii_uppercase, k=6))
+    return "".join(rng.choices(string.ascii_uppercase + string.digits, k=12))
+
+
+def _ip(rng):
+    if rng.random() < 0.05:
+        block = rng.choice(PRIVATE_IP_BLOCKS)
+    else:
+        block = rng.choice(PUBLIC_IP_BLOCKS)
+    return f"{block}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def make_transaction(rng, i, start=datetime(2025, 1, 1), customers=5000):
+    amount = round(min(rng.lognormvariate(8.5, 1.4), 900_000), 2)
+    debit = amount
+    credit = round(amount * 0.002, 2)
+    tds = round(credit * 0.05, 2)
+    old_bal = round(rng.uniform(50_000, 5_000_000), 2)
+    new_bal = round(old_bal - debit + credit - tds, 2)
+    if rng.random() < 0.02:
+        new_bal += rng.uniform(5, 5000)  # wallet mismatch
+
+    day = start + timedelta(days=rng.randint(0, 180))
+    ts = day.replace(hour=_hour(rng), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+    ts_str = ts.strftime("%Y-%m-%d %H:%M:%S")
+
+    customer = rng.randint(0, customers - 1)
+    mobile = f"9{customer:09d}"
+    imei = f"35{customer:06d}{rng.randint(0, 2):07d}"
+    ip = _ip(rng)
+    if rng.random() < 0.01:
+        lat, lon = 0.0, 0.0
+    else:
+        lat, lon = round(rng.uniform(*LAT_RANGE), 6), round(rng.uniform(*LON_RANGE), 6)
+
+    return {
+        "transactionId": f"TXN{i:012d}",
+        "clientRefId": f"CR{customer:08d}",
+        "transactionType": rng.choice(("DMT", "AEPS", "BBPS", "UPI")),
+        "status": rng.choices(("SUCCESS", "FAILED", "PENDING"), weights=(90, 7, 3))[0],
+        "vendorUtrNumber": _utr(rng),
+        "partnerDetails": {
+            "oldMainWalletBalance": old_bal, "newMainWalletBalance": new_bal,
+            "amount": amount, "credit": credit, "debit": debit, "TDS": tds,
+        },
+        "adminDetails": {"oldMainWalletBalance": old_bal, "newMainWalletBalance": new_bal},
+        "checkStatus": [{
+            "vendorApiResponse": "SUCCESS", "date": ts.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "ipAddress": ip, "deviceType": "android", "imeiNumber": imei,
+        }],
+        "metaData": {"ipAddress": ip, "deviceType": "android", "imeiNumber": imei, "lat": lat, "long": lon},
+        "moneyTransferBeneficiaryDetails": {
+            "accountNumber": f"{rng.randint(10**10, 10**11 - 1)}",
+            "ifsc": f"{rng.choice(IFSC_BANKS)}0{rng.randint(0, 99999):06d}",
+        },
+        "operator": {"key1": mobile, "key2": "", "key3": ""},
+        "amount": amount, "credit": credit, "debit": debit, "TDS": tds, "GST": round(credit * 0.18, 2),
+        "createdAt": ts.isoformat(),
+        "CreatedAT": ts.isoformat(),
+        "timestamp": ts_str,
+        "mobileNumber": mobile,
+        "ipAddress": ip,
+        "imeiNumber": imei,
+        "lat": lat,
+        "long": lon,
+    }
+
+
+def generate_transactions(n, seed=42, offset=0):
+    rng = random.Random(seed)
+    return [make_transaction(rng, offset + i) for i in range(n)]
@@ -0,0 +1,100 @@
+"""Replay historical transactions through the rules and sweep thresholds / weights.
+
+    python -m fraud_ai_system.backend.scripts.backtest --save replay.npz
+    python -m fraud_ai_system.backend.scripts.backtest --file export.ndjson.gz --rules candidate.json
+    python -m fraud_ai_system.backend.scripts.backtest --table replay.npz --grid grid.json --top 20
+
+The replay (from `predict` labelled by `fraud_data`, or from --file) is
+the slow part; --save keeps its trigger table so later sweeps start from
+--table. A grid file looks like
+
+    {"threshold": [0.5, 0.6, 0.7], "weights": {"odd_hour": [0.1, 0.2, 0.3]},
+     "levels": [[0.8, 0.5, 0.0], [0.7, 0.4, 0.0]]}
+
+and --random N adds N random weight vectors. The live configuration is
+always reported first as the baseline.
+"""
+import argparse
+import json
+import logging
+
+from pymongo.errors import PyMongoError
+
+from fraud_ai_system.backend.src.backtest import (
+    BACKTEST_BATCH_SIZE, BACKTEST_LABEL_FIELD, BACKTEST_WORKERS, TriggerTable, base_config, config_grid,
+    file_batches, mongo_batches, random_configs, replay, sweep,
+)
+
+
+def _summary(report):
+    precision = "-" if report["precision"] is None else f"{report['precision']:.3f}"
+    recall = "-" if report["recall"] is None else f"{report['recall']:.3f}"
+    return (f"threshold={report['threshold']:.3f} alerts={report['alerts']:,} ({report['alert_rate'] or 0:.2%}) "
+            f"precision={precision} recall={recall} f1={report['f1']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--table", help="sweep a saved trigger table instead of replaying")
+    source.add_argument("--file", help="replay a JSON / NDJSON export (labels in --label-field)")
+    source.add_argument("--source", default="predict", help="collection to replay")
+    parser.add_argument("--labels-from", default="fraud_data", help="collection holding the fraud labels")
+    parser.add_argument("--label-field", default=BACKTEST_LABEL_FIELD)
+    parser.add_argument("--rules", default=None, help="rules file to replay (default RULES_PATH)")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BACKTEST_BATCH_SIZE)
+    parser.add_argument("--save", help="write the trigger table here")
+    parser.add_argument("--grid", help="grid spec, as a JSON file or inline JSON")
+    parser.add_argument("--random", type=int, default=0, help="add this many random weight vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sort", default="f1", choices=("f1", "precision", "recall", "alerts"))
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", help="write every report here as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.table:
+        table = TriggerTable.load(args.table)
+    else:
+        from fraud_ai_system.backend.src.blocklist import refresh_blocklist
+        try:
+            refresh_blocklist(full=True)
+        except PyMongoError as e:
+            print(f"⚠️ Replaying without the blocklist: {e}")
+        if args.file:
+            batches = file_batches(args.file, args.label_field, args.batch_size)
+        else:
+            batches = mongo_batches(args.source, args.labels_from, args.label_field, batch_size=args.batch_size)
+        table = replay(batches, args.rules, workers=args.workers)
+        if args.save:
+            table.save(args.save)
+            print(f"💾 Trigger table saved to {args.save}")
+    print(f"📦 {table.transactions:,} transactions, {int(table.positives.sum()):,} labelled fraud, "
+          f"{len(table)} trigger patterns (rules {table.version})")
+
+    configs = [base_config(table)]
+    if args.grid:
+        spec = json.loads(args.grid) if args.grid.lstrip().startswith("{") else json.load(open(args.grid))
+        configs += config_grid(table, spec.get("threshold"), spec.get("weights"), spec.get("levels"))
+    if args.random:
+        configs += random_configs(table, args.random, seed=args.seed)
+    reports = sweep(table, configs, workers=args.workers)
+
+    print(f"📊 Baseline: {_summary(reports[0])}")
+    for name, rule in reports[0]["rules"].items():
+        print(f"   {name:<24} alerts={rule['alert_hits']:,} true={rule['true_hits']:,} "
+              f"decisive={rule['decisive']:,} share={rule['point_share']:.1%}")
+    if len(reports) > 1:
+        ranked = sorted(reports[1:], key=lambda r: r[args.sort] or 0, reverse=args.sort != "alerts")
+        print(f"🏆 Top {min(args.top, len(ranked))} of {len(ranked)} by {args.sort}:")
+        for report in ranked[:args.top]:
+            print(f"   {_summary(report)} weights={report['weights']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"✅ {len(reports)} reports written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.db_handler import transaction_query
+from fraud_ai_system.backend.src.incremental_scanner import shard_query
+from fraud_ai_system.backend.src.indexes import plan_summary, reconcile_indexes
+from fraud_ai_system.backend.src.utils import TXN_ID_FIELD
+
+# Every query shape the API routes, db_handler helpers and background jobs send: (label, collection, filter, sort)
+QUERY_SHAPES = [
+    ("fetch_transactions()", "predict", transaction_query(), [("timestamp", -1)]),
+    ("fetch_transactions(name=)", "predict", transaction_query(name="Ravi K"), [("timestamp", -1)]),
+    ("fetch_transactions(risk_level=)", "predict", transaction_query(risk_level="medium"), [("timestamp", -1)]),
+    ("fetch_transactions(is_fraud=, risk_level=)", "predict",
+     transaction_query(is_fraud=True, risk_level="high"), [("timestamp", -1)]),
+    ("GET /predict", "transaction.predict", transaction_query(), None),
+    ("GET /predict?name=", "transaction.predict", transaction_query(name="Ravi K"), None),
+    ("/predict upsert", "transaction.fraud_data", {TXN_ID_FIELD: "TXN123"}, None),
+    ("flagged upsert", "fraud_data", {TXN_ID_FIELD: "TXN123"}, None),
+    ("ingest dedup", "predict", {TXN_ID_FIELD: "TXN123"}, None),
+    ("load_data dedup", "transactions", {TXN_ID_FIELD: "TXN123"}, None),
+    ("GET /suspicious", "fraud_data", {"_id": {"$lt": ObjectId()}}, [("_id", -1)]),
+    ("scan watermark", "predict", {"$and": [shard_query(1, 4), {"_id": {"$gt": ObjectId()}}]}, [("_id", 1)]),
+    ("scan members", "scan_leases",
+     {"group": "auto_scan", "kind": "member", "expires_at": {"$gt": datetime.utcnow()}}, None),
+    ("name backfill", "predict", {"nameNorm": {"$exists": False}, "name": {"$type": "string"},
+                                  "_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+    ("scan bucket backfill", "predict", {"_scanBucket": {"$exists": False}, "_id": {"$gt": ObjectId()}},
+     [("_id", 1)]),
+]
+
+
+def check(db, shapes=QUERY_SHAPES):
+    """explain() each shape; returns the labels that fall back to a collection scan."""
+    failures = []
+    for label, collection, query, sort in shapes:
+        cursor = db[collection].find(query).limit(100)
+        if sort:
+            cursor = cursor.sort(sort)
+        summary = plan_summary(cursor.explain())
+        # An unfiltered, unsorted read is a bounded scan by design
+        scan_ok = not query and not sort
+        if summary["empty"]:
+            status = "⚪ no collection"
+        elif summary["collscan"] and not scan_ok:
+            status = "❌ COLLSCAN"
+            failures.append(label)
+        elif summary["blocking_sort"]:
+            status = "⚠️ in-memory sort"
+        else:
+            status = "✅"
+        print(f"{status:<18} {label:<44} {collection:<24} {', '.join(summary['indexes']) or '-'}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that every API query shape is served by an index.")
+    parser.add_argument("--reconcile", action="store_true", help="create missing declared indexes first")
+    args = parser.parse_args()
+
+    db = get_db()
+    if args.reconcile:
+        report = reconcile_indexes(db)
+        print(f"🔧 Indexes created: {report['created'] or 'none'}; conflicts: {report['conflicts'] or 'none'}")
+    failures = check(db)
+    if failures:
+        print(f"❌ {len(failures)} query shapes are not index-backed: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Every query shape is index-backed.")
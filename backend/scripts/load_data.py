@@ -1,39 +1,62 @@
-import json
-from fraud_ai_system.backend.src.db import get_db
+"""Load a transaction dump into MongoDB.
+
+    python -m fraud_ai_system.backend.scripts.load_data [path] [--score-workers 4]
+
+The file may be a JSON array or NDJSON, optionally gzipped, and of any
+size: it is streamed, written by parallel bulk writers, and checkpointed
+to <path>.ckpt so an interrupted load resumes where it stopped.
+"""
+import argparse
+import logging
 import os
 
+from fraud_ai_system.backend.src.bulk_loader import LOADER_WRITERS, BulkLoader
+from fraud_ai_system.backend.src.db_handler import INGEST_CHUNK_SIZE
+
 # Load your transaction JSON file
 DATA_FILE_PATH = os.path.join("fraud_ai_system", "data", "transactions.json")  # adjust path if needed
 
-def load_transactions():
+
+def print_progress(stats):
+    print(f"🔄 {stats['records']:,} records ({stats['inserted']:,} new), {stats['mb']:,.1f} MB "
+          f"at {stats['records_per_sec']:,.0f} rec/s, {stats['mb_per_sec']:,.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default=DATA_FILE_PATH)
+    parser.add_argument("--collection", default="transactions")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--writers", type=int, default=LOADER_WRITERS)
+    parser.add_argument("--validate", action="store_true", help="check records against the Transaction model")
+    parser.add_argument("--score-workers", type=int, default=0,
+                        help="score each chunk on this many processes and store flagged rows in fraud_data")
+    parser.add_argument("--mmap", action="store_true", help="memory-map the file instead of buffered reads")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default <path>.ckpt)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    loader = BulkLoader(args.path, collection=args.collection, chunk_size=args.chunk_size, writers=args.writers,
+                        validate=args.validate, score_workers=args.score_workers, use_mmap=args.mmap,
+                        checkpoint_path=args.checkpoint, resume=not args.restart, progress=print_progress)
     try:
-        with open(DATA_FILE_PATH, "r") as f:
-            data = json.load(f)
-            print(f"📦 Loaded {len(data)} transactions from file.")
-            return data
-    except Exception as e:
+        report = loader.run()
+    except KeyboardInterrupt:
+        print("⏸️ Interrupted; rerun the same command to resume.")
+        raise SystemExit(130)
+    except OSError as e:
         print(f"❌ Error reading data file: {e}")
-        return []
-
-def insert_transactions(transactions):
-    db = get_db()
-    transactions_col = db["transactions"]
-
-    inserted_count = 0
-    for txn in transactions:
-        try:
-            if not txn.get("transaction_id"):
-                print("⚠️ Skipping transaction with no transaction_id.")
-                continue
-            existing = transactions_col.find_one({"transaction_id": txn["transaction_id"]})
-            if not existing:
-                transactions_col.insert_one(txn)
-                inserted_count += 1
-        except Exception as e:
-            print(f"❌ Error inserting transaction: {e}")
-
-    print(f"✅ Inserted {inserted_count} new transactions into MongoDB.")
+        raise SystemExit(1)
+
+    print(f"✅ Inserted {report['inserted']} new transactions into MongoDB "
+          f"({report['duplicates']} duplicates, {report['failed']} failed, {report['invalid']} invalid) "
+          f"in {report['seconds']:.1f}s.")
+    if report["flagged"]:
+        print(f"🚨 {report['flagged']} transactions flagged into fraud_data.")
+    for error in report["errors"][:10]:
+        print(f"⚠️ Record {error['index']}: {error['errors']}")
+
 
 if __name__ == "__main__":
-    transactions = load_transactions()
-    insert_transactions(transactions)
+    main()
@@ -1,27 +1,66 @@
-from fastapi import APIRouter, Form, UploadFile, File, HTTPException,Query
+from fastapi import APIRouter, Form, UploadFile, File, HTTPException,Query,Header,Request
 from typing import List, Optional
 from fraud_ai_system.backend.src.db_model import Transaction  # Your Pydantic model
-from fraud_ai_system.backend.src.ml_model import load_model, predict
-from fraud_ai_system.backend.src.apply_rules import check_transaction
-from fraud_ai_system.backend.src.utils import extract_features
-from fraud_ai_system.backend.src.db_handler import insert_transactions,fetch_transactions
-from fraud_ai_system.backend.src.db import get_db
-from bson.json_util import dumps,loads
+from fraud_ai_system.backend.src.utils import chunked, dumps_bson, SCORING_BATCH_SIZE
+from fraud_ai_system.backend.src.db_handler import bulk_insert_transactions,fetch_transactions,transaction_query
+from fraud_ai_system.backend.src.db import get_async_db, run_blocking, scoring_collection
+from fraud_ai_system.backend.src.features import SCORING_PROJECTION
+from fraud_ai_system.backend.src.ingest import ingest_stream
+from fraud_ai_system.backend.src.scan_coordinator import get_scanner
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.rule_engine import get_rules
+from fraud_ai_system.backend.src.scoring_cache import get_scoring_cache
+from fraud_ai_system.backend.src.scoring_executor import (
+    SCORING_RETRY_AFTER_SECONDS, ScoringOverloaded, get_scoring_executor,
+)
+from fraud_ai_system.backend.src.metrics import STAGE_SECONDS, render_prometheus
+from fraud_ai_system.backend.src.attachments import (
+    ATTACHMENT_MAX_BYTES, AttachmentMissing, AttachmentTooLarge, RangeNotSatisfiable,
+    delete_attachment, iter_range, open_attachment, parse_range, save_upload,
+)
 from datetime import datetime
-from bson import Binary
-from fastapi.responses import JSONResponse
-import json
+from bson import ObjectId
+from pymongo import UpdateOne
+from bson.errors import InvalidId
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import logging
-import traceback
+from urllib.parse import quote
 
 logger = logging.getLogger("fraud_ai_system")
 router = APIRouter()
-model = load_model()
+
+def _overloaded(err):
+    """429 when the scoring queue is full, 503 when scoring is unavailable."""
+    if isinstance(err, ScoringOverloaded):
+        return HTTPException(status_code=429, detail="Scoring queue is full, retry shortly",
+                             headers={"Retry-After": str(SCORING_RETRY_AFTER_SECONDS)})
+    return HTTPException(status_code=503, detail="Scoring is unavailable",
+                         headers={"Retry-After": str(SCORING_RETRY_AFTER_SECONDS)})
 
 @router.get("/")
 async def root():
     return {"message": "API is running"}
 
+@router.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/scoring/status")
+async def scoring_status():
+    """Queue depth, busy workers and wait times of the scoring pool."""
+    return get_scoring_executor().stats()
+
+@router.get("/rules/status")
+async def rules_status():
+    """Live rule set version, weights and the order verdict-only scoring runs rules in."""
+    return get_rules().stats()
+
+@router.get("/scan/status")
+async def scan_status():
+    """Scan lag, backlog and throughput of the background scanner."""
+    return await run_blocking(get_scanner().stats)
+
 @router.get("/predict")
 async def predict_from_db(
     limit: int = 100,
@@ -29,47 +68,70 @@ async def predict_from_db(
     risk_level: Optional[str] = Query(None, description="Filter by risk level (low, medium, high)")
 ):
     try:
-        db = get_db()
+        db = get_async_db()
         raw_collection = db["transaction.predict"]
         fraud_collection = db["transaction.fraud_data"]
 
-        # Fetch raw transactions
-        query = {}
-        if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+        # Fetch raw transactions: only the fields scoring reads
+        query = transaction_query(name=name)
 
-        transactions = list(raw_collection.find(query).limit(limit))
+        with STAGE_SECONDS.time("fetch"):
+            transactions = await scoring_collection(raw_collection).find(query, SCORING_PROJECTION) \
+                .limit(limit).to_list(None)
 
-        results = []
-        for txn in transactions:
+        # Scoring runs on the bounded pool and only for documents the cache hasn't seen
+        executor = get_scoring_executor()
+        cache = get_scoring_cache()
+        scored, fresh_count = [], 0
+        for batch in chunked(transactions, SCORING_BATCH_SIZE):
             try:
-                result = check_transaction(txn)
+                verdicts, fresh = await cache.score(batch, executor)
+            except (ScoringOverloaded, RuntimeError) as err:
+                raise _overloaded(err)
+            fresh_count += sum(fresh)
+            scored.extend((txn, result) for txn, result in zip(batch, verdicts) if result is not None)
 
-                # Optional frontend filter (e.g., only save if High risk)
-                if risk_level and result["risk_level"].lower() != risk_level.lower():
-                    continue
+        # Optional frontend filter (e.g., only save if High risk); save only if fraudulent
+        frauds = [(txn, result) for txn, result in scored
+                  if result["status"] == "fraudulent"
+                  and not (risk_level and result["risk_level"].lower() != risk_level.lower())]
+        if frauds:
+            # Stored rows keep the whole transaction, so re-read just these in full
+            with STAGE_SECONDS.time("fetch"):
+                full = await raw_collection.find({"_id": {"$in": [txn["_id"] for txn, _ in frauds]}}) \
+                    .to_list(None)
+            full_by_id = {doc["_id"]: doc for doc in full}
+            frauds = [(full_by_id.get(txn["_id"]) or dict(txn), result) for txn, result in frauds]
 
-                # Save only if fraudulent
-                if result["status"] == "fraudulent":
-                    fraud_doc = {
-                        "transactionId": txn.get("transactionId") or txn.get("transaction_id"),
-                        **txn,
-                        **result
-                    }
-                    results.append(fraud_doc)
+        results = []
+        for txn, result in frauds:
+            try:
+                fraud_doc = {
+                    "transactionId": txn.get("transactionId") or txn.get("transaction_id"),
+                    **{k: v for k, v in txn.items() if k != "_id"},
+                    **result
+                }
+                results.append(fraud_doc)
 
             except Exception as err:
                 logger.warning(f"Skipping bad transaction: {err}")
 
-        # Save frauds only
+        # Save frauds only, upserted per transaction; unchanged rows are no-op updates
         if results:
-            fraud_collection.delete_many({})  # optional clear
-            fraud_collection.insert_many(results)
+            ops = [UpdateOne({"transactionId": doc["transactionId"]}, {"$set": doc}, upsert=True)
+                   for doc in results if doc["transactionId"]]
+            if ops:
+                with STAGE_SECONDS.time("mongo_write"):
+                    await fraud_collection.bulk_write(ops, ordered=False)
 
         return {
             "stored_fraud_count": len(results),
+            "scored_count": fresh_count,
+            "cached_count": len(scored) - fresh_count,
             "fraud_results_preview": results[:10]  # preview first few
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction failed: {e}")
         raise HTTPException(status_code=500, detail="Prediction failed")
@@ -79,38 +141,116 @@ async def predict_from_db(
 @router.post("/fraud")
 async def insert_transactions_api(txns: List[Transaction]):
     try:
-        print(f"Received {len(txns)} transactions")
-        txns_dicts = [txn.dict() for txn in txns]
-        inserted_count = insert_transactions(txns_dicts)
-        return {"inserted_transactions": inserted_count}
+        logger.info(f"Received {len(txns)} transactions")
+        txns_dicts = [txn.dict(by_alias=True) for txn in txns]
+        counts = await run_blocking(bulk_insert_transactions, txns_dicts)
+        return {
+            "inserted_transactions": counts["inserted"],
+            "duplicate_transactions": counts["duplicates"],
+            "failed_transactions": counts["failed"],
+        }
     except Exception as e:
         # You can log the error here if needed
         raise HTTPException(status_code=500, detail=f"Error inserting transactions: {e}")
 
 
+@router.post("/fraud/stream")
+async def stream_transactions_api(request: Request):
+    """
+    High-volume ingest: an NDJSON or JSON-array body of transactions, parsed as it streams in.
+
+    Records are validated against the same Transaction model as POST /fraud
+    and written in chunks; invalid records are listed in `errors` (by their
+    position in the body) instead of rejecting the batch.
+    """
+    report = await ingest_stream(request.stream())
+    return {
+        "received_transactions": report["received"],
+        "inserted_transactions": report["inserted"],
+        "duplicate_transactions": report["duplicates"],
+        "failed_transactions": report["failed"],
+        "invalid_transactions": report["invalid"],
+        "errors": report["errors"],
+        "errors_truncated": report["errors_truncated"],
+    }
+
+
+SUSPICIOUS_MAX_PAGE = 1000
+SUSPICIOUS_FIRST_BATCH = 100
+# Left out of GET /suspicious unless include_heavy=true or asked for via `fields`
+HEAVY_FIELDS = ("attachment", "checkStatus")
+
 @router.get("/suspicious")
-async def get_suspicious_transactions(limit: int = 100):
+async def get_suspicious_transactions(
+    limit: int = Query(100, ge=1, le=SUSPICIOUS_MAX_PAGE),
+    after: Optional[str] = Query(None, description="Cursor: _id of the last row of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include_heavy: bool = Query(False, description="Include attachments and checkStatus"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
     """
     Fetch suspicious/fraudulent transactions from the 'fraud_data' collection in the 'transaction' database.
+
+    Newest first, paginated by `_id` keyset: pass the returned `next_cursor`
+    (or, for NDJSON, the last row's `_id`) as `after`. Rows are streamed as
+    they come off the cursor. A failure before the first row is a 500; one
+    mid-stream aborts the response without the closing `count` /
+    `next_cursor` (NDJSON gets a final {"error": ...} line first).
     """
-    try:
-        db = get_db()
-        fraud_collection = db["fraud_data"]
+    query = {}
+    if after:
+        try:
+            query["_id"] = {"$lt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if fields:
+        projection = {f.strip(): 1 for f in fields.split(",") if f.strip()}
+    elif include_heavy:
+        projection = None
+    else:
+        projection = {f: 0 for f in HEAVY_FIELDS}
 
-        suspicious = list(fraud_collection.find())
-        json_str = dumps(suspicious)       # Safely serialize ObjectId, datetime, etc.
-        json_obj = json.loads(json_str)    # Convert back to Python dict/list
+    db = get_async_db()
+    cursor = db["fraud_data"].find(query, projection).sort("_id", -1).limit(limit)
+    try:
+        # First batch is read before the 200 goes out, so a failing query is still a 500
+        first = await cursor.to_list(SUSPICIOUS_FIRST_BATCH)
+    except Exception as e:
+        logger.exception("Error fetching suspicious transactions")
+        raise HTTPException(status_code=500, detail=f"Error fetching suspicious transactions: {e}")
 
-        return JSONResponse(content={
-            "count": len(json_obj),
-            "data": json_obj
-        })
+    async def rows():
+        for doc in first:
+            yield doc
+        if len(first) == SUSPICIOUS_FIRST_BATCH:
+            async for doc in cursor:
+                yield doc
 
+    async def stream():
+        count, last_id = 0, None
+        if format == "json":
+            yield b'{"data":['
+        try:
+            async for doc in rows():
+                if format == "ndjson":
+                    yield dumps_bson(doc) + b"\n"
+                else:
+                    yield (b"," if count else b"") + dumps_bson(doc)
+                count += 1
+                last_id = doc.get("_id")
+        except Exception as e:
+            # Headers are gone; never finish the body as if the page were complete
+            logger.exception("Error streaming suspicious transactions")
+            if format == "ndjson":
+                yield dumps_bson({"error": f"Error fetching suspicious transactions: {e}"}) + b"\n"
+            raise
+        if format == "json":
+            next_cursor = str(last_id) if count == limit and last_id is not None else None
+            yield b'],"count":' + str(count).encode() + b',"next_cursor":' + dumps_bson(next_cursor) + b"}"
 
-    except Exception as e:
-        print("Error fetching suspicious transactions:", e)
-        traceback.print_exc()
-        return JSONResponse(status_code=500, content={"detail": str(e)})
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(stream(), media_type=media_type)
     
 
 @router.post("/suspicious")
@@ -121,10 +261,10 @@ async def add_to_blocklist(
     attachment: UploadFile = File(None)
 ):
     try:
-        db = get_db()
+        db = get_async_db()
         block_col = db["blocked_entities"]
 
-        existing = block_col.find_one({"type": type, "value": value})
+        existing = await block_col.find_one({"type": type, "value": value}, {"_id": 1})
         if existing:
             return {"message": "Already blocked", "status": "exists"}
 
@@ -136,13 +276,59 @@ async def add_to_blocklist(
         }
 
         if attachment:
-            file_data = await attachment.read()  # read file bytes
-            doc["attachment"] = Binary(file_data)
+            # Streamed into the attachment store; the document only keeps a reference
+            doc["attachment"] = await save_upload(attachment)
             doc["attachment_name"] = attachment.filename
             doc["attachment_mime"] = attachment.content_type
 
-        result = block_col.insert_one(doc)
+        try:
+            result = await block_col.insert_one(doc)
+        except Exception:
+            await delete_attachment(doc.get("attachment"))
+            raise
+        get_blocklist().add(type, value)  # visible to scoring before the next refresh
         return {"message": "✅ Blocked entry saved", "id": str(result.inserted_id)}
 
+    except AttachmentTooLarge:
+        raise HTTPException(status_code=413, detail=f"Attachment exceeds {ATTACHMENT_MAX_BYTES} bytes")
     except Exception as e:
         return {"message": f"❌ Error: {e}", "status": "error"}
+
+
+@router.get("/suspicious/{entry_id}/attachment")
+async def download_attachment(entry_id: str, range: Optional[str] = Header(None)):
+    """Stream a blocked entry's attachment; honours a single `Range: bytes=` request."""
+    try:
+        oid = ObjectId(entry_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid id")
+
+    db = get_async_db()
+    doc = await db["blocked_entities"].find_one(
+        {"_id": oid}, {"attachment": 1, "attachment_name": 1, "attachment_mime": 1})
+    if not doc or not doc.get("attachment"):
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    try:
+        stream, length = await open_attachment(doc["attachment"])
+    except AttachmentMissing:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    headers = {"Accept-Ranges": "bytes"}
+    if doc.get("attachment_name"):
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(doc['attachment_name'])}"
+    try:
+        byte_range = parse_range(range, length)
+    except RangeNotSatisfiable:
+        await run_blocking(stream.close)
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+
+    status_code = 200
+    start, end = 0, length - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_range(stream, start, end), status_code=status_code,
+                             media_type=doc.get("attachment_mime") or "application/octet-stream",
+                             headers=headers)
@@ -1,45 +1,38 @@
 from datetime import datetime
-import re
-from fraud_ai_system.backend.src.ml_model import predict
-from typing import Any, Dict, List, Tuple
-
-# ---------- constants -------------------------------------------------------
-HIGH_AMOUNT_WT          = 0.20
-ODD_HOUR_WT             = 0.20
-NIGHT_BIG_TXN_WT        = 0.20
-WALLET_MISMATCH_WT      = 0.10
-BAD_UTR_WT              = 0.20
-PRIVATE_IP_WT           = 0.10
-DEVICE_CHANGE_WT        = 0.20
-ZERO_GEO_WT             = 0.20
-FLAGGED_BENEF_WT        = 0.30
-
-RISK_THRESHOLD = 0.70      # ≥ this → fraud
+import logging
+import numpy as np
+from fraud_ai_system.backend.src.ml_model import predict, predict_batch
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.metrics import BATCH_SIZE, STAGE_SECONDS, TXNS_SCORED
+from fraud_ai_system.backend.src.features import (
+    RULE_FEATURES, SCORING_FEATURES, TS_FORMATS, FeatureBatch, extract_batch, get_path, parse_ts_raw,
+)
+from fraud_ai_system.backend.src.rule_engine import RuleOutcome, RuleResult, RuleSet, get_rules
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# ---------- rules ---------------------------------------------------------
+# Weights, thresholds and conditions live in config/rules.json (see rule_engine.py)
+logger = logging.getLogger(__name__)
+
+def ruleset_version() -> str:
+    """Version of the live rule set (config version + file hash); part of every scoring cache key."""
+    return get_rules().version
 
 # ---------- helpers ---------------------------------------------------------
 def g(doc: Dict[str, Any], *path, default=None):
     """Get nested value like g(txn,'partnerDetails','amount')."""
-    cur = doc
-    for p in path:
-        if not isinstance(cur, dict) or p not in cur:
-            return default
-        cur = cur[p]
-    return cur
+    return get_path(doc, path, default)
 
-def parse_timestamp(txn: Dict[str, Any]) -> datetime | None:
+def raw_timestamp(txn: Dict[str, Any]) -> Any:
     # 1️⃣ explicit field
     ts_raw = txn.get("timestamp")
     # 2️⃣ first checkStatus.date
     if not ts_raw:
-        ts_raw = g(txn, "checkStatus", 0, "date")
-    if not ts_raw:
-        return None
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f"):
-        try:
-            return datetime.strptime(ts_raw, fmt)
-        except ValueError:
-            continue
-    return None
+        ts_raw = get_path(txn, ("checkStatus", 0, "date"), None)
+    return ts_raw
+
+def parse_timestamp(txn: Dict[str, Any]) -> datetime | None:
+    return parse_ts_raw(raw_timestamp(txn))
 
 def extract_lat_long(txn: Dict[str, Any]) -> Tuple[float, float]:
     lat = txn.get("lat")
@@ -50,126 +43,74 @@ def extract_lat_long(txn: Dict[str, Any]) -> Tuple[float, float]:
     return float(lat), float(lon)
 
 # ---------- core rules ------------------------------------------------------
-def apply_rules(txn: Dict[str, Any], history: Dict[str, Any] | None = None
-                ) -> Tuple[bool, float, List[str], List[Dict[str, str]]]:
-    reasons: List[str] = []
-    fraud_triggers: List[Dict[str, str]] = []
-    risk = 0.0
-
-    amount = float(g(txn, "partnerDetails", "amount", default=0))
-    debit  = float(g(txn, "partnerDetails", "debit", default=0))
-    credit = float(g(txn, "partnerDetails", "credit", default=0))
-    tds    = float(g(txn, "partnerDetails", "TDS",   default=0))
-
-    oldMainWalletBalance = float(g(txn, "adminDetails", "oldMainWalletBalance", default=0))
-    newMainWalletBalance = float(g(txn, "adminDetails", "newMainWalletBalance", default=0))
-
-    ip_addr = txn.get("ipAddress", g(txn, "metaData", "ipAddress", default=""))
-    imei    = txn.get("imeiNumber", "")
-    utr     = txn.get("vendorUtrNumber", "")
-
-    lat, lon = extract_lat_long(txn)
-    txn_dt   = parse_timestamp(txn)
-
-    # Rule 1: high amount
-    if amount > 1e5:
-        risk += HIGH_AMOUNT_WT
-        reasons.append(f"High amount ₹{amount:,.0f}")
-        fraud_triggers.append({
-            "type": "Amount",
-            "blocked": f"₹{amount:,.0f}"
-        })
-
-    # Rule 2: odd hours
-    if txn_dt and 1 <= txn_dt.hour <= 5:
-        risk += ODD_HOUR_WT
-        reasons.append(f"Transaction at odd hour ({txn_dt.hour} h)")
-        fraud_triggers.append({
-            "type": "Transaction Time",
-            "blocked": txn_dt.strftime("%H:%M:%S")
-        })
-
-    # Rule 3: huge night txn
-    if txn_dt and txn_dt.hour in (1, 2, 3) and amount > 2e5:
-        risk += NIGHT_BIG_TXN_WT
-        reasons.append("Very high amount during 1–3 AM window")
-        fraud_triggers.append({
-            "type": "Night High Amount",
-            "blocked": f"₹{amount:,.0f} at {txn_dt.strftime('%H:%M')}"
-        })
-
-    # Rule 4: wallet mismatch
-    if abs((oldMainWalletBalance - debit + credit - tds) - newMainWalletBalance) > 1:
-        risk += WALLET_MISMATCH_WT
-        reasons.append("Admin wallet balance mismatch")
-        fraud_triggers.append({
-            "type": "Wallet Mismatch",
-            "blocked": f"{oldMainWalletBalance=} → {newMainWalletBalance=}"
-        })
-
-    # Rule 5: UTR malformed / missing
-    if not utr or not re.fullmatch(r"[A-Za-z0-9]{10,}", utr):
-        risk += BAD_UTR_WT
-        reasons.append("Malformed or missing UTR number")
-        fraud_triggers.append({
-            "type": "UTR Number",
-            "blocked": utr or "MISSING"
-        })
-
-    # Rule 6: private / reserved IP
-    if ip_addr.startswith(("192.168.", "10.", "172.16.")):
-        risk += PRIVATE_IP_WT
-        reasons.append("Private / reserved IP")
-        fraud_triggers.append({
-            "type": "IP Address",
-            "blocked": ip_addr
-        })
-
-    # Rule 7: device change
-    if history and history.get("last_imei") and imei != history["last_imei"]:
-        risk += DEVICE_CHANGE_WT
-        reasons.append("IMEI changed vs. previous device")
-        fraud_triggers.append({
-            "type": "IMEI",
-            "blocked": f"{imei} (previous: {history['last_imei']})"
-        })
-
-    # Rule 8: zero / invalid geo
-    if lat == 0.0 and lon == 0.0:
-        risk += ZERO_GEO_WT
-        reasons.append("Invalid geo-coordinates (0,0)")
-        fraud_triggers.append({
-            "type": "GeoCoordinates",
-            "blocked": f"{lat}, {lon}"
-        })
-
-    # Rule 9: flagged beneficiary
-    if history:
-        acct = g(txn, "moneyTransferBeneficiaryDetails", "accountNumber", default="") + \
-               g(txn, "moneyTransferBeneficiaryDetails", "ifsc", default="")
-        if acct and acct in history.get("flagged_accounts", set()):
-            risk += FLAGGED_BENEF_WT
-            reasons.append("Previously flagged beneficiary reused")
-            fraud_triggers.append({
-                "type": "Beneficiary",
-                "blocked": acct
-            })
-
-    is_fraud = risk >= RISK_THRESHOLD
-    return is_fraud, round(risk, 3), reasons, fraud_triggers
+def apply_rules(txn: Dict[str, Any], history: Dict[str, Any] | None = None,
+                blocklist=None, rules: Optional[RuleSet] = None) -> RuleResult:
+    rules = rules or get_rules()
+    result = rules.apply(txn, history, blocklist if blocklist is not None else get_blocklist())
+    TXNS_SCORED.inc("scalar")
+    return result
+
+
+# ---------- batch rules -----------------------------------------------------
+def evaluate_batch(txns: Sequence[Dict[str, Any]],
+                   histories: Optional[Sequence[Dict[str, Any] | None]] = None,
+                   blocklist=None, features: Optional[FeatureBatch] = None,
+                   decisive: bool = False, rules: Optional[RuleSet] = None) -> RuleOutcome:
+    """Run the live rule set over a batch; see RuleSet.evaluate for `decisive`."""
+    rules = rules or get_rules()
+    with STAGE_SECONDS.time("features"):
+        ctx = rules.context(txns, histories, blocklist if blocklist is not None else get_blocklist(), features)
+    outcome = rules.evaluate(ctx, decisive=decisive)
+    TXNS_SCORED.inc("batch", amount=len(txns))
+    BATCH_SIZE.observe(len(txns))
+    return outcome
+
+def apply_rules_batch(txns: Sequence[Dict[str, Any]],
+                      histories: Optional[Sequence[Dict[str, Any] | None]] = None,
+                      blocklist=None, features: Optional[FeatureBatch] = None,
+                      explain: bool = True) -> List[RuleResult]:
+    """Vectorised counterpart of apply_rules.
+
+    Returns one (is_fraud, score, reasons, triggers) tuple per transaction,
+    identical to calling apply_rules on each one. `features` is a batch
+    already extracted for these transactions (see process_transactions).
+    With explain=False the reason and trigger lists are left empty.
+    """
+    if not txns:
+        return []
+    outcome = evaluate_batch(txns, histories, blocklist, features)
+    with STAGE_SECONDS.time("reasons"):
+        return outcome.results(explain)
+
+def classify_batch(txns: Sequence[Dict[str, Any]],
+                   histories: Optional[Sequence[Dict[str, Any] | None]] = None,
+                   blocklist=None, features: Optional[FeatureBatch] = None) -> np.ndarray:
+    """Rules verdict only (bool per transaction), short-circuiting once each one is decided."""
+    if not txns:
+        return np.zeros(0, dtype=bool)
+    return evaluate_batch(txns, histories, blocklist, features, decisive=True).fraud
 
 
 # ---------- wrapper ---------------------------------------------------------
-def check_transaction(txn: Dict[str, Any], history: Dict[str, Any] | None = None) -> Dict[str, Any]:
-    fraud, score, reasons, triggers = apply_rules(txn, history)
-
-
-    if score >= 0.8:
-        level, action = "High",   "Cancel"
-    elif score >= 0.5:
-        level, action = "Medium", "Pending"
-    else:
-        level, action = "Low",    "Approve"
+def check_transaction(txn: Dict[str, Any], history: Dict[str, Any] | None = None,
+                      blocklist=None) -> Dict[str, Any]:
+    rules = get_rules()
+    return _verdict(*apply_rules(txn, history, blocklist, rules), rules=rules)
+
+def check_transactions(txns: Sequence[Dict[str, Any]],
+                       histories: Optional[Sequence[Dict[str, Any] | None]] = None,
+                       blocklist=None, features: Optional[FeatureBatch] = None) -> List[Dict[str, Any]]:
+    """Batch form of check_transaction built on apply_rules_batch."""
+    if not txns:
+        return []
+    rules = get_rules()
+    outcome = evaluate_batch(txns, histories, blocklist, features, rules=rules)
+    with STAGE_SECONDS.time("reasons"):
+        return [_verdict(*res, rules=rules) for res in outcome.results()]
+
+def _verdict(fraud: bool, score: float, reasons: List[str],
+             triggers: List[Dict[str, str]], rules: Optional[RuleSet] = None) -> Dict[str, Any]:
+    level, action = (rules or get_rules()).level(score)
 
     return {
         "status":      "fraudulent" if fraud else "genuine",
@@ -187,7 +128,7 @@ def process_transaction(transaction: dict, model=None, history: dict = None) ->
 
         
         # Run ML model prediction
-        ml_results = predict(model, transaction) if model else {"prediction": 0, "risk_score": 0.0}
+        ml_results = predict(model, transaction, history) if model else {"prediction": 0, "risk_score": 0.0}
     
         return {
             "rules_flagged": is_fraud,
@@ -198,10 +139,60 @@ def process_transaction(transaction: dict, model=None, history: dict = None) ->
         }
 
     except Exception as e:
-        print(f"❌ Error processing transaction {transaction.get('transactionId', 'unknown')}: {e}")
+        logger.warning(f"❌ Error processing transaction {transaction.get('transactionId', 'unknown')}: {e}")
         return {
             "rules_flagged": False,
             "ml_prediction": 0,
             "risk_score": 0.0,
             "reasons": ["Error processing transaction"]
         }
+
+
+def process_transactions(transactions: Sequence[dict], model=None,
+                         histories: Optional[Sequence[dict | None]] = None,
+                         flagged_only: bool = False) -> List[dict]:
+    """Batch form of process_transaction: one feature pass, one rules pass and one model call per batch.
+
+    With flagged_only, for callers that drop unflagged results, the rules
+    first run verdict-only; just the rows flagged by rules or model are
+    then scored fully and explained. Other rows get empty reasons and a
+    risk_score that is only a lower bound.
+    """
+    if not transactions:
+        return []
+    try:
+        rules = get_rules()
+        features = extract_batch(transactions, SCORING_FEATURES if model else RULE_FEATURES)
+        outcome = evaluate_batch(transactions, histories, features=features, decisive=flagged_only, rules=rules)
+        if model:
+            ml_results = predict_batch(model, transactions, features=features, histories=histories)
+        else:
+            ml_results = [{"prediction": 0, "risk_score": 0.0}] * len(transactions)
+        with STAGE_SECONDS.time("reasons"):
+            if flagged_only:
+                flagged = outcome.fraud | np.fromiter((ml.get("prediction") == 1 for ml in ml_results),
+                                                      dtype=bool, count=len(ml_results))
+                rows = np.flatnonzero(flagged)
+                if rows.size:
+                    exact = rules.evaluate(outcome.ctx, rows=rows, observe=False)
+                    outcome.points[rows] = exact.points[rows]
+                    outcome.hits = exact.hits
+                rule_results = outcome.results(flagged)
+            else:
+                rule_results = outcome.results()
+    except Exception as e:
+        logger.warning(f"⚠️ Batch scoring failed, falling back to per-transaction: {e}")
+        if histories is None:
+            histories = [None] * len(transactions)
+        return [process_transaction(t, model, h) for t, h in zip(transactions, histories)]
+
+    return [
+        {
+            "rules_flagged": is_fraud,
+            "ml_prediction": ml.get("prediction", 0),
+            "risk_score": max(risk_score_rules, ml.get("risk_score", 0.0)),
+            "reasons": reasons,
+            "triggers": triggers,
+        }
+        for (is_fraud, risk_score_rules, reasons, triggers), ml in zip(rule_results, ml_results)
+    ]
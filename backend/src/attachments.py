@@ -0,0 +1,236 @@
+# fraud_ai_system/backend/src/attachments.py
+
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import uuid
+
+from bson import Binary, ObjectId
+from bson.errors import InvalidId
+from gridfs import GridFSBucket
+from gridfs.errors import NoFile
+
+from fraud_ai_system.backend.src.db import get_db, run_blocking
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_STORE = os.getenv("ATTACHMENT_STORE", "gridfs")   # gridfs | local
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", os.path.join("fraud_ai_system", "data", "attachments"))
+ATTACHMENT_BUCKET = os.getenv("ATTACHMENT_BUCKET", "attachments")
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(25 * 1024 * 1024)))
+# Upload/download step and GridFS chunk size (GridFS default is 255 KiB)
+ATTACHMENT_CHUNK_BYTES = int(os.getenv("ATTACHMENT_CHUNK_BYTES", str(255 * 1024)))
+
+
+class AttachmentTooLarge(Exception):
+    """The upload is bigger than ATTACHMENT_MAX_BYTES."""
+
+
+class AttachmentMissing(Exception):
+    """The document references an attachment the store no longer has."""
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the attachment."""
+
+
+# ---------- stores ----------------------------------------------------------
+class _GridFSUpload:
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, chunk):
+        self._stream.write(chunk)
+
+    def close(self):
+        self._stream.close()
+        return self._stream._id
+
+    def abort(self):
+        self._stream.abort()
+
+
+class GridFSAttachmentStore:
+    """Attachments as GridFS files in ATTACHMENT_BUCKET, chunked by the driver."""
+
+    kind = "gridfs"
+
+    def __init__(self, db=None, bucket=ATTACHMENT_BUCKET, chunk_bytes=ATTACHMENT_CHUNK_BYTES):
+        self._bucket = GridFSBucket(db if db is not None else get_db(), bucket_name=bucket,
+                                    chunk_size_bytes=chunk_bytes)
+
+    def open_upload(self, filename, content_type):
+        return _GridFSUpload(self._bucket.open_upload_stream(
+            filename or "attachment", metadata={"contentType": content_type}))
+
+    def open(self, file_id):
+        """(readable, seekable stream, length) for a stored file."""
+        try:
+            stream = self._bucket.open_download_stream(ObjectId(file_id))
+        except (NoFile, InvalidId, TypeError):
+            raise AttachmentMissing(file_id)
+        return stream, stream.length
+
+    def delete(self, file_id):
+        try:
+            self._bucket.delete(ObjectId(file_id))
+        except NoFile:
+            pass
+
+
+class _LocalUpload:
+    def __init__(self, root):
+        self._id = uuid.uuid4().hex
+        self._path = os.path.join(root, self._id)
+        self._file = open(self._path + ".part", "wb")
+
+    def write(self, chunk):
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+        os.replace(self._path + ".part", self._path)  # never expose a half-written file
+        return self._id
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._path + ".part")
+
+
+class LocalAttachmentStore:
+    """Attachments as plain files under ATTACHMENT_DIR, named by a random id."""
+
+    kind = "local"
+
+    def __init__(self, root=ATTACHMENT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, file_id):
+        if not re.fullmatch(r"[0-9a-f]{32}", str(file_id)):
+            raise AttachmentMissing(file_id)
+        return os.path.join(self.root, file_id)
+
+    def open_upload(self, filename, content_type):
+        return _LocalUpload(self.root)
+
+    def open(self, file_id):
+        try:
+            stream = open(self._path(file_id), "rb")
+        except FileNotFoundError:
+            raise AttachmentMissing(file_id)
+        return stream, os.fstat(stream.fileno()).st_size
+
+    def delete(self, file_id):
+        try:
+            os.remove(self._path(file_id))
+        except (FileNotFoundError, AttachmentMissing):
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attachment_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalAttachmentStore() if ATTACHMENT_STORE == "local" else GridFSAttachmentStore()
+        return _store
+
+
+# ---------- upload ----------------------------------------------------------
+async def save_upload(upload, store=None, max_bytes=ATTACHMENT_MAX_BYTES):
+    """Stream an UploadFile into the store chunk by chunk.
+
+    Never holds more than one chunk in memory. Raises AttachmentTooLarge
+    (and drops what was written) once the upload passes `max_bytes`.
+    Returns the reference to keep on the document.
+    """
+    store = store or get_attachment_store()
+    if upload.size is not None and upload.size > max_bytes:
+        raise AttachmentTooLarge(upload.size)
+    writer = await run_blocking(store.open_upload, upload.filename, upload.content_type)
+    size, digest = 0, hashlib.sha256()
+    try:
+        while True:
+            chunk = await upload.read(ATTACHMENT_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise AttachmentTooLarge(size)
+            digest.update(chunk)
+            await run_blocking(writer.write, chunk)
+        file_id = await run_blocking(writer.close)
+    except BaseException:
+        await run_blocking(writer.abort)
+        raise
+    return {"store": store.kind, "id": file_id, "size": size, "sha256": digest.hexdigest()}
+
+
+async def delete_attachment(ref):
+    """Remove a stored attachment; used to roll back an upload whose document was not saved."""
+    if isinstance(ref, dict) and ref.get("store") == get_attachment_store().kind:
+        await run_blocking(get_attachment_store().delete, ref["id"])
+
+
+# ---------- download --------------------------------------------------------
+async def open_attachment(ref):
+    """(stream, length) for a document's `attachment` field.
+
+    Handles store references as well as legacy documents that embed the
+    bytes inline.
+    """
+    if isinstance(ref, (bytes, Binary)):
+        return io.BytesIO(ref), len(ref)
+    store = get_attachment_store()
+    if not isinstance(ref, dict) or ref.get("store") != store.kind:
+        raise AttachmentMissing(ref)
+    return await run_blocking(store.open, ref["id"])
+
+
+def parse_range(header, length):
+    """(start, end) inclusive for a single `bytes=` range, or None to send the whole file.
+
+    Malformed or multi-range headers are ignored, as RFC 9110 allows.
+    Raises RangeNotSatisfiable for a range that starts past the end.
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(length - int(last), 0), length - 1
+        if int(last) == 0:
+            raise RangeNotSatisfiable(header)
+    if start >= length:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+async def iter_range(stream, start, end, chunk_bytes=ATTACHMENT_CHUNK_BYTES):
+    """Yield bytes start..end (inclusive) of a stream, one chunk per blocking read; closes the stream."""
+    try:
+        await run_blocking(stream.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run_blocking(stream.read, min(chunk_bytes, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_blocking(stream.close)
@@ -0,0 +1,465 @@
+# fraud_ai_system/backend/src/backtest.py
+"""Offline replay of the rule set, and threshold / weight sweeps over it.
+
+Replay streams historical transactions (the `predict` collection labelled
+from `fraud_data`, or a JSON / NDJSON export carrying its own label) through
+every rule exactly once. Histories are rebuilt in stream order as the
+live HistoryStore would build them, with beneficiaries of labelled fraud
+counting as flagged (as HistoryStore.warm_start seeds them from
+fraud_data). Feature extraction and rule evaluation run on a process
+pool.
+
+Each transaction then reduces to its trigger pattern: the bitmask of
+rules it fires. The replay keeps only the distinct patterns and how many
+fraud / genuine transactions had each one. There are at most 2**rules of
+them, so a sweep is a few matrix products over that table (patterns x
+rules times rules x configs), however many transactions were replayed:
+
+    points  = patterns @ weights.T         # per pattern, per config
+    alerts  = points >= thresholds
+    tp / fp = positives @ alerts, negatives @ alerts
+
+Configurations are scored on the pool in chunks. Scores here are rules
+only, as check_transaction's status and risk levels are; the model is
+not part of the replay.
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_ai_system.backend.src.features import SCORING_PROJECTION
+from fraud_ai_system.backend.src.history_store import HistoryStore, beneficiary_key
+from fraud_ai_system.backend.src.rule_engine import POINT_SCALE, RuleSet, load_ruleset, resolve_rules_path
+from fraud_ai_system.backend.src.scoring_executor import SCORING_MP_START
+from fraud_ai_system.backend.src.utils import TXN_ID_FIELD, canonical_txn_id, chunked
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+BACKTEST_BATCH_SIZE = int(os.getenv("BACKTEST_BATCH_SIZE", "5000"))
+BACKTEST_LABEL_FIELD = os.getenv("BACKTEST_LABEL_FIELD", "is_fraud")
+# Pattern x config cells scored per sweep task (bounds worker memory)
+BACKTEST_SWEEP_CELLS = int(os.getenv("BACKTEST_SWEEP_CELLS", str(4_000_000)))
+
+MAX_RULES = 62   # pattern bit + label bit must fit an int64
+
+
+# ---------- sources ---------------------------------------------------------
+def mongo_batches(source="predict", labels_from="fraud_data", label_field=BACKTEST_LABEL_FIELD,
+                  query=None, batch_size=BACKTEST_BATCH_SIZE):
+    """(transactions, labels) batches from `source` in _id order.
+
+    A transaction is labelled fraud when `labels_from` holds a row for its
+    transactionId with `label_field` true.
+    """
+    from fraud_ai_system.backend.src.db import get_db
+    db = get_db()
+    fraud_ids = {canonical_txn_id(doc) for doc in
+                 db[labels_from].find({label_field: True}, {TXN_ID_FIELD: 1, "transaction_id": 1})}
+    fraud_ids.discard(None)
+    logger.info(f"🔄 Replaying {source} against {len(fraud_ids)} labelled frauds from {labels_from}")
+    cursor = db[source].find(query or {}, SCORING_PROJECTION).sort("_id", 1).batch_size(batch_size)
+    for batch in chunked(cursor, batch_size):
+        yield batch, np.fromiter((canonical_txn_id(txn) in fraud_ids for txn in batch), dtype=bool,
+                                 count=len(batch))
+
+
+def file_batches(path, label_field=BACKTEST_LABEL_FIELD, batch_size=BACKTEST_BATCH_SIZE):
+    """(transactions, labels) batches from a JSON array / NDJSON export (gzip allowed).
+
+    Each record carries its own label in `label_field` (fraud_data rows
+    exported as-is have `is_fraud`); records that do not parse are skipped.
+    """
+    from fraud_ai_system.backend.src.bulk_loader import LOADER_READ_BYTES, open_input
+    from fraud_ai_system.backend.src.ingest import RecordStream
+
+    def records():
+        stream, skipped = RecordStream(), 0
+        with open_input(path) as source:
+            while True:
+                chunk = source.read(LOADER_READ_BYTES)
+                for _, raw, error, _ in (stream.feed(chunk) if chunk else stream.close()):
+                    if error or not isinstance(raw, dict):
+                        skipped += 1
+                    else:
+                        yield raw
+                if not chunk or stream.done:
+                    break
+        if skipped:
+            logger.warning(f"⚠️ Skipped {skipped} unreadable records in {path}")
+
+    for batch in chunked(records(), batch_size):
+        yield batch, np.fromiter((bool(txn.get(label_field)) for txn in batch), dtype=bool, count=len(batch))
+
+
+# ---------- trigger table ---------------------------------------------------
+class TriggerTable:
+    """Distinct trigger patterns of a replay with their fraud / genuine counts.
+
+    `codes[i]` has bit r set when rule r (in rule-file order) fires;
+    `positives[i]` and `negatives[i]` count the labelled fraud and genuine
+    transactions with that pattern. The base weights, threshold and
+    levels of the replayed rule set travel with it, so a saved table can
+    be swept later without the rules file.
+    """
+
+    def __init__(self, rule_names, base_points, threshold, levels, version,
+                 codes=None, positives=None, negatives=None, skipped=0):
+        self.rule_names = list(rule_names)
+        self.base_points = np.asarray(base_points, dtype=np.int64)
+        self.threshold = int(threshold)
+        self.levels = [tuple(level) for level in levels]   # (min, level, action), highest first
+        self.version = version
+        self.codes = np.zeros(0, dtype=np.int64) if codes is None else np.asarray(codes, dtype=np.int64)
+        self.positives = np.zeros(0, dtype=np.int64) if positives is None else np.asarray(positives, dtype=np.int64)
+        self.negatives = np.zeros(0, dtype=np.int64) if negatives is None else np.asarray(negatives, dtype=np.int64)
+        self.skipped = skipped
+        self._pending = Counter()
+
+    @classmethod
+    def for_rules(cls, rules: RuleSet):
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"Backtest supports at most {MAX_RULES} rules, the rule set has {len(rules)}")
+        return cls([r.name for r in rules.rules], [r.points for r in rules.rules], rules.threshold,
+                   rules.levels, rules.version)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def transactions(self) -> int:
+        return int(self.positives.sum() + self.negatives.sum())
+
+    @property
+    def patterns(self) -> np.ndarray:
+        """Patterns x rules 0/1 matrix."""
+        bits = np.arange(len(self.rule_names), dtype=np.int64)
+        return ((self.codes[:, None] >> bits) & 1).astype(np.int64)
+
+    # ---------- building ----------
+    def add(self, codes: np.ndarray, labels: np.ndarray):
+        keys, counts = np.unique((codes << 1) | labels.astype(np.int64), return_counts=True)
+        self._pending.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def finish(self):
+        merged = Counter()
+        for code, pos, neg in zip(self.codes.tolist(), self.positives.tolist(), self.negatives.tolist()):
+            merged[code << 1 | 1] += pos
+            merged[code << 1] += neg
+        merged.update(self._pending)
+        self._pending = Counter()
+        codes = sorted({key >> 1 for key in merged})
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.positives = np.asarray([merged.get(code << 1 | 1, 0) for code in codes], dtype=np.int64)
+        self.negatives = np.asarray([merged.get(code << 1, 0) for code in codes], dtype=np.int64)
+        return self
+
+    # ---------- persistence ----------
+    def save(self, path):
+        meta = {"rule_names": self.rule_names, "base_points": self.base_points.tolist(),
+                "threshold": self.threshold, "levels": self.levels, "version": self.version,
+                "skipped": self.skipped}
+        with open(path, "wb") as f:
+            np.savez_compressed(f, codes=self.codes, positives=self.positives, negatives=self.negatives,
+                                meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes())
+            return cls(meta["rule_names"], meta["base_points"], meta["threshold"], meta["levels"],
+                       meta["version"], data["codes"], data["positives"], data["negatives"], meta["skipped"])
+
+
+# ---------- replay ----------------------------------------------------------
+_worker_rules: Optional[RuleSet] = None
+_worker_blocklist = None
+
+
+def _init_worker(rules_path, blocklist):
+    global _worker_rules, _worker_blocklist
+    _worker_rules = load_ruleset(rules_path)
+    _worker_blocklist = blocklist
+
+
+def trigger_codes(rules: RuleSet, txns, histories, blocklist) -> Tuple[np.ndarray, np.ndarray]:
+    """(pattern code, scored ok) per transaction, every rule evaluated exactly."""
+    codes = np.zeros(len(txns), dtype=np.int64)
+    ok = np.ones(len(txns), dtype=bool)
+    try:
+        outcome = rules.evaluate(rules.context(txns, histories, blocklist), observe=False)
+        for bit, rule in enumerate(rules.rules):
+            fired = outcome.hits[rule.name]
+            if fired.size:
+                codes[fired] |= 1 << bit
+    except Exception as err:
+        # A malformed document fails the whole batch; redo it row by row so only that one is dropped
+        logger.warning(f"Batch replay failed, falling back to per-transaction: {err}")
+        bits = {rule.name: 1 << bit for bit, rule in enumerate(rules.rules)}
+        for i, (txn, history) in enumerate(zip(txns, histories)):
+            try:
+                _, fired = rules.evaluate_row(rules.row(txn, history, blocklist), observe=False)
+                codes[i] = sum(bits[rule.name] for rule in fired)
+            except Exception:
+                ok[i] = False
+    return codes, ok
+
+
+def _frozen_history(txn, history):
+    """History with flagged_accounts resolved for this transaction now, before later batches flag more."""
+    acct = beneficiary_key(txn)
+    return {**history, "flagged_accounts": {acct} if acct and acct in history["flagged_accounts"] else set()}
+
+
+def _replay_batch(txns, histories):
+    return trigger_codes(_worker_rules, txns, histories, _worker_blocklist)
+
+
+def replay(batches: Iterable[Tuple[Sequence[Dict[str, Any]], np.ndarray]], rules_path=None,
+           workers=BACKTEST_WORKERS, blocklist=None, history: Optional[HistoryStore] = None) -> TriggerTable:
+    """Trigger table for `batches` of (transactions, labels) under the rules at `rules_path`.
+
+    Histories are snapshotted in the parent, in order, then batches are
+    evaluated on `workers` processes (in-process when 0) with at most
+    twice that many in flight.
+    """
+    rules_path = resolve_rules_path(rules_path)
+    if blocklist is None:
+        from fraud_ai_system.backend.src.blocklist import get_blocklist
+        blocklist = get_blocklist()
+    history = history or HistoryStore()
+    table = TriggerTable.for_rules(load_ruleset(rules_path))
+
+    if workers:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(SCORING_MP_START),
+                                   initializer=_init_worker, initargs=(rules_path, blocklist))
+        submit = pool.submit
+    else:
+        _init_worker(rules_path, blocklist)
+        pool, submit = None, None
+    pending = deque()
+
+    def collect():
+        future, labels = pending.popleft()
+        codes, ok = future.result()
+        table.skipped += int(len(ok) - np.count_nonzero(ok))
+        table.add(codes[ok], labels[ok])
+
+    try:
+        for txns, labels in batches:
+            histories = [_frozen_history(txn, h) for txn, h in zip(txns, history.histories_for(txns))]
+            # Flag before the next batch is snapshotted, as the live pipeline records results
+            history.record_results(txns, [{"status": "fraudulent"} if label else {} for label in labels.tolist()])
+            if pool is None:
+                codes, ok = _replay_batch(txns, histories)
+                table.skipped += int(len(ok) - np.count_nonzero(ok))
+                table.add(codes[ok], labels[ok])
+                continue
+            pending.append((submit(_replay_batch, txns, histories), labels))
+            while pending and (pending[0][0].done() or len(pending) > 2 * workers):
+                collect()
+        while pending:
+            collect()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    table.finish()
+    logger.info(f"✅ Replayed {table.transactions} transactions into {len(table)} trigger patterns "
+                f"({table.skipped} skipped)")
+    return table
+
+
+# ---------- configurations --------------------------------------------------
+def base_config(table: TriggerTable) -> Dict[str, Any]:
+    """The replayed rule set's own threshold, weights and level cutoffs."""
+    return {
+        "threshold": table.threshold / POINT_SCALE,
+        "weights": {name: int(p) / POINT_SCALE for name, p in zip(table.rule_names, table.base_points)},
+        "levels": [minimum for minimum, _, _ in table.levels],
+    }
+
+
+def config_grid(table: TriggerTable, thresholds=None, weights: Optional[Dict[str, Sequence[float]]] = None,
+                levels: Optional[Sequence[Sequence[float]]] = None) -> List[Dict[str, Any]]:
+    """Cartesian product of candidate thresholds, per-rule weights and level cutoffs.
+
+    Anything not given keeps the base value; `levels` entries list one
+    minimum per level, highest level first.
+    """
+    base = base_config(table)
+    weights = weights or {}
+    unknown = set(weights) - set(table.rule_names)
+    if unknown:
+        raise ValueError(f"Unknown rules in weight grid: {sorted(unknown)}")
+    names = list(weights)
+    configs = []
+    for threshold, cutoffs, values in itertools.product(thresholds or [base["threshold"]],
+                                                        levels or [base["levels"]],
+                                                        itertools.product(*(weights[n] for n in names))):
+        configs.append({"threshold": float(threshold), "weights": {**base["weights"], **dict(zip(names, values))},
+                        "levels": list(cutoffs)})
+    return configs
+
+
+def random_configs(table: TriggerTable, n, seed=0, weight_range=(0.0, 0.5),
+                   threshold_range=None) -> List[Dict[str, Any]]:
+    """`n` configurations with weights (and threshold, if a range is given) drawn uniformly."""
+    rng = random.Random(seed)
+    base = base_config(table)
+    configs = []
+    for _ in range(n):
+        threshold = rng.uniform(*threshold_range) if threshold_range else base["threshold"]
+        configs.append({"threshold": round(threshold, 3),
+                        "weights": {name: round(rng.uniform(*weight_range), 3) for name in table.rule_names},
+                        "levels": base["levels"]})
+    return configs
+
+
+def _config_arrays(table: TriggerTable, configs):
+    """Configs as integer point arrays: weights (K x R), thresholds (K,), level minimums (K x L)."""
+    index = {name: r for r, name in enumerate(table.rule_names)}
+    weights = np.tile(table.base_points, (len(configs), 1))
+    thresholds = np.full(len(configs), table.threshold, dtype=np.int64)
+    levels = np.tile(np.asarray([round(m * POINT_SCALE) for m, _, _ in table.levels], dtype=np.int64),
+                     (len(configs), 1))
+    for k, config in enumerate(configs):
+        for name, weight in (config.get("weights") or {}).items():
+            if name not in index:
+                raise ValueError(f"Config {k}: unknown rule {name!r}")
+            if weight < 0:
+                raise ValueError(f"Config {k}: weight for {name!r} must not be negative")
+            weights[k, index[name]] = round(float(weight) * POINT_SCALE)
+        if config.get("threshold") is not None:
+            thresholds[k] = round(float(config["threshold"]) * POINT_SCALE)
+        if config.get("levels") is not None:
+            if len(config["levels"]) != len(table.levels):
+                raise ValueError(f"Config {k}: expected {len(table.levels)} level cutoffs")
+            levels[k] = [round(float(m) * POINT_SCALE) for m in config["levels"]]
+            if np.any(np.diff(levels[k]) > 0):
+                raise ValueError(f"Config {k}: level cutoffs must be listed highest first")
+    return weights, thresholds, levels
+
+
+# ---------- sweeps ----------------------------------------------------------
+def sweep_matrix(patterns, positives, negatives, weights, thresholds, levels) -> Dict[str, np.ndarray]:
+    """Confusion counts, per-rule contribution and level counts for K configs at once.
+
+    patterns is P x R (0/1), weights K x R and levels K x L in points.
+    Per rule: `alert_hits` alerts it fired on, `true_hits` of those that
+    were fraud, `decisive` alerts that would drop below the threshold
+    without it, and `points` its points summed over alerts.
+    """
+    total = positives + negatives
+    points = patterns @ weights.T                          # P x K
+    alerts = points >= thresholds                          # P x K
+    alerted = alerts * total[:, None]
+    alerted_pos = alerts * positives[:, None]
+    alert_hits = alerted.T @ patterns                      # K x R
+    decisive = np.empty_like(alert_hits)
+    for r in range(patterns.shape[1]):
+        needed = alerted * ((points - weights[:, r]) < thresholds)
+        decisive[:, r] = patterns[:, r] @ needed
+    level_ge = np.stack([total @ (points >= levels[:, j]) for j in range(levels.shape[1])], axis=1)
+    level_pos = np.stack([positives @ (points >= levels[:, j]) for j in range(levels.shape[1])], axis=1)
+    return {
+        "alerts": alerted.sum(axis=0),
+        "tp": alerted_pos.sum(axis=0),
+        "alert_hits": alert_hits,
+        "true_hits": alerted_pos.T @ patterns,
+        "decisive": decisive,
+        "points": alert_hits * weights,
+        "level_ge": level_ge,
+        "level_pos_ge": level_pos,
+    }
+
+
+_sweep_table = None
+
+
+def _init_sweep_worker(patterns, positives, negatives):
+    global _sweep_table
+    _sweep_table = (patterns, positives, negatives)
+
+
+def _sweep_chunk(weights, thresholds, levels):
+    return sweep_matrix(*_sweep_table, weights, thresholds, levels)
+
+
+def _report(table: TriggerTable, config, k, out) -> Dict[str, Any]:
+    pos_total = int(table.positives.sum())
+    n = table.transactions
+    alerts, tp = int(out["alerts"][k]), int(out["tp"][k])
+    precision = tp / alerts if alerts else None
+    recall = tp / pos_total if pos_total else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else 0.0
+    alert_points = int(out["points"][k].sum())
+
+    level_counts, level_frauds = {}, {}
+    prev_n = prev_pos = 0
+    for j, (_, level, _) in enumerate(table.levels):
+        ge_n, ge_pos = int(out["level_ge"][k, j]), int(out["level_pos_ge"][k, j])
+        level_counts[level], level_frauds[level] = ge_n - prev_n, ge_pos - prev_pos
+        prev_n, prev_pos = ge_n, ge_pos
+    if "Low" not in level_counts:   # RuleSet.level's fallback below the lowest cutoff
+        level_counts["Low"], level_frauds["Low"] = n - prev_n, pos_total - prev_pos
+
+    return {
+        **config,
+        "alerts": alerts,
+        "alert_rate": alerts / n if n else None,
+        "tp": tp,
+        "fp": alerts - tp,
+        "fn": pos_total - tp,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "levels_count": level_counts,
+        "levels_fraud": level_frauds,
+        "rules": {
+            name: {
+                "alert_hits": int(out["alert_hits"][k, r]),
+                "true_hits": int(out["true_hits"][k, r]),
+                "decisive": int(out["decisive"][k, r]),
+                "point_share": int(out["points"][k, r]) / alert_points if alert_points else 0.0,
+            }
+            for r, name in enumerate(table.rule_names)
+        },
+    }
+
+
+def sweep(table: TriggerTable, configs: Sequence[Dict[str, Any]], workers=BACKTEST_WORKERS) -> List[Dict[str, Any]]:
+    """One report per configuration (precision, recall, alert volume, levels, per-rule contribution).
+
+    A config is {"threshold", "weights": {rule: weight}, "levels": [min, ...]}
+    with anything missing taken from the replayed rule set.
+    """
+    if not configs:
+        return []
+    weights, thresholds, levels = _config_arrays(table, configs)
+    patterns = table.patterns
+    step = max(1, BACKTEST_SWEEP_CELLS // max(1, len(table)))
+    spans = [(start, min(start + step, len(configs))) for start in range(0, len(configs), step)]
+    args = [(weights[a:b], thresholds[a:b], levels[a:b]) for a, b in spans]
+
+    if workers and len(spans) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(spans)),
+                                 mp_context=multiprocessing.get_context(SCORING_MP_START),
+                                 initializer=_init_sweep_worker,
+                                 initargs=(patterns, table.positives, table.negatives)) as pool:
+            outs = list(pool.map(_sweep_chunk, *zip(*args)))
+    else:
+        outs = [sweep_matrix(patterns, table.positives, table.negatives, *a) for a in args]
+
+    reports = []
+    for (start, end), out in zip(spans, outs):
+        for k in range(end - start):
+            reports.append(_report(table, configs[start + k], k, out))
+    return reports
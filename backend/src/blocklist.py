@@ -0,0 +1,211 @@
+# fraud_ai_system/backend/src/blocklist.py
+
+import ipaddress
+import logging
+import os
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.features import DOC_TYPES
+
+logger = logging.getLogger(__name__)
+
+BLOCKLIST_REFRESH_SECONDS = float(os.getenv("BLOCKLIST_REFRESH_SECONDS", "30"))
+BLOCKLIST_FULL_RELOAD_SECONDS = float(os.getenv("BLOCKLIST_FULL_RELOAD_SECONDS", "600"))
+
+# Free-form `type` values accepted by POST /suspicious, mapped to index kinds
+TYPE_ALIASES = {
+    "imei": "imei", "imeinumber": "imei", "device": "imei",
+    "mobile": "mobile", "mobilenumber": "mobile", "phone": "mobile",
+    "utr": "utr", "vendorutrnumber": "utr",
+    "account": "account", "accountnumber": "account", "beneficiary": "account",
+    "ip": "ip", "ipaddress": "ip",
+}
+
+
+class IPPrefixSet:
+    """IPv4 prefix membership without per-lookup parsing.
+
+    Octet-aligned prefixes ("10.", "192.168.", "172.16.0.0/16") are stored
+    as dotted strings ending in "." so a lookup is a few str.find calls and
+    set probes, with the same semantics as str.startswith on the prefix.
+    Full addresses are exact matches; other CIDR lengths fall back to an
+    integer mask check.
+    """
+
+    def __init__(self, prefixes=()):
+        self._prefixes = set()   # {"10.", "192.168.", ...}
+        self._octet_counts = set()
+        self._max_octets = 0
+        self._exact = set()
+        self._masked = {}   # prefixlen -> {network int}
+        self._size = 0
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _insert(members, key):
+        """Add `key` to `members`; True when it was not there yet."""
+        if key in members:
+            return False
+        members.add(key)
+        return True
+
+    def _add_octets(self, octets):
+        self._octet_counts.add(len(octets))
+        self._max_octets = max(self._max_octets, len(octets))
+        return self._insert(self._prefixes, ".".join(octets) + ".")
+
+    def add(self, prefix):
+        """Add one prefix; adding one that is already present changes nothing, len() included."""
+        prefix = prefix.strip()
+        if "/" in prefix:
+            net = ipaddress.ip_network(prefix, strict=False)
+            if net.version != 4:
+                return
+            if net.prefixlen == 32:
+                added = self._insert(self._exact, str(net.network_address))
+            elif net.prefixlen % 8 == 0:
+                added = self._add_octets(str(net.network_address).split(".")[: net.prefixlen // 8])
+            else:
+                added = self._insert(self._masked.setdefault(net.prefixlen, set()), int(net.network_address))
+        else:
+            parts = prefix.rstrip(".").split(".")
+            if len(parts) == 4 and not prefix.endswith("."):
+                added = self._insert(self._exact, prefix)
+            else:
+                added = self._add_octets(parts)
+        if added:
+            self._size += 1
+
+    def __contains__(self, ip):
+        if ip in self._exact:
+            return True
+        if self._prefixes:
+            dot = -1
+            for n in range(1, self._max_octets + 1):
+                dot = ip.find(".", dot + 1)
+                if dot < 0:
+                    break
+                if n in self._octet_counts and ip[:dot + 1] in self._prefixes:
+                    return True
+        if self._masked:
+            try:
+                value = int(ipaddress.IPv4Address(ip))
+            except ValueError:
+                return False
+            for prefixlen, networks in self._masked.items():
+                if (value >> (32 - prefixlen)) << (32 - prefixlen) in networks:
+                    return True
+        return False
+
+
+class BlocklistIndex:
+    """Typed lookup structures over `blocked_entities`."""
+
+    def __init__(self):
+        self.imei = set()
+        self.mobile = set()
+        self.utr = set()
+        self.account = set()
+        self.ip = IPPrefixSet()
+        self.last_id = None
+
+    def __len__(self):
+        return len(self.imei) + len(self.mobile) + len(self.utr) + len(self.account) + len(self.ip)
+
+    @property
+    def version(self):
+        """Changes whenever entries are added (newer last_id) or removed (smaller rebuild)."""
+        return f"{self.last_id}:{len(self)}"
+
+    def add(self, type_, value):
+        kind = TYPE_ALIASES.get(str(type_).replace("_", "").replace(" ", "").lower())
+        value = str(value).strip()
+        if not kind or not value:
+            return False
+        if kind == "ip":
+            try:
+                self.ip.add(value)
+            except ValueError:
+                return False
+        else:
+            getattr(self, kind).add(value)
+        return True
+
+    def match(self, txn):
+        """First blocked (kind, value) on the transaction, or None."""
+        if self.imei:
+            meta = txn.get("metaData")
+            imei = txn.get("imeiNumber") or (meta.get("imeiNumber") if isinstance(meta, DOC_TYPES) else None)
+            if imei and imei in self.imei:
+                return "imei", imei
+        if self.mobile:
+            mobile = txn.get("mobileNumber")
+            if mobile and mobile in self.mobile:
+                return "mobile", mobile
+        if self.utr:
+            utr = txn.get("vendorUtrNumber")
+            if utr and utr in self.utr:
+                return "utr", utr
+        if self.account:
+            benef = txn.get("moneyTransferBeneficiaryDetails")
+            if isinstance(benef, DOC_TYPES):
+                acct = benef.get("accountNumber") or ""
+                for value in (acct, acct + (benef.get("ifsc") or "")):
+                    if value and value in self.account:
+                        return "account", value
+        if self.ip:
+            meta = txn.get("metaData")
+            ip = txn.get("ipAddress") or (meta.get("ipAddress") if isinstance(meta, DOC_TYPES) else None)
+            if isinstance(ip, str) and ip and ip in self.ip:
+                return "ip", ip
+        return None
+
+    def load(self, docs):
+        for doc in docs:
+            self.add(doc.get("type", ""), doc.get("value", ""))
+            if self.last_id is None or doc["_id"] > self.last_id:
+                self.last_id = doc["_id"]
+        return self
+
+
+_index = BlocklistIndex()
+_refresh_lock = threading.Lock()
+
+
+def get_blocklist():
+    return _index
+
+
+def refresh_blocklist(full=False):
+    """Pull new blocked_entities rows into the live index (or rebuild it to pick up deletes)."""
+    global _index
+    projection = {"type": 1, "value": 1}  # never pull attachments
+    with _refresh_lock:
+        col = get_db()["blocked_entities"]
+        if full or _index.last_id is None:
+            _index = BlocklistIndex().load(col.find({}, projection).sort("_id", 1))
+        else:
+            _index.load(col.find({"_id": {"$gt": _index.last_id}}, projection).sort("_id", 1))
+    return len(_index)
+
+
+def run_refresher(stop_event):
+    """Background loop: incremental refresh every few seconds, full rebuild now and then."""
+    last_full = 0.0
+    while not stop_event.is_set():
+        full = time.monotonic() - last_full >= BLOCKLIST_FULL_RELOAD_SECONDS
+        try:
+            refresh_blocklist(full=full)
+            if full:
+                last_full = time.monotonic()
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Blocklist refresh failed: {e}")
+        stop_event.wait(BLOCKLIST_REFRESH_SECONDS)
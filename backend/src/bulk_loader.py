@@ -0,0 +1,290 @@
+# fraud_ai_system/backend/src/bulk_loader.py
+"""Streaming, resumable bulk loader for large transaction dumps.
+
+The dump (a JSON array or NDJSON, optionally gzipped) is read in
+LOADER_READ_BYTES blocks and split into records by ingest.RecordStream,
+so memory stays flat whatever the file size. Records are grouped into
+chunks that a thread pool writes with bulk_insert_transactions (ids are
+normalized and duplicates counted there). With scoring on, each chunk is
+first scored on a ScoringExecutor and flagged rows are queued on the
+flagged writer.
+
+Progress is checkpointed as the byte offset just past the last record
+whose chunk, and every chunk before it, is written. A rerun seeks there
+and carries on. Writes are idempotent on transactionId, so a chunk that
+was in flight when the run stopped is counted as duplicates on resume,
+never stored twice.
+"""
+import gzip
+import json
+import logging
+import mmap
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fraud_ai_system.backend.src.db_handler import INGEST_CHUNK_SIZE, bulk_insert_transactions
+from fraud_ai_system.backend.src.ingest import INGEST_MAX_RECORD_BYTES, CompiledValidator, RecordStream
+
+logger = logging.getLogger(__name__)
+
+LOADER_READ_BYTES = int(os.getenv("LOADER_READ_BYTES", str(1024 * 1024)))
+LOADER_WRITERS = int(os.getenv("LOADER_WRITERS", "4"))
+LOADER_CHECKPOINT_SECONDS = float(os.getenv("LOADER_CHECKPOINT_SECONDS", "5"))
+LOADER_PROGRESS_SECONDS = float(os.getenv("LOADER_PROGRESS_SECONDS", "5"))
+# Rejected records kept in the report; the rest are only counted
+LOADER_MAX_ERRORS = int(os.getenv("LOADER_MAX_ERRORS", "100"))
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_input(path, use_mmap=False):
+    """Seekable binary reader over a dump; gzip is detected from its magic bytes.
+
+    With `use_mmap` the file is memory-mapped instead of read through a
+    buffered file object (offsets then index the page cache directly).
+    """
+    f = open(path, "rb")
+    source = f
+    if use_mmap and os.fstat(f.fileno()).st_size:
+        source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+    magic = source.read(2)
+    source.seek(0)
+    if magic == GZIP_MAGIC:
+        # Offsets are into the decompressed stream; GzipFile.seek replays forward to them
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    return source
+
+
+class LoadCheckpoint:
+    """Resume point for one dump, kept as JSON next to it (or at `path`).
+
+    Tied to the dump's size and mtime: a checkpoint written for another
+    version of the file is ignored.
+    """
+
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path or f"{source}.ckpt"
+
+    def _identity(self):
+        stat = os.stat(self.source)
+        return {"source": os.path.abspath(self.source), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if {k: state.get(k) for k in ("source", "size", "mtime")} != self._identity():
+            logger.warning(f"⚠️ Ignoring checkpoint {self.path}: it was written for a different file")
+            return None
+        return state
+
+    def save(self, offset, index, fmt):
+        state = {**self._identity(), "offset": offset, "index": index, "format": fmt,
+                 "saved_at": time.time()}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class BulkLoader:
+    """Loads one dump into `collection`; see the module docstring.
+
+    `writers` chunks are written concurrently and at most twice that many
+    are buffered, which bounds memory. `validate` checks records against
+    db_model.Transaction first (rejected ones are counted and listed).
+    `score_workers` > 0 scores each chunk on a process pool of that size
+    before it is written.
+    """
+
+    def __init__(self, path, collection="transactions", chunk_size=INGEST_CHUNK_SIZE,
+                 writers=LOADER_WRITERS, validate=False, score_workers=0, use_mmap=False,
+                 checkpoint_path=None, resume=True, read_bytes=LOADER_READ_BYTES,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.path = path
+        self.collection = collection
+        self.chunk_size = max(1, chunk_size)
+        self.writers = max(1, writers)
+        self.validator = CompiledValidator() if validate else None
+        self.score_workers = score_workers
+        self.use_mmap = use_mmap
+        self.checkpoint = LoadCheckpoint(path, checkpoint_path) if checkpoint_path is not False else None
+        self.resume = resume
+        self.read_bytes = read_bytes
+        self.progress = progress or (lambda stats: logger.info(
+            f"🔄 {stats['records']} records, {stats['mb']:.1f} MB, {stats['records_per_sec']:,.0f} rec/s"))
+
+        self.stats = {"records": 0, "inserted": 0, "duplicates": 0, "failed": 0, "invalid": 0,
+                      "flagged": 0, "errors": [], "resumed_from": 0}
+        self._scorer = None
+        self._committed = None         # (offset, next index) of the last fully written chunk
+        self._started = None
+        self._offset = 0
+
+    # ---------- writers ----------
+    def _write(self, docs, histories):
+        flagged = 0
+        if self._scorer is not None:
+            from fraud_ai_system.backend.src.flagged_writer import get_flagged_writer
+            from fraud_ai_system.backend.src.history_store import get_history_store
+            _, verdicts = self._scorer.submit_score(docs, histories).result()
+            get_history_store().record_results(docs, [v or {} for v in verdicts])
+            writer = get_flagged_writer()
+            for txn, verdict in zip(docs, verdicts):
+                if verdict and (verdict["status"] == "fraudulent" or verdict.get("ml_prediction") == 1):
+                    flagged += writer.add(dict(txn), verdict)
+        counts = bulk_insert_transactions(docs, collection=self.collection, chunk_size=self.chunk_size)
+        return counts, flagged
+
+    def _collect(self, pending):
+        """Account for the oldest chunk; it stays queued if its write failed."""
+        future, offset, index = pending[0]
+        counts, flagged = future.result()
+        pending.popleft()
+        for key in ("inserted", "duplicates", "failed"):
+            self.stats[key] += counts[key]
+        self.stats["flagged"] += flagged
+        self._committed = (offset, index)
+
+    def _save_checkpoint(self, fmt):
+        if self.checkpoint is None or self._committed is None:
+            return
+        if self._scorer is not None:
+            from fraud_ai_system.backend.src.flagged_writer import get_flagged_writer
+            get_flagged_writer().flush()  # flagged rows must be stored before the offset moves past them
+        self.checkpoint.save(*self._committed, fmt)
+
+    def _report_progress(self):
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        read = self._offset - self.stats["resumed_from"]
+        self.progress({**{k: v for k, v in self.stats.items() if k != "errors"},
+                       "offset": self._offset, "mb": read / 1e6, "seconds": elapsed,
+                       "records_per_sec": self.stats["records"] / elapsed, "mb_per_sec": read / 1e6 / elapsed})
+
+    # ---------- main loop ----------
+    def _reject(self, index, raw, errors):
+        self.stats["invalid"] += 1
+        if len(self.stats["errors"]) < LOADER_MAX_ERRORS:
+            txn_id = raw.get("transactionId") if isinstance(raw, dict) else None
+            self.stats["errors"].append({"index": index, "transactionId": txn_id, "errors": errors})
+
+    def run(self) -> Dict[str, Any]:
+        state = self.checkpoint.load() if self.checkpoint is not None and self.resume else None
+        source = open_input(self.path, self.use_mmap)
+        if state:
+            source.seek(state["offset"])
+            stream = RecordStream(INGEST_MAX_RECORD_BYTES, resume=(state["offset"], state["index"], state["format"]))
+            self.stats["resumed_from"] = self._offset = state["offset"]
+            logger.info(f"🔁 Resuming {self.path} at byte {state['offset']} (record {state['index']})")
+        else:
+            stream = RecordStream(INGEST_MAX_RECORD_BYTES)
+
+        history = None
+        if self.score_workers:
+            from fraud_ai_system.backend.src.blocklist import refresh_blocklist
+            from fraud_ai_system.backend.src.history_store import get_history_store
+            from fraud_ai_system.backend.src.model_registry import get_registry
+            from fraud_ai_system.backend.src.scoring_executor import ScoringExecutor
+            refresh_blocklist(full=True)
+            get_registry().get()
+            history = get_history_store()
+            self._scorer = ScoringExecutor("process", self.score_workers, queue_size=2 * self.writers)
+
+        pool = ThreadPoolExecutor(max_workers=self.writers, thread_name_prefix="loader")
+        pending = deque()              # chunks in submission order
+        batch = []
+        self._started = time.perf_counter()
+        last_checkpoint = last_progress = time.monotonic()
+
+        def submit(offset, index):
+            nonlocal batch
+            histories = history.histories_for(batch) if history is not None else None
+            pending.append((pool.submit(self._write, batch, histories), offset, index))
+            batch = []
+            # Commit finished chunks in order; block on the oldest when too many are in flight
+            while pending and (pending[0][0].done() or len(pending) > 2 * self.writers):
+                self._collect(pending)
+
+        try:
+            offset, next_index = self._offset, stream.index
+            while not stream.done:
+                chunk = source.read(self.read_bytes)
+                records = stream.feed(chunk) if chunk else stream.close()
+                for index, raw, error, offset in records:
+                    self.stats["records"] += 1
+                    next_index = index + 1
+                    if error:
+                        self._reject(index, raw, [{"loc": "", "type": "json_invalid", "msg": error}])
+                    elif self.validator is not None:
+                        doc, errors = self.validator(raw)
+                        if doc is None:
+                            self._reject(index, raw, errors)
+                        else:
+                            batch.append(doc)
+                    elif isinstance(raw, dict):
+                        batch.append(raw)
+                    else:
+                        self._reject(index, raw, [{"loc": "", "type": "dict_type", "msg": "Record is not an object"}])
+                    if len(batch) >= self.chunk_size:
+                        submit(offset, next_index)
+                self._offset = offset
+                if not chunk:
+                    break
+
+                now = time.monotonic()
+                if now - last_checkpoint >= LOADER_CHECKPOINT_SECONDS:
+                    self._save_checkpoint(stream.format)
+                    last_checkpoint = now
+                if now - last_progress >= LOADER_PROGRESS_SECONDS:
+                    self._report_progress()
+                    last_progress = now
+            if batch:
+                submit(self._offset, next_index)
+            while pending:
+                self._collect(pending)
+        except BaseException:
+            # Interrupted (or a write failed): keep everything that did land, then resume from there
+            for entry in pending:
+                entry[0].cancel()
+            while pending and not pending[0][0].cancelled():
+                try:
+                    self._collect(pending)
+                except BaseException:
+                    break              # the checkpoint may not move past a chunk that was not written
+            self._save_checkpoint(stream.format)
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            if self._scorer is not None:
+                self._scorer.shutdown()
+            source.close()
+
+        if self._scorer is not None:
+            from fraud_ai_system.backend.src.flagged_writer import get_flagged_writer
+            get_flagged_writer().flush()
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        self._report_progress()
+        elapsed = time.perf_counter() - self._started
+        return {**self.stats, "seconds": elapsed,
+                "records_per_sec": self.stats["records"] / elapsed if elapsed else None}
+
+
+def load_file(path, **kwargs) -> Dict[str, Any]:
+    return BulkLoader(path, **kwargs).run()
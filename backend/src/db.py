@@ -1,15 +1,178 @@
 import os
+import logging
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
-print("DEBUG MONGODB_URI =", os.getenv("MONGODB_URI"))  # Check if it's loaded properly
+logger = logging.getLogger(__name__)
+logger.debug("MONGODB_URI is %s", "set" if os.getenv("MONGODB_URI") else "not set")
+
+DB_NAME = os.getenv("MONGODB_DB", "transaction")
+# Scoring reads decode documents as RawBSONDocument: a field becomes a Python object only when read
+SCORING_LAZY_DECODE = os.getenv("SCORING_LAZY_DECODE", "false").lower() in ("1", "true", "yes")
+
+_client = None
+_client_lock = threading.Lock()
+_executor = None
+
+
+def client_options() -> dict:
+    """Pool / timeout settings for the shared client, read from the environment."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+        "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+    }
+
+
+def init_client(client=None):
+    """Create the process-wide client once (or install a given one, e.g. mongomock)."""
+    global _client
+    with _client_lock:
+        if client is not None:
+            _client = client
+        elif _client is None:
+            mongodb_uri = os.getenv("MONGODB_URI")
+            if not mongodb_uri:
+                raise Exception("MONGODB_URI not set in environment variables")
+            _client = MongoClient(mongodb_uri, **client_options())
+        return _client
+
+
+def get_client():
+    return _client if _client is not None else init_client()
+
+
+def close_client():
+    """Close the shared client and the async executor; safe to call twice."""
+    global _client, _executor
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
 
 def get_db():
-    mongodb_uri = os.getenv("MONGODB_URI")
-    if not mongodb_uri:
-        raise Exception("MONGODB_URI not set in environment variables")
+    return get_client()[DB_NAME]
+
+
+def scoring_collection(collection, lazy=None):
+    """`collection` as the scoring read path uses it: lazily decoded when SCORING_LAZY_DECODE is set."""
+    if not (SCORING_LAZY_DECODE if lazy is None else lazy):
+        return collection
+    options = collection.codec_options.with_options(document_class=RawBSONDocument)
+    return collection.with_options(codec_options=options)
+
+
+# ---------- async access ----------------------------------------------------
+# Motor-style facade over the shared pymongo pool: blocking calls run on a
+# dedicated thread pool so `async def` handlers never block the event loop,
+# and the same code works against mongomock in tests.
+
+def _get_executor():
+    global _executor
+    with _client_lock:
+        if _executor is None:
+            workers = int(os.getenv("MONGO_ASYNC_WORKERS", os.getenv("MONGO_MAX_POOL_SIZE", "50")))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mongo-io")
+        return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking pymongo call (or helper built on one) off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    def skip(self, n):
+        self._cursor = self._cursor.skip(n)
+        return self
+
+    def batch_size(self, n):
+        self._cursor = self._cursor.batch_size(n)
+        return self
+
+    def _take(self, length):
+        if length is None:
+            return list(self._cursor)
+        docs = []
+        for doc in self._cursor:
+            docs.append(doc)
+            if len(docs) >= length:
+                break
+        return docs
+
+    async def to_list(self, length=None):
+        return await run_blocking(self._take, length)
+
+    async def __aiter__(self):
+        while True:
+            docs = await self.to_list(100)
+            for doc in docs:
+                yield doc
+            if len(docs) < 100:
+                return
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self.delegate = collection
+
+    @property
+    def name(self):
+        return self.delegate.name
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.delegate.find(*args, **kwargs))
+
+    def with_options(self, **kwargs):
+        return AsyncCollection(self.delegate.with_options(**kwargs))
+
+    def __getattr__(self, method):
+        fn = getattr(self.delegate, method)
+        if not callable(fn):
+            return fn
+
+        async def call(*args, **kwargs):
+            return await run_blocking(fn, *args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self.delegate = db
+
+    @property
+    def name(self):
+        return self.delegate.name
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.delegate[name])
+
 
-    client = MongoClient(mongodb_uri)
-    db = client["transaction"]
-    return db
+def get_async_db():
+    return AsyncDatabase(get_db())
@@ -1,140 +1,203 @@
-import json
+import logging
 import os
+import re
 from datetime import datetime
-from pymongo.errors import PyMongoError
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.indexes import txn_id_index
+from fraud_ai_system.backend.src.metrics import STAGE_SECONDS
+from fraud_ai_system.backend.src.utils import (
+    NAME_NORM_FIELD, SCAN_BUCKET_FIELD, TXN_ID_FIELD, chunked, log_sampled, normalize_name,
+    normalize_txn_id, scan_bucket,
+)
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+DUPLICATE_KEY = 11000
+
+_indexed_collections = set()
+
+
+def ensure_txn_id_index(col):
+    """Unique index on the canonical transaction id, created once per collection per process."""
+    if col.full_name in _indexed_collections:
+        return
+    spec = txn_id_index(col.name)
+    try:
+        col.create_index(list(spec.keys), name=spec.name, **spec.options)
+    except OperationFailure as e:
+        # Existing duplicates block the index; ingest still works, dedup is just best-effort
+        logger.warning(f"⚠️ Could not create unique {TXN_ID_FIELD} index on {col.full_name}: {e}")
+    _indexed_collections.add(col.full_name)
+
+
+RISK_LEVEL_RANGES = {
+    "low": {"$lte": 0.3},
+    "medium": {"$gt": 0.3, "$lte": 0.7},
+    "high": {"$gt": 0.7},
+}
+
+
+def transaction_query(name: str = None, is_fraud: bool = None, risk_level: str = None) -> dict:
+    """Filter for the transaction list/search endpoints, shaped to use the declared indexes.
+
+    `name` matches as a case-insensitive prefix of the normalized name: an
+    anchored, case-sensitive regex on nameNorm, which the server turns into
+    a range scan of the name_prefix index.
+    """
+    query = {}
+    if name:
+        prefix = normalize_name(name)
+        if prefix:
+            query[NAME_NORM_FIELD] = {"$regex": "^" + re.escape(prefix)}
+    if is_fraud is not None:
+        query["is_fraud"] = is_fraud
+    if risk_level in RISK_LEVEL_RANGES:
+        query["risk_score"] = RISK_LEVEL_RANGES[risk_level]
+    return query
 
 
 def fetch_transactions(limit: int = 100, name: str = None, is_fraud: bool = None, risk_level: str = None) -> list:
     try:
         db = get_db()
         predict_col = db["predict"]
-        print("logging predict col", predict_col)
-        print("Connected DB:", db.name)  # should be 'Xhibit'
-        print("Collection name:", predict_col.name)  # should be 'predict'
+        query = transaction_query(name, is_fraud, risk_level)
 
-        query = {}
+        with STAGE_SECONDS.time("fetch"):
+            transactions = list(predict_col.find(query).sort("timestamp", -1).limit(limit))
+        logger.debug("✅ Fetched %d filtered transactions from DB.", len(transactions))
+        return transactions
+    except PyMongoError as e:
+        logger.error(f"❌ Error fetching filtered transactions: {e}")
+        return []
 
-        if name:
-            query["name"] = {"$regex": name, "$options": "i"}
 
-        if is_fraud is not None:
-            query["is_fraud"] = is_fraud
+def full_documents(col, docs):
+    """Stored documents for `docs` read with a projection, in order.
 
-        if risk_level:
-            if risk_level == "low":
-                query["risk_score"] = {"$lte": 0.3}
-            elif risk_level == "medium":
-                query["risk_score"] = {"$gt": 0.3, "$lte": 0.7}
-            elif risk_level == "high":
-                query["risk_score"] = {"$gt": 0.7}
+    A document deleted since it was read comes back as a plain dict of
+    the projected fields.
+    """
+    found = {doc["_id"]: doc for doc in col.find({"_id": {"$in": [doc["_id"] for doc in docs]}})}
+    return [found.get(doc["_id"]) or dict(doc) for doc in docs]
 
-        transactions = list(predict_col.find(query).sort("timestamp", -1).limit(limit))
-        print(f"✅ Fetched {len(transactions)} filtered transactions from DB.")
-        return transactions
-    except PyMongoError as e:
-        print(f"❌ Error fetching filtered transactions: {e}")
-        return []
 
+def fraud_document(txn, result):
+    """fraud_data row for a transaction and the result it was scored with."""
+    doc = {**txn, **result}
+    doc["is_fraud"]     = bool(result.get("rules_flagged", False) or result.get("ml_prediction", 0)
+                               or result.get("status") == "fraudulent")
+    doc["risk_score"]   = result.get("risk_score", 0.0)
+    doc["reasons"]      = result.get("reasons", [])
+    doc["triggers"]     = result.get("triggers", [])
+    doc["inserted_at"]  = datetime.utcnow()
+    return doc
 
-def save_suspicious_transaction(txn):
+
+def save_suspicious_transaction(txn, result=None):
+    """Store one flagged transaction unless its transactionId is already in fraud_data.
+
+    Pass the `result` the caller scored it with; without one the
+    transaction is scored here. Bulk paths use flagged_writer instead.
+    """
     try:
         db = get_db()
         fraud_data_col = db["fraud_data"]
-        txn_id = txn.get("transaction_id") or txn.get("transactionId")
+        txn_id = normalize_txn_id(txn)
         if not txn_id:
-            print("⚠️ Transaction missing 'transaction_id'. Skipping.")
-            return
-
-        existing = fraud_data_col.find_one({"transaction_id": txn_id})
-        if existing:
-            print(f"ℹ️ Transaction {txn_id} already exists. Skipping.")
+            log_sampled(logger, logging.WARNING, "⚠️ Transaction missing 'transactionId'. Skipping.")
             return
 
-        # 🔍 Run fraud analysis using your updated engine
-        from fraud_ai_system.backend.src.apply_rules import process_transaction
-        from fraud_ai_system.backend.src.ml_model import predict
-        fraud_result = process_transaction(txn, model=None)  # Load actual model if needed
-
-        txn["is_fraud"]     = fraud_result.get("rules_flagged", False) or fraud_result.get("ml_prediction", 0)
-        txn["risk_score"]   = fraud_result.get("risk_score", 0.0)
-        txn["reasons"]      = fraud_result.get("reasons", [])
-        txn["triggers"]     = fraud_result.get("triggers", [])  # ✅ Main Update
-        txn["inserted_at"]  = datetime.utcnow()
+        if result is None:
+            from fraud_ai_system.backend.src.apply_rules import process_transaction
+            from fraud_ai_system.backend.src.model_registry import get_model
+            result = process_transaction(txn, model=get_model())
 
-        fraud_data_col.insert_one(txn)
-        print(f"✅ Suspicious transaction saved: {txn_id}")
+        ensure_txn_id_index(fraud_data_col)
+        with STAGE_SECONDS.time("mongo_write"):
+            outcome = fraud_data_col.update_one(
+                {TXN_ID_FIELD: txn_id}, {"$setOnInsert": fraud_document(txn, result)}, upsert=True)
+        if outcome.upserted_id is None:
+            log_sampled(logger, logging.DEBUG, "ℹ️ Transaction %s already exists. Skipping.", txn_id)
+        else:
+            log_sampled(logger, logging.INFO, "✅ Suspicious transaction saved: %s", txn_id)
 
     except PyMongoError as e:
-        print(f"❌ Failed to insert suspicious transaction: {e}")
-
-        print(f"❌ Failed to insert suspicious transaction: {e}")
+        logger.error(f"❌ Failed to insert suspicious transaction: {e}")
 
 
 def load_data_from_file(file_path="fraud_ai_system/data/transactions.json"):
+    # Streamed (JSON array or NDJSON, optionally gzipped) so large files never sit in memory
+    from fraud_ai_system.backend.src.bulk_loader import BulkLoader
     try:
-        db = get_db()
-        predict_col = db["predict"]
+        logger.info("🔄 Loading transactions from %s", file_path)
 
-        # Fetch and log some documents
-        print("🔄 Scanning for new transactions...")
-        
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"📁 File not found: {file_path}")
 
-        with open(file_path, "r") as f:
-            transactions = json.load(f)
-
-        if not isinstance(transactions, list):
-            raise ValueError("❌ JSON must contain a list of transactions.")
+        report = BulkLoader(file_path, collection="predict", checkpoint_path=False).run()
+        if report["invalid"]:
+            logger.warning(f"⚠️ Skipped {report['invalid']} unreadable records in {file_path}")
 
-        inserted = 0
-        for txn in transactions:
-            txn_id = txn.get("transaction_id") or txn.get("transactionId")
-            if not txn_id or predict_col.find_one({"transaction_id": txn_id}):
-                continue
-            predict_col.insert_one(txn)
-            inserted += 1
-
-        print(f"✅ Inserted {inserted} new transactions from file.")
+        inserted = report["inserted"]
+        logger.info(f"✅ Inserted {inserted} new transactions from file.")
         return inserted
 
-    except (json.JSONDecodeError, FileNotFoundError, ValueError, PyMongoError) as e:
-        print(f"❌ Error loading data from file: {e}")
+    except (FileNotFoundError, OSError, PyMongoError) as e:
+        logger.error(f"❌ Error loading data from file: {e}")
         return 0
 
 
-def insert_transactions(txns):
-    try:
-        db = get_db()
-        predict_col = db["predict"]
-        print("logging predict col",predict_col)
-        inserted = 0
-
-        for txn in txns:
-            txn_id = txn.get("transaction_id") or txn.get("transactionId")
-            if not txn_id:
-                print("⚠️ Skipping transaction with missing transactionId")
-                continue
-
-            existing = predict_col.find_one({"transactionId": txn_id})
-            if existing:
-                print(f"ℹ️ Transaction {txn_id} already exists in DB. Skipping.")
-                continue
-
-            try:
-                result = predict_col.insert_one(txn)
-                if result.inserted_id:
-                    inserted += 1
-                    print(f"✅ Inserted transaction {txn_id} with id {result.inserted_id}")
+def bulk_insert_transactions(txns, collection="predict", chunk_size=INGEST_CHUNK_SIZE) -> dict:
+    """Idempotent bulk ingest.
+
+    Relies on the unique transactionId index instead of a find_one per
+    document: each chunk goes out as one unordered insert_many and
+    duplicate-key errors are counted rather than raised. Each document is
+    stamped with its _scanBucket so scan shards can split the collection,
+    and with nameNorm for indexed name search.
+    """
+    counts = {"inserted": 0, "duplicates": 0, "failed": 0}
+    col = get_db()[collection]
+    ensure_txn_id_index(col)
+
+    def with_id(docs):
+        for txn in docs:
+            txn_id = normalize_txn_id(txn)
+            if txn_id:
+                txn[SCAN_BUCKET_FIELD] = scan_bucket(txn_id)
+                if isinstance(txn.get("name"), str):
+                    txn[NAME_NORM_FIELD] = normalize_name(txn["name"])
+                yield txn
+            else:
+                counts["failed"] += 1
+
+    for chunk in chunked(with_id(txns), chunk_size):
+        try:
+            with STAGE_SECONDS.time("mongo_write"):
+                result = col.insert_many(chunk, ordered=False)
+            counts["inserted"] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            counts["inserted"] += details.get("nInserted", 0)
+            for err in details.get("writeErrors", []):
+                if err.get("code") == DUPLICATE_KEY:
+                    counts["duplicates"] += 1
                 else:
-                    print(f"❌ Failed to insert transaction {txn_id} (no inserted_id returned)")
-            except Exception as e:
-                print(f"❌ Exception inserting transaction {txn_id}: {e}")
+                    counts["failed"] += 1
+        except PyMongoError as e:
+            logger.error(f"❌ Bulk insert of {len(chunk)} transactions failed: {e}")
+            counts["failed"] += len(chunk)
 
-        print(f"Total inserted: {inserted}")
-        return inserted
+    if counts["duplicates"] or counts["failed"]:
+        logger.info(f"ℹ️ Ingest into {collection}: {counts}")
+    return counts
 
+
+def insert_transactions(txns):
+    try:
+        return bulk_insert_transactions(txns)["inserted"]
     except Exception as e:
-        print(f"❌ insert_transactions encountered an error: {e}")
+        logger.error(f"❌ insert_transactions encountered an error: {e}")
         return 0
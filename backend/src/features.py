@@ -0,0 +1,338 @@
+# fraud_ai_system/backend/src/features.py
+"""Single feature spec shared by the rule engine and the model.
+
+Every raw field scoring reads is declared once in FEATURES: where it lives
+in the document (first present path wins, same as txn.get(key, fallback))
+and how it is converted. compile_features() turns a subset of the spec
+into one extraction pass, and extract_batch() lays the result out as a
+FeatureBatch of columns that apply_rules_batch and predict_batch both read,
+so a transaction is walked and its timestamps parsed once per score.
+
+Documents may be plain dicts or lazily decoded RawBSONDocuments: anything
+that walks them accepts any Mapping. SCORING_PROJECTION is the Mongo
+projection covering every field scoring reads.
+"""
+import os
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f")
+# Distinct timestamp strings kept parsed across batches
+TS_CACHE_SIZE = int(os.getenv("TS_CACHE_SIZE", "65536"))
+
+_MISSING = object()
+# Plain dicts first so the common case never reaches the ABC check
+DOC_TYPES = (dict, Mapping)
+
+# ---------- timestamp parsing -----------------------------------------------
+_DIGITS = frozenset("0123456789")
+
+def _fast_iso(ts_raw: str) -> datetime | None:
+    """fromisoformat for strings laid out exactly like one of TS_FORMATS.
+
+    Only fixed-width, zero-padded inputs take this path, where the result
+    is the same as strptime's; anything else goes through strptime.
+    """
+    n = len(ts_raw)
+    if n == 19:
+        sep = " "
+    elif n == 26 and ts_raw[19] == ".":
+        sep = "T"
+    else:
+        return None
+    if ts_raw[4] != "-" or ts_raw[7] != "-" or ts_raw[10] != sep or ts_raw[13] != ":" or ts_raw[16] != ":":
+        return None
+    if not _DIGITS.issuperset(ts_raw[0:4] + ts_raw[5:7] + ts_raw[8:10] + ts_raw[11:13]
+                              + ts_raw[14:16] + ts_raw[17:19] + ts_raw[20:]):
+        return None
+    try:
+        return datetime.fromisoformat(ts_raw)
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=TS_CACHE_SIZE)
+def _parse_ts_str(ts_raw: str) -> datetime | None:
+    dt = _fast_iso(ts_raw)
+    if dt is not None:
+        return dt
+    for fmt in TS_FORMATS:
+        try:
+            return datetime.strptime(ts_raw, fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_ts_raw(ts_raw: Any) -> datetime | None:
+    """Event timestamp in one of TS_FORMATS (or a BSON date) → naive datetime."""
+    if not ts_raw:
+        return None
+    if isinstance(ts_raw, str):
+        return _parse_ts_str(ts_raw)
+    if isinstance(ts_raw, datetime):
+        return ts_raw
+    return None
+
+@lru_cache(maxsize=TS_CACHE_SIZE)
+def _parse_iso_str(value: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+def parse_created_at(value: Any) -> datetime | None:
+    """Record creation time: ISO string, BSON date, or Extended JSON {"$date": ...}."""
+    if isinstance(value, DOC_TYPES):
+        value = value.get("$date")
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        return _parse_iso_str(value)
+    return None
+
+def to_amount(value: Any) -> float:
+    """Lenient float for the model's amount: unwraps {"value"/"amount"/"$numberDecimal"}, else 0.0."""
+    if isinstance(value, DOC_TYPES):
+        value = value.get("value") or value.get("amount") or value.get("$numberDecimal")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+# ---------- spec ------------------------------------------------------------
+class Feature(NamedTuple):
+    name: str
+    paths: Tuple[tuple, ...] = ()          # candidate paths, first whose key is present wins
+    convert: Optional[Callable] = None     # applied to the raw value (or to `inputs`)
+    default: Any = None                    # used when no path is present
+    inputs: Tuple[str, ...] = ()           # derived feature: convert(*earlier features)
+
+def _geo(value, lat, lon, fallback):
+    # lat/long are taken together: one missing means both come from `location`
+    return float(value if lat is not None and lon is not None else fallback)
+
+def _lenient_geo(value, lat, lon, fallback):
+    """_geo, but a coordinate that is not a number is nan (no location) instead of an error."""
+    try:
+        return _geo(value, lat, lon, fallback)
+    except (TypeError, ValueError):
+        return float("nan")
+
+FEATURES = (
+    # wallet / amounts (rules 1, 3, 4)
+    Feature("amount", (("partnerDetails", "amount"),), float, 0),
+    Feature("debit", (("partnerDetails", "debit"),), float, 0),
+    Feature("credit", (("partnerDetails", "credit"),), float, 0),
+    Feature("tds", (("partnerDetails", "TDS"),), float, 0),
+    Feature("old_bal", (("adminDetails", "oldMainWalletBalance"),), float, 0),
+    Feature("new_bal", (("adminDetails", "newMainWalletBalance"),), float, 0),
+    Feature("wallet_gap", convert=lambda old, debit, credit, tds, new: abs((old - debit + credit - tds) - new),
+            inputs=("old_bal", "debit", "credit", "tds", "new_bal")),
+    # identifiers (rules 5, 6, 7, 9)
+    Feature("ip", (("ipAddress",), ("metaData", "ipAddress")), default=""),
+    Feature("imei", (("imeiNumber",), ("metaData", "imeiNumber")), default=""),
+    Feature("utr", (("vendorUtrNumber",),), default=""),
+    Feature("benef_account", (("moneyTransferBeneficiaryDetails", "accountNumber"),), default=""),
+    Feature("benef_ifsc", (("moneyTransferBeneficiaryDetails", "ifsc"),), default=""),
+    Feature("benef_acct", convert=lambda account, ifsc: f"{account or ''}{ifsc or ''}",
+            inputs=("benef_account", "benef_ifsc")),
+    # geo (rule 8)
+    Feature("raw_lat", (("lat",),)),
+    Feature("raw_lon", (("long",),)),
+    Feature("loc_lat", (("location", "latitude"),), default=0.0),
+    Feature("loc_lon", (("location", "longitude"),), default=0.0),
+    Feature("lat", convert=lambda lat, lon, loc: _geo(lat, lat, lon, loc),
+            inputs=("raw_lat", "raw_lon", "loc_lat")),
+    Feature("lon", convert=lambda lat, lon, loc: _geo(lon, lat, lon, loc),
+            inputs=("raw_lat", "raw_lon", "loc_lon")),
+    # event time (rules 2, 3): explicit field, else first checkStatus entry
+    Feature("raw_ts", (("timestamp",),)),
+    Feature("raw_check_ts", (("checkStatus", 0, "date"),)),
+    Feature("dt", convert=lambda ts, check_ts: parse_ts_raw(ts or check_ts),
+            inputs=("raw_ts", "raw_check_ts")),
+    Feature("hour", convert=lambda dt: dt.hour if dt else -1, inputs=("dt",)),
+    # model inputs: top-level amount and creation hour
+    Feature("txn_amount", (("amount",),), to_amount, 0.0),
+    # history signals (velocity.py, geo.py): a bad value counts as 0 / no location, it never fails the batch
+    Feature("signal_amount", (("partnerDetails", "amount"),), to_amount, 0.0),
+    Feature("signal_lat", convert=lambda lat, lon, loc: _lenient_geo(lat, lat, lon, loc),
+            inputs=("raw_lat", "raw_lon", "loc_lat")),
+    Feature("signal_lon", convert=lambda lat, lon, loc: _lenient_geo(lon, lat, lon, loc),
+            inputs=("raw_lat", "raw_lon", "loc_lon")),
+    Feature("raw_created_at", (("CreatedAT",),)),
+    Feature("raw_created_at_lc", (("createdAt",),)),
+    Feature("created_at", convert=lambda upper, lower: parse_created_at(upper) or parse_created_at(lower),
+            inputs=("raw_created_at", "raw_created_at_lc")),
+    Feature("created_hour", convert=lambda dt: dt.hour if dt else 0, inputs=("created_at",)),
+)
+
+FEATURES_BY_NAME = {f.name: f for f in FEATURES}
+
+# Columns each consumer reads
+RULE_FEATURES = ("amount", "debit", "credit", "tds", "old_bal", "new_bal", "wallet_gap",
+                 "ip", "imei", "utr", "benef_acct", "lat", "lon", "dt", "hour")
+MODEL_FEATURES = ("amount", "hour")   # model column names, in training order
+MODEL_SOURCES = ("txn_amount", "created_hour")   # the spec features behind them
+
+# Fields scoring reads outside the spec: ids, blocklist and history lookups
+LOOKUP_PATHS = (
+    ("transactionId",), ("transaction_id",), ("mobileNumber",), ("clientRefId",),
+    ("imeiNumber",), ("ipAddress",), ("metaData", "imeiNumber"), ("metaData", "ipAddress"),
+    ("vendorUtrNumber",), ("moneyTransferBeneficiaryDetails", "accountNumber"),
+    ("moneyTransferBeneficiaryDetails", "ifsc"),
+)
+
+def projection(paths) -> Dict[str, int]:
+    """Inclusion projection covering `paths`.
+
+    List indices are dropped, so ("checkStatus", 0, "date") fetches
+    "checkStatus.date" (each entry reduced to its date), and a path under
+    one that is already included is folded into its parent.
+    """
+    fields = sorted({".".join(p for p in path if not isinstance(p, int)) for path in paths})
+    out: Dict[str, int] = {}
+    for field in fields:  # sorted, so a parent is seen before its children
+        if not any(field.startswith(parent + ".") for parent in out):
+            out[field] = 1
+    return out
+
+SCORING_PROJECTION = projection([path for f in FEATURES for path in f.paths] + list(LOOKUP_PATHS))
+
+# ---------- compilation -----------------------------------------------------
+def get_path(doc: Any, path: tuple, default: Any = _MISSING) -> Any:
+    """Walk dict keys and list indices; `default` when any step is absent."""
+    cur = doc
+    for p in path:
+        if isinstance(p, int):
+            if not isinstance(cur, (list, tuple)) or not -len(cur) <= p < len(cur):
+                return default
+        elif not isinstance(cur, DOC_TYPES) or p not in cur:
+            return default
+        cur = cur[p]
+    return cur
+
+def _lookup_source(paths: Tuple[tuple, ...], subdocs: Dict[str, str]) -> list:
+    """Source lines that leave the first present path's value (or _MISSING) in `v`."""
+    lines = []
+    for k, path in enumerate(paths):
+        indent = "    " * k
+        if len(path) == 1:
+            lines.append(f"{indent}v = get({path[0]!r}, _MISSING)")
+        elif len(path) == 2 and not isinstance(path[1], int):
+            sub = subdocs.setdefault(path[0], f"s{len(subdocs)}")
+            lines.append(f"{indent}v = {sub}.get({path[1]!r}, _MISSING) if isinstance({sub}, DOC_TYPES) else _MISSING")
+        else:
+            lines.append(f"{indent}v = _get_path(txn, {path!r})")
+        if k < len(paths) - 1:
+            lines.append(f"{indent}if v is _MISSING:")
+    return lines
+
+class CompiledFeatures:
+    """Extraction plan for a set of features, dependencies included, in spec order.
+
+    The plan is compiled to one Python function that walks each transaction
+    once: shared sub-documents are fetched a single time, dict lookups and
+    converters are inlined per feature, and values go straight into columns.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        needed = set()
+
+        def require(name):
+            if name not in needed:
+                needed.add(name)
+                for dep in FEATURES_BY_NAME[name].inputs:
+                    require(dep)
+        for name in names:
+            require(name)
+
+        self.names = tuple(f.name for f in FEATURES if f.name in needed)
+        slot = {name: i for i, name in enumerate(self.names)}
+        ns: Dict[str, Any] = {"_MISSING": _MISSING, "DOC_TYPES": DOC_TYPES, "_get_path": get_path}
+        subdocs: Dict[str, str] = {}
+        body = []
+        for i, name in enumerate(self.names):
+            f = FEATURES_BY_NAME[name]
+            ns[f"cv{i}"] = f.convert
+            ns[f"d{i}"] = f.default
+            body.append(f"# {name}")
+            if f.inputs:
+                body.append(f"f{i} = cv{i}({', '.join(f'f{slot[dep]}' for dep in f.inputs)})")
+                continue
+            body += _lookup_source(f.paths, subdocs)
+            body.append(f"f{i} = d{i} if v is _MISSING else v")
+            if f.convert is not None:
+                # defaults go through the converter too, e.g. float(0)
+                body.append(f"f{i} = cv{i}(f{i})")
+        prologue = ["get = txn.get"] + [f"{var} = get({key!r})" for key, var in subdocs.items()]
+        loop = prologue + body + [f"a{i}(f{i})" for i in range(len(self.names))]
+        columns = ", ".join(f"c{i}" for i in range(len(self.names)))
+        source = "\n".join(
+            ["def extract(txns):"]
+            + [f"    c{i} = []; a{i} = c{i}.append" for i in range(len(self.names))]
+            + ["    for txn in txns:"]
+            + [f"        {line}" for line in loop]
+            + [f"    return ({columns},)"]
+        )
+        exec(compile(source, f"<features {','.join(names)}>", "exec"), ns)
+        self.source = source
+        self._extract = ns["extract"]
+
+    def row(self, txn: Dict[str, Any]) -> list:
+        """Feature values for one transaction, in self.names order."""
+        return [col[0] for col in self._extract((txn,))]
+
+    def extract(self, txns: Sequence[Dict[str, Any]]) -> "FeatureBatch":
+        return FeatureBatch(len(txns), dict(zip(self.names, self._extract(txns))))
+
+class FeatureBatch:
+    """Columnar features for a batch: Python lists plus cached float64 views."""
+
+    def __init__(self, n: int, columns: Dict[str, list]):
+        self.n = n
+        self.columns = columns
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name: str) -> list:
+        return self.columns[name]
+
+    def array(self, name: str, dtype=np.float64) -> np.ndarray:
+        arr = self._arrays.get(name)
+        if arr is None:
+            arr = self._arrays[name] = np.asarray(self.columns[name], dtype=dtype)
+        return arr
+
+    def matrix(self, names: Sequence[str]) -> np.ndarray:
+        """Contiguous float64 matrix with one column per name."""
+        X = np.empty((self.n, len(names)), dtype=np.float64)
+        for j, name in enumerate(names):
+            X[:, j] = self.array(name)
+        return X
+
+_compiled: Dict[Tuple[str, ...], CompiledFeatures] = {}
+
+def compile_features(names: Sequence[str]) -> CompiledFeatures:
+    key = tuple(names)
+    plan = _compiled.get(key)
+    if plan is None:
+        plan = _compiled[key] = CompiledFeatures(key)
+    return plan
+
+SCORING_FEATURES = RULE_FEATURES + MODEL_SOURCES
+
+def extract_batch(txns: Sequence[Dict[str, Any]], names: Sequence[str] = SCORING_FEATURES) -> FeatureBatch:
+    """One pass over `txns` producing every column the rules and the model read."""
+    return compile_features(names).extract(txns)
+
+def extract_row(txn: Dict[str, Any], names: Sequence[str] = SCORING_FEATURES) -> Dict[str, Any]:
+    plan = compile_features(names)
+    return dict(zip(plan.names, plan.row(txn)))
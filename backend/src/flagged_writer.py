@@ -0,0 +1,215 @@
+# fraud_ai_system/backend/src/flagged_writer.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.db_handler import DUPLICATE_KEY, ensure_txn_id_index, fraud_document
+from fraud_ai_system.backend.src.metrics import FLAGGED_BUFFERED, FLAGGED_FLUSH_FAILURES, FLAGGED_WRITTEN, STAGE_SECONDS
+from fraud_ai_system.backend.src.utils import TXN_ID_FIELD, log_sampled, normalize_txn_id
+
+logger = logging.getLogger(__name__)
+
+FLAGGED_FLUSH_SIZE = int(os.getenv("FLAGGED_FLUSH_SIZE", "500"))
+FLAGGED_FLUSH_SECONDS = float(os.getenv("FLAGGED_FLUSH_SECONDS", "1"))
+# Producers block once this many documents are waiting (e.g. while Mongo is down)
+FLAGGED_MAX_BUFFER = int(os.getenv("FLAGGED_MAX_BUFFER", "20000"))
+FLAGGED_RETRY_MAX_SECONDS = float(os.getenv("FLAGGED_RETRY_MAX_SECONDS", "30"))
+
+
+class FlaggedWriter:
+    """Write-behind buffer for flagged transactions.
+
+    add() queues an already-scored document; a background thread flushes
+    the queue as unordered bulk upserts ($setOnInsert keyed on
+    transactionId) whenever FLAGGED_FLUSH_SIZE documents are waiting or
+    FLAGGED_FLUSH_SECONDS have passed. A failed flush puts its documents
+    back and retries with exponential backoff; the buffer is capped at
+    FLAGGED_MAX_BUFFER and add() blocks while it is full, so memory stays
+    bounded and nothing is dropped. flush() waits until everything queued
+    so far is written, which the scanner does before moving its checkpoint.
+    """
+
+    def __init__(self, collection="fraud_data", flush_size=FLAGGED_FLUSH_SIZE,
+                 flush_seconds=FLAGGED_FLUSH_SECONDS, max_buffer=FLAGGED_MAX_BUFFER,
+                 retry_max_seconds=FLAGGED_RETRY_MAX_SECONDS):
+        self.collection = collection
+        self.flush_size = max(1, flush_size)
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max(self.flush_size, max_buffer)
+        self.retry_max_seconds = retry_max_seconds
+
+        self._buffer = OrderedDict()   # transactionId -> document, first write wins
+        self._cond = threading.Condition()
+        self._enqueued = 0             # sequence numbers, for flush() waiters
+        self._written = 0
+        self._in_flight = 0
+        self._flush_waiters = 0
+        self._closing = False
+        self._thread = None
+        self.written_total = 0
+        self.failed_flushes = 0
+
+    def __len__(self):
+        return len(self._buffer) + self._in_flight
+
+    # ---------- producers ----------
+    def add(self, txn, result):
+        """Queue one flagged transaction with the result it was scored with; returns False if it has no id."""
+        txn_id = normalize_txn_id(txn)
+        if not txn_id:
+            log_sampled(logger, logging.WARNING, "⚠️ Transaction missing 'transactionId'. Skipping.")
+            return False
+        doc = fraud_document(txn, result)
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Flagged writer is closed")
+            self._ensure_started()
+            while len(self._buffer) + self._in_flight >= self.max_buffer and not self._closing:
+                self._cond.wait(1.0)
+            if txn_id in self._buffer:
+                return True
+            self._buffer[txn_id] = doc
+            self._enqueued += 1
+            FLAGGED_BUFFERED.set(len(self))
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call is written; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._enqueued
+            if self._written >= target:
+                return True
+            self._ensure_started()
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._written < target:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._ensure_started()
+                    self._cond.wait(min(remaining, 1.0) if remaining is not None else 1.0)
+                return True
+            finally:
+                self._flush_waiters -= 1
+
+    # ---------- flusher ----------
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="flagged-writer", daemon=True)
+            self._thread.start()
+
+    def _take(self):
+        docs = []
+        while self._buffer and len(docs) < self.flush_size:
+            docs.append(self._buffer.popitem(last=False)[1])
+        self._in_flight = len(docs)
+        return docs
+
+    def _should_flush(self):
+        return len(self._buffer) >= self.flush_size or (self._flush_waiters and self._buffer)
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + (backoff or self.flush_seconds)
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # While backing off, wait out the delay however full the buffer is
+                    if not backoff and (self._closing or self._should_flush()):
+                        break
+                    self._cond.wait(remaining)
+                if not self._buffer:
+                    if self._closing:
+                        return
+                    continue
+                docs = self._take()
+            ok = self._write(docs)
+            with self._cond:
+                self._in_flight = 0
+                if ok:
+                    self._written += len(docs)
+                    backoff = 0.0
+                else:
+                    # Put the batch back at the front, in order, and retry later
+                    pending = OrderedDict((doc[TXN_ID_FIELD], doc) for doc in docs)
+                    pending.update(self._buffer)
+                    self._buffer = pending
+                    backoff = min(self.retry_max_seconds, (backoff * 2) or 0.5)
+                FLAGGED_BUFFERED.set(len(self))
+                self._cond.notify_all()
+
+    def _write(self, docs):
+        col = get_db()[self.collection]
+        ops = [UpdateOne({TXN_ID_FIELD: doc[TXN_ID_FIELD]}, {"$setOnInsert": doc}, upsert=True) for doc in docs]
+        try:
+            ensure_txn_id_index(col)
+            with STAGE_SECONDS.time("mongo_write"):
+                col.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys are concurrent upserts of the same id: already stored
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            if errors:
+                logger.error(f"❌ {len(errors)} flagged transactions rejected by Mongo: {errors[0].get('errmsg')}")
+        except Exception as e:
+            self.failed_flushes += 1
+            FLAGGED_FLUSH_FAILURES.inc()
+            logger.warning(f"⚠️ Flagged flush of {len(docs)} failed, will retry: {e}")
+            return False
+        self.written_total += len(docs)
+        FLAGGED_WRITTEN.inc(amount=len(docs))
+        log_sampled(logger, logging.INFO, "✅ Flushed %d suspicious transactions", len(docs))
+        return True
+
+    def close(self, timeout=None):
+        """Stop accepting documents and drain the buffer; returns False if some were left unwritten."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        if len(self):
+            logger.error(f"❌ {len(self)} flagged transactions not written before shutdown")
+            return False
+        return True
+
+    def stats(self):
+        return {
+            "buffered": len(self),
+            "written_total": self.written_total,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_flagged_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = FlaggedWriter()
+        return _writer
+
+
+def close_flagged_writer(timeout=None):
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close(timeout)
+            _writer = None
@@ -0,0 +1,206 @@
+# fraud_ai_system/backend/src/geo.py
+"""Impossible-travel and fraud-hotspot signals from transaction coordinates.
+
+GeoStore remembers the last location and event time of every customer
+(mobileNumber / clientRefId) and device (IMEI). For a batch it looks the
+previous points up in one pass, then computes distance and implied speed
+for the whole batch at once with the vectorized haversine. Moves shorter
+than GEO_MIN_DISTANCE_KM are treated as location noise (speed 0), and the
+elapsed time is floored at GEO_MIN_SECONDS so near-simultaneous
+transactions give a large but finite speed.
+
+Locations of transactions that came out fraudulent are counted in a grid
+of geohash cells (GEO_HOTSPOT_PRECISION characters). hotspot_frauds is
+the count in a transaction's cell and its 8 neighbours, seen within
+GEO_HOTSPOT_TTL_SECONDS: nine dict lookups, whatever the index size.
+
+Like velocity.py, values are read before the transaction is recorded and
+time is the transaction's event time, falling back to the wall clock.
+Missing, malformed and (0, 0) coordinates are ignored.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from fraud_ai_system.backend.src.features import compile_features
+
+GEO_MIN_DISTANCE_KM = float(os.getenv("GEO_MIN_DISTANCE_KM", "25"))
+GEO_MIN_SECONDS = float(os.getenv("GEO_MIN_SECONDS", "60"))
+GEO_MAX_KEYS = int(os.getenv("GEO_MAX_KEYS", "200000"))
+GEO_HOTSPOT_PRECISION = int(os.getenv("GEO_HOTSPOT_PRECISION", "6"))   # ~1.2 x 0.6 km cells
+GEO_HOTSPOT_TTL_SECONDS = float(os.getenv("GEO_HOTSPOT_TTL_SECONDS", str(7 * 24 * 3600)))
+GEO_HOTSPOT_MAX_CELLS = int(os.getenv("GEO_HOTSPOT_MAX_CELLS", "100000"))
+
+# Context fields for rules and model columns
+GEO_FIELDS = ("travel_km", "travel_kmh", "hotspot_frauds")
+
+_KEY_FEATURES = ("imei", "signal_lat", "signal_lon", "dt")
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = 6371
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = np.radians(lat2 - lat1)
+    delta_lambda = np.radians(lon2 - lon1)
+    a = np.sin(delta_phi/2.0)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(delta_lambda/2.0)**2
+    return R * 2 * np.arcsin(np.sqrt(a))
+
+
+def geohash(lat, lon, precision=GEO_HOTSPOT_PRECISION):
+    """Standard base32 geohash of one point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, x = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if x >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+class GeoStore:
+    """Last location per customer and device plus the fraud hotspot grid; see the module docstring."""
+
+    def __init__(self, precision=GEO_HOTSPOT_PRECISION, ttl_seconds=GEO_HOTSPOT_TTL_SECONDS,
+                 max_keys=GEO_MAX_KEYS, max_cells=GEO_HOTSPOT_MAX_CELLS):
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self.max_cells = max_cells
+        # A geohash of P characters splits longitude into ceil(5P/2) bits and latitude into floor(5P/2)
+        self.lat_cells = 1 << (5 * precision // 2)
+        self.lon_cells = 1 << ((5 * precision + 1) // 2)
+        self._last = {"customer": OrderedDict(), "device": OrderedDict()}
+        self._cells = OrderedDict()    # (lat index, lon index) -> [fraud count, last event time]
+        self._plan = compile_features(_KEY_FEATURES)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def stats(self):
+        return {"customers": len(self._last["customer"]), "devices": len(self._last["device"]),
+                "hotspot_cells": len(self._cells)}
+
+    # ---------- batch helpers ----------
+    def _points(self, txns):
+        """(lat, lon, event time, valid mask, imeis) arrays for a batch."""
+        features = self._plan.extract(txns)
+        lat, lon = features.array("signal_lat"), features.array("signal_lon")
+        valid = np.isfinite(lat) & np.isfinite(lon) & ((lat != 0.0) | (lon != 0.0))
+        valid &= (np.abs(lat) <= 90.0) & (np.abs(lon) <= 180.0)
+        now = time.time()
+        t = np.fromiter((dt.timestamp() if dt else now for dt in features["dt"]), dtype=np.float64, count=len(txns))
+        return lat, lon, t, valid, features["imei"]
+
+    def _cells_of(self, lat, lon):
+        """Geohash cell of each point as (lat index, lon index) integer arrays."""
+        rows = np.clip(((lat + 90.0) / 180.0 * self.lat_cells).astype(np.int64), 0, self.lat_cells - 1)
+        cols = np.clip(((lon + 180.0) / 360.0 * self.lon_cells).astype(np.int64), 0, self.lon_cells - 1)
+        return rows, cols
+
+    def _hotspot_counts(self, lat, lon, t, valid):
+        out = np.zeros(len(lat), dtype=np.float64)
+        if not self._cells or not valid.any():
+            return out
+        idx = np.flatnonzero(valid)
+        rows, cols = self._cells_of(lat[idx], lon[idx])
+        cells, ttl, lon_cells = self._cells, self.ttl_seconds, self.lon_cells
+        for i, row, col, at in zip(idx.tolist(), rows.tolist(), cols.tolist(), t[idx].tolist()):
+            total = 0
+            for r in (row - 1, row, row + 1):
+                for c in (col - 1, col, col + 1):
+                    entry = cells.get((r, c % lon_cells))   # longitude wraps at the antimeridian
+                    if entry is not None and abs(at - entry[1]) <= ttl:
+                        total += entry[0]
+            out[i] = total
+        return out
+
+    # ---------- batches ----------
+    def observe_batch(self, txns: Sequence[Dict], record=True) -> List[Dict[str, float]]:
+        """Geo fields for each transaction in order, recording each location after it is read.
+
+        A later transaction in the batch is compared with an earlier one
+        of the same customer or device. With record=False nothing is stored.
+        """
+        n = len(txns)
+        lat, lon, t, valid, imeis = self._points(txns)
+        # Previous (lat, lon, time) per transaction, for its customer [0] and its device [1]
+        prev = np.full((2, 3, n), np.nan)
+        with self._lock:
+            for i, txn in enumerate(txns):
+                keys = (txn.get("mobileNumber") or txn.get("clientRefId"), imeis[i])
+                for k, (last, key) in enumerate(zip(self._last.values(), keys)):
+                    if not key:
+                        continue
+                    if not isinstance(key, str):
+                        key = str(key)
+                    point = last.get(key)
+                    if point is not None:
+                        prev[k, :, i] = point
+                    if record and valid[i]:
+                        last[key] = (lat[i], lon[i], t[i])
+                        last.move_to_end(key)
+                        while len(last) > self.max_keys:
+                            last.popitem(last=False)
+            hotspots = self._hotspot_counts(lat, lon, t, valid)
+
+        with np.errstate(invalid="ignore"):
+            km = haversine(prev[:, 0], prev[:, 1], lat, lon)
+            hours = np.maximum(np.abs(t - prev[:, 2]), GEO_MIN_SECONDS) / 3600.0
+            kmh = np.where(km >= GEO_MIN_DISTANCE_KM, km / hours, 0.0)
+        km[:, ~valid] = np.nan
+        kmh[:, ~valid] = np.nan
+        # The faster of the customer and device moves; nan (no previous point) counts as 0
+        pick = np.argmax(np.nan_to_num(kmh, nan=-1.0), axis=0)
+        cols = np.arange(n)
+        km = np.nan_to_num(km[pick, cols])
+        kmh = np.nan_to_num(kmh[pick, cols])
+        return [dict(zip(GEO_FIELDS, row)) for row in zip(km.tolist(), kmh.tolist(), hotspots.tolist())]
+
+    def record_fraud(self, txns: Sequence[Dict]):
+        """Add the locations of fraudulent transactions to the hotspot grid."""
+        if not txns:
+            return
+        lat, lon, t, valid, _ = self._points(txns)
+        idx = np.flatnonzero(valid)
+        rows, cols = self._cells_of(lat[idx], lon[idx])
+        cells = self._cells
+        with self._lock:
+            for row, col, at in zip(rows.tolist(), cols.tolist(), t[idx].tolist()):
+                key = (row, col)
+                entry = cells.get(key)
+                if entry is None or at - entry[1] > self.ttl_seconds:
+                    cells[key] = [1, at]      # new, or expired: start counting again
+                else:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], at)
+                cells.move_to_end(key)
+            while len(cells) > self.max_cells:
+                cells.popitem(last=False)
+
+    def hotspots(self, limit=20) -> List[Dict]:
+        """Busiest cells, as geohash plus fraud count, for inspection."""
+        with self._lock:
+            top = sorted(self._cells.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        out = []
+        for (row, col), (count, at) in top:
+            lat = (row + 0.5) / self.lat_cells * 180.0 - 90.0
+            lon = (col + 0.5) / self.lon_cells * 360.0 - 180.0
+            out.append({"geohash": geohash(lat, lon, self.precision), "frauds": count, "last_seen": at})
+        return out
@@ -0,0 +1,213 @@
+# fraud_ai_system/backend/src/history_store.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo.errors import PyMongoError
+
+from fraud_ai_system.backend.src.apply_rules import g, extract_lat_long
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.geo import GeoStore
+from fraud_ai_system.backend.src.velocity import VelocityStore
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MAX_CUSTOMERS = int(os.getenv("HISTORY_MAX_CUSTOMERS", "200000"))
+HISTORY_MAX_FLAGGED = int(os.getenv("HISTORY_MAX_FLAGGED", "200000"))
+HISTORY_TTL_SECONDS = float(os.getenv("HISTORY_TTL_SECONDS", str(30 * 24 * 3600)))
+HISTORY_WARM_START_LIMIT = int(os.getenv("HISTORY_WARM_START_LIMIT", "100000"))
+
+
+def customer_key(txn):
+    return txn.get("mobileNumber") or txn.get("clientRefId") or None
+
+
+def beneficiary_key(txn):
+    """Same accountNumber+ifsc key Rule 9 checks against flagged_accounts (the benef_acct feature)."""
+    acct = g(txn, "moneyTransferBeneficiaryDetails", "accountNumber", default="")
+    ifsc = g(txn, "moneyTransferBeneficiaryDetails", "ifsc", default="")
+    return f"{acct or ''}{ifsc or ''}" or None
+
+
+class HistoryStore:
+    """Bounded per-entity history feeding apply_rules' `history` argument.
+
+    Customers (mobileNumber / clientRefId) map to their last IMEI, IP and
+    geo; flagged beneficiaries (accountNumber+ifsc) are kept in an LRU map
+    that doubles as the `flagged_accounts` set. Both maps evict the least
+    recently seen entry beyond their size cap, and customer entries older
+    than the TTL are treated as absent. Every operation is O(1) per transaction.
+    Windowed velocity counts (see velocity.py) ride along as history["velocity"],
+    travel speed and fraud hotspot counts (see geo.py) as history["geo"].
+    """
+
+    def __init__(self, max_customers=HISTORY_MAX_CUSTOMERS, max_flagged=HISTORY_MAX_FLAGGED,
+                 ttl_seconds=HISTORY_TTL_SECONDS, velocity=None, geo=None):
+        self.max_customers = max_customers
+        self.max_flagged = max_flagged
+        self.ttl_seconds = ttl_seconds
+        self.velocity = velocity if velocity is not None else VelocityStore()
+        self.geo = geo if geo is not None else GeoStore()
+        self._customers = OrderedDict()
+        self._flagged = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._customers)
+
+    # ---------- reads ----------
+    def _signals(self, store, txns, record):
+        """store.observe_batch, retried one transaction at a time if the batch fails.
+
+        A document that still fails gets no signals ({} reads as 0) rather
+        than taking the whole batch down with it.
+        """
+        try:
+            return store.observe_batch(txns, record=record)
+        except Exception as e:
+            logger.warning(f"⚠️ {type(store).__name__} batch failed, falling back to per-transaction: {e}")
+        out = []
+        for txn in txns:
+            try:
+                out += store.observe_batch([txn], record=record)
+            except Exception as e:
+                logger.warning(f"⚠️ No {type(store).__name__} signals for a bad transaction: {e}")
+                out.append({})
+        return out
+
+    def _entry(self, key, now):
+        entry = self._customers.get(key)
+        if entry is None:
+            return None
+        if now - entry["seen_at"] > self.ttl_seconds:
+            del self._customers[key]
+            return None
+        return entry
+
+    def _snapshot(self, txn, now):
+        entry = self._entry(customer_key(txn), now)
+        history = {"flagged_accounts": self._flagged}
+        if entry:
+            history.update(last_imei=entry["imei"], last_ip=entry["ip"], last_geo=entry["geo"])
+        return history
+
+    def lookup(self, txn):
+        """History dict for one transaction without recording it."""
+        velocity = self._signals(self.velocity, [txn], False)[0]
+        geo = self._signals(self.geo, [txn], False)[0]
+        with self._lock:
+            history = self._snapshot(txn, time.time())
+        history["velocity"], history["geo"] = velocity, geo
+        return history
+
+    def histories_for(self, txns, observe=True):
+        """Snapshot history for each transaction in order, then record it.
+
+        A later transaction in the same batch sees the device of an earlier
+        one, exactly as if they had been scored one at a time.
+        """
+        velocities = self._signals(self.velocity, txns, observe)
+        geos = self._signals(self.geo, txns, observe)
+        now = time.time()
+        out = []
+        with self._lock:
+            for txn, velocity, geo in zip(txns, velocities, geos):
+                history = self._snapshot(txn, now)
+                history["velocity"], history["geo"] = velocity, geo
+                out.append(history)
+                if observe:
+                    self._observe(txn, now)
+        return out
+
+    # ---------- writes ----------
+    def _observe(self, txn, now):
+        key = customer_key(txn)
+        if not key:
+            return
+        entry = self._customers.get(key)
+        if entry is None:
+            entry = self._customers[key] = {"imei": None, "ip": None, "geo": None, "seen_at": now}
+        else:
+            self._customers.move_to_end(key)
+        imei = txn.get("imeiNumber") or g(txn, "metaData", "imeiNumber", default="")
+        ip = txn.get("ipAddress") or g(txn, "metaData", "ipAddress", default="")
+        if imei:
+            entry["imei"] = imei
+        if ip:
+            entry["ip"] = ip
+        try:
+            lat, lon = extract_lat_long(txn)
+            if (lat, lon) != (0.0, 0.0):
+                entry["geo"] = (lat, lon)
+        except (TypeError, ValueError):
+            pass
+        entry["seen_at"] = now
+        while len(self._customers) > self.max_customers:
+            self._customers.popitem(last=False)
+
+    def observe(self, txn):
+        self._signals(self.velocity, [txn], True)
+        self._signals(self.geo, [txn], True)
+        with self._lock:
+            self._observe(txn, time.time())
+
+    def _flag(self, txn):
+        acct = beneficiary_key(txn)
+        if not acct:
+            return
+        self._flagged[acct] = True
+        self._flagged.move_to_end(acct)
+        while len(self._flagged) > self.max_flagged:
+            self._flagged.popitem(last=False)
+
+    def record_results(self, txns, results):
+        """Remember beneficiaries and locations of transactions that came out flagged."""
+        flagged = [txn for txn, result in zip(txns, results)
+                   if result.get("rules_flagged") or result.get("ml_prediction") == 1
+                   or result.get("status") == "fraudulent"]
+        with self._lock:
+            for txn in flagged:
+                self._flag(txn)
+        try:
+            self.geo.record_fraud(flagged)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not add fraud locations to the hotspot grid: {e}")
+
+    def warm_start(self, limit=HISTORY_WARM_START_LIMIT):
+        """Seed devices and flagged beneficiaries from the most recent fraud_data rows."""
+        projection = {
+            "mobileNumber": 1, "clientRefId": 1, "imeiNumber": 1, "ipAddress": 1,
+            "metaData": 1, "lat": 1, "long": 1, "location": 1, "moneyTransferBeneficiaryDetails": 1,
+            "timestamp": 1, "checkStatus.date": 1,
+        }
+        try:
+            docs = list(get_db()["fraud_data"].find({}, projection).sort("_id", -1).limit(limit))
+        except PyMongoError as e:
+            logger.warning(f"⚠️ History warm start skipped: {e}")
+            return 0
+        now = time.time()
+        with self._lock:
+            for doc in reversed(docs):  # oldest first so the newest device wins
+                self._observe(doc, now)
+                self._flag(doc)
+        try:
+            self.geo.record_fraud(docs)
+        except Exception as e:
+            logger.warning(f"⚠️ Hotspot grid not seeded: {e}")
+        logger.info(f"✅ History store warmed with {len(docs)} flagged transactions.")
+        return len(docs)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
@@ -0,0 +1,311 @@
+# fraud_ai_system/backend/src/incremental_scanner.py
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from fraud_ai_system.backend.src.apply_rules import process_transactions
+from fraud_ai_system.backend.src.db import get_db, scoring_collection
+from fraud_ai_system.backend.src.db_handler import full_documents
+from fraud_ai_system.backend.src.features import SCORING_PROJECTION
+from fraud_ai_system.backend.src.flagged_writer import get_flagged_writer
+from fraud_ai_system.backend.src.history_store import get_history_store
+from fraud_ai_system.backend.src.metrics import STAGE_SECONDS
+from fraud_ai_system.backend.src.model_registry import get_model
+from fraud_ai_system.backend.src.utils import chunked, SCAN_BUCKET_FIELD, SCORING_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "1000"))
+SCAN_MIN_INTERVAL = float(os.getenv("SCAN_MIN_INTERVAL", "1"))
+SCAN_MAX_INTERVAL = float(os.getenv("SCAN_MAX_INTERVAL", "60"))
+SCAN_USE_CHANGE_STREAM = os.getenv("SCAN_USE_CHANGE_STREAM", "false").lower() in ("1", "true", "yes")
+# Documents this far behind the watermark are re-checked: client-generated _ids can commit out of order
+SCAN_LOOKBACK_SECONDS = float(os.getenv("SCAN_LOOKBACK_SECONDS", "300"))
+BACKLOG_COUNT_CAP = 100_000
+
+CHECKPOINT_COLLECTION = "scan_checkpoints"
+
+
+def shard_query(shard, shards, prefix=""):
+    """Filter selecting one of `shards` slices by _scanBucket; shard 0 also takes documents not yet backfilled."""
+    if shards <= 1:
+        return {}
+    field = prefix + SCAN_BUCKET_FIELD
+    mod = {field: {"$mod": [shards, shard]}}
+    if shard == 0:
+        return {"$or": [mod, {field: {"$exists": False}}]}
+    return mod
+
+
+class IncrementalScanner:
+    """Watermark scanner over the `predict` collection.
+
+    Resumes from the last scanned `_id` stored in `scan_checkpoints`, drains
+    everything newer in `_id` order in bounded batches and advances the
+    checkpoint after each batch. A crash mid-batch rescans at most that
+    batch; saving flagged results is idempotent on transactionId. With
+    `shard=(k, n)` it only sees documents whose _scanBucket % n == k.
+
+    An _id can become visible after a larger one (client-generated ids,
+    out-of-order commits), so each pass also lists the _ids in the last
+    `lookback_seconds` behind the watermark and scores any it has not
+    scanned yet. The scanned set is in memory: after a restart the window
+    is scanned again, which only repeats idempotent flagged writes.
+    """
+
+    def __init__(self, name="auto_scan", source="predict", model=None,
+                 batch_size=SCAN_BATCH_SIZE, min_interval=SCAN_MIN_INTERVAL,
+                 max_interval=SCAN_MAX_INTERVAL, use_change_stream=SCAN_USE_CHANGE_STREAM,
+                 shard=(0, 1), lookback_seconds=SCAN_LOOKBACK_SECONDS):
+        self.name = name
+        self.source = source
+        self.shard, self.shards = shard
+        self.model = model
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.use_change_stream = use_change_stream
+        self.lookback_seconds = lookback_seconds
+        self.history = get_history_store()
+
+        self.interval = min_interval
+        self.mode = "polling"
+        self.last_id = None
+        self.resume_token = None
+        self.processed_total = 0
+        self.flagged_total = 0
+        self.late_total = 0
+        self.last_scan_at = None
+        self.last_batch_seconds = 0.0
+        self._loaded = False
+        self._recent = set()           # _ids scanned within the lookback window
+        self._recent_pruned = 0
+
+    # ---------- checkpoint ----------
+    def _checkpoints(self):
+        return get_db()[CHECKPOINT_COLLECTION]
+
+    def load_checkpoint(self):
+        doc = self._checkpoints().find_one({"_id": self.name}) or {}
+        self.last_id = doc.get("last_id")
+        self.resume_token = doc.get("resume_token")
+        self._loaded = True
+
+    def save_checkpoint(self):
+        self._checkpoints().update_one(
+            {"_id": self.name},
+            {
+                # $max: a scanner that lost its lease mid-batch can't move the watermark back
+                "$max": {"last_id": self.last_id},
+                "$set": {"resume_token": self.resume_token, "updated_at": datetime.utcnow()},
+            },
+            upsert=True,
+        )
+
+    # ---------- scoring ----------
+    def score(self, docs, projected=False):
+        """Score one batch and queue flagged results on the write-behind writer; returns the flagged count.
+
+        `projected` docs only carry the scoring fields; flagged ones are
+        re-read in full before they are stored.
+        """
+        flagged = 0
+        writer = get_flagged_writer()
+        for batch in chunked(docs, SCORING_BATCH_SIZE):
+            model = self.model if self.model is not None else get_model()
+            results = process_transactions(batch, model, self.history.histories_for(batch), flagged_only=True)
+            self.history.record_results(batch, results)
+            hits = [(txn, result) for txn, result in zip(batch, results)
+                    if result["rules_flagged"] or result["ml_prediction"] == 1]
+            if hits and projected:
+                with STAGE_SECONDS.time("fetch"):
+                    full = full_documents(get_db()[self.source], [txn for txn, _ in hits])
+                hits = [(doc, result) for doc, (_, result) in zip(full, hits)]
+            for txn, result in hits:
+                if writer.add(txn, result):
+                    flagged += 1
+        return flagged
+
+    def _commit(self, docs, started, projected=False):
+        self.flagged_total += self.score(docs, projected)
+        # Flagged rows must be stored before the watermark moves past them
+        get_flagged_writer().flush()
+        self.processed_total += len(docs)
+        # Late documents sit behind the watermark; it never moves back
+        newest = max(doc["_id"] for doc in docs)
+        if self.last_id is None or newest > self.last_id:
+            self.last_id = newest
+        self._remember(docs)
+        self.save_checkpoint()
+        self.last_scan_at = datetime.utcnow()
+        self.last_batch_seconds = time.perf_counter() - started
+
+    # ---------- lookback ----------
+    def _floor(self):
+        """Oldest _id still re-checked, or None (no lookback, or _ids that carry no time)."""
+        if self.lookback_seconds <= 0 or not isinstance(self.last_id, ObjectId):
+            return None
+        return ObjectId.from_datetime(self.last_id.generation_time - timedelta(seconds=self.lookback_seconds))
+
+    def _remember(self, docs):
+        self._recent.update(doc["_id"] for doc in docs)
+        # Drop _ids that fell out of the window, amortised over several batches
+        if len(self._recent) > 2 * max(self._recent_pruned, self.batch_size):
+            floor = self._floor()
+            if floor is not None:
+                self._recent = {_id for _id in self._recent if _id > floor}
+            self._recent_pruned = len(self._recent)
+
+    def _unseen(self, _id):
+        if self.last_id is None or _id > self.last_id:
+            return True
+        floor = self._floor()
+        return floor is not None and _id > floor and _id not in self._recent
+
+    def _late_ids(self, col):
+        """_ids inside the lookback window that have not been scanned yet, oldest first."""
+        floor = self._floor()
+        if floor is None:
+            return []
+        query = {"_id": {"$gt": floor, "$lte": self.last_id}}
+        shard = shard_query(self.shard, self.shards)
+        if shard:
+            query = {"$and": [shard, query]}
+        # An _id range on the _id index, returning only _ids
+        return [doc["_id"] for doc in col.find(query, {"_id": 1}).sort("_id", 1)
+                if doc["_id"] not in self._recent]
+
+    def _watermark_query(self):
+        query = shard_query(self.shard, self.shards)
+        if self.last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": self.last_id}}]} if query else {"_id": {"$gt": self.last_id}}
+        return query
+
+    def drain(self, max_batches=None, stop_event=None):
+        """Score everything past the watermark; returns the number of documents scanned.
+
+        With `stop_event`, returns after the batch in hand once it is set.
+        """
+        if not self._loaded:
+            self.load_checkpoint()
+        # Only the fields scoring reads, decoded lazily when SCORING_LAZY_DECODE is set
+        col = scoring_collection(get_db()[self.source])
+        scanned = batches = 0
+        late = self._late_ids(col)
+        for ids in chunked(late, self.batch_size):
+            if stop_event is not None and stop_event.is_set():
+                return scanned
+            started = time.perf_counter()
+            with STAGE_SECONDS.time("fetch"):
+                docs = list(col.find({"_id": {"$in": ids}}, SCORING_PROJECTION).sort("_id", 1))
+            if docs:
+                logger.info(f"🔄 Scanning {len(docs)} documents that appeared behind the watermark")
+                self._commit(docs, started, projected=True)
+                self.late_total += len(docs)
+                scanned += len(docs)
+        while max_batches is None or batches < max_batches:
+            if stop_event is not None and stop_event.is_set():
+                break
+            started = time.perf_counter()
+            with STAGE_SECONDS.time("fetch"):
+                docs = list(col.find(self._watermark_query(), SCORING_PROJECTION)
+                            .sort("_id", 1).limit(self.batch_size))
+            if not docs:
+                break
+            self._commit(docs, started, projected=True)
+            scanned += len(docs)
+            batches += 1
+            if len(docs) < self.batch_size:
+                break
+        return scanned
+
+    def next_interval(self, scanned):
+        """Poll fast while there is backlog, back off exponentially when idle."""
+        if scanned >= self.batch_size:
+            self.interval = self.min_interval
+        elif scanned:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 2)
+        return self.interval
+
+    # ---------- loops ----------
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        if self.use_change_stream:
+            try:
+                self.tail(stop_event)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Change stream unavailable, falling back to polling: {e}")
+        self.mode = "polling"
+        while not stop_event.is_set():
+            try:
+                scanned = self.drain(stop_event=stop_event)
+            except PyMongoError as e:
+                logger.error(f"❌ Incremental scan failed: {e}")
+                scanned = 0
+            except Exception:
+                # Anything else (a document scoring cannot handle) must not kill the shard thread;
+                # the watermark stays put and the batch is retried after the back-off
+                logger.exception("❌ Incremental scan batch failed")
+                scanned = 0
+            stop_event.wait(self.next_interval(scanned))
+
+    def tail(self, stop_event):
+        """Follow inserts through a change stream, resuming from the stored token."""
+        if not self._loaded:
+            self.load_checkpoint()
+        col = get_db()[self.source]
+        pipeline = [{"$match": {"operationType": "insert", **shard_query(self.shard, self.shards, "fullDocument.")}}]
+        with col.watch(pipeline, resume_after=self.resume_token, max_await_time_ms=1000) as stream:
+            self.mode = "change_stream"
+            # Anything inserted while we were down predates the stream; catch up first
+            self.drain()
+            pending, started = [], None
+            while not stop_event.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    doc = change["fullDocument"]
+                    if self._unseen(doc["_id"]):
+                        if not pending:
+                            started = time.perf_counter()
+                        pending.append(doc)
+                    self.resume_token = stream.resume_token
+                if pending and (change is None or len(pending) >= self.batch_size):
+                    self._commit(pending, started)
+                    pending = []
+
+    # ---------- observability ----------
+    def stats(self):
+        col = get_db()[self.source]
+        query = self._watermark_query()
+        backlog = col.count_documents(query, limit=BACKLOG_COUNT_CAP)
+        lag_seconds = 0.0
+        if backlog:
+            oldest = col.find_one(query, {"_id": 1}, sort=[("_id", 1)])
+            if oldest and isinstance(oldest["_id"], ObjectId):
+                lag_seconds = (datetime.now(timezone.utc) - oldest["_id"].generation_time).total_seconds()
+        return {
+            "name": self.name,
+            "shard": f"{self.shard}/{self.shards}",
+            "mode": self.mode,
+            "last_id": str(self.last_id) if self.last_id is not None else None,
+            "last_scan_at": self.last_scan_at.isoformat() if self.last_scan_at else None,
+            "backlog": backlog,
+            "backlog_capped": backlog >= BACKLOG_COUNT_CAP,
+            "lag_seconds": round(lag_seconds, 3),
+            "poll_interval_seconds": self.interval,
+            "last_batch_seconds": round(self.last_batch_seconds, 4),
+            "processed_total": self.processed_total,
+            "flagged_total": self.flagged_total,
+            "late_total": self.late_total,
+            "lookback_seconds": self.lookback_seconds,
+        }
+
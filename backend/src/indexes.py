@@ -0,0 +1,258 @@
+# fraud_ai_system/backend/src/indexes.py
+
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.utils import (
+    NAME_NORM_FIELD, SCAN_BUCKET_FIELD, TXN_ID_FIELD, canonical_txn_id, normalize_name, scan_bucket,
+)
+
+logger = logging.getLogger(__name__)
+
+# Drop and rebuild an index whose name matches but whose definition differs
+INDEX_REPLACE_CONFLICTING = os.getenv("INDEX_REPLACE_CONFLICTING", "false").lower() in ("1", "true", "yes")
+NAME_BACKFILL_BATCH = int(os.getenv("NAME_BACKFILL_BATCH", "1000"))
+# Catch-up passes for documents written without nameNorm / _scanBucket by anything but bulk_insert_transactions
+NAME_BACKFILL_INTERVAL_SECONDS = float(os.getenv("NAME_BACKFILL_INTERVAL_SECONDS", "60"))
+# How far behind the newest backfilled _id each pass starts, for ObjectIds generated out of order
+NAME_BACKFILL_LOOKBACK_SECONDS = float(os.getenv("NAME_BACKFILL_LOOKBACK_SECONDS", "300"))
+# Persisted verdicts (scoring_cache) expire this long after they are written
+SCORE_CACHE_TTL_DAYS = float(os.getenv("SCORE_CACHE_TTL_DAYS", "7"))
+
+# Server codes for "an equivalent index already exists under another name / with other options"
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    options: Dict[str, Any] = {}
+
+
+def txn_id_index(collection):
+    """Unique transactionId; documents without one (legacy rows) are left out rather than colliding on null."""
+    return IndexSpec(collection, ((TXN_ID_FIELD, ASCENDING),), f"uniq_{TXN_ID_FIELD}",
+                     {"unique": True, "partialFilterExpression": {TXN_ID_FIELD: {"$exists": True}}})
+
+
+def _transaction_list_indexes(collection):
+    # Equality, then the sort key, then the range key, so filtered lists come back in timestamp order
+    return [
+        txn_id_index(collection),
+        IndexSpec(collection, (("timestamp", DESCENDING), ("risk_score", ASCENDING)), "timestamp_risk"),
+        IndexSpec(collection, (("is_fraud", ASCENDING), ("timestamp", DESCENDING), ("risk_score", ASCENDING)),
+                  "fraud_timestamp_risk"),
+        IndexSpec(collection, ((NAME_NORM_FIELD, ASCENDING), ("timestamp", DESCENDING)), "name_prefix"),
+    ]
+
+
+# Every index the app's queries rely on, by collection
+INDEXES: List[IndexSpec] = [
+    # raw transactions: list/search endpoints and ingest dedup
+    *_transaction_list_indexes("predict"),
+    # /predict reads and writes the "transaction."-prefixed collections
+    *_transaction_list_indexes("transaction.predict"),
+    txn_id_index("transaction.fraud_data"),
+    # flagged transactions: dedup on save; /suspicious pages by _id
+    txn_id_index("fraud_data"),
+    # scripts/load_data.py target
+    txn_id_index("transactions"),
+    # scan coordination: live members / leases per scan group
+    IndexSpec("scan_leases", (("group", ASCENDING), ("kind", ASCENDING), ("expires_at", ASCENDING)),
+              "group_kind_expiry"),
+    # persisted scoring verdicts: expired by the server
+    IndexSpec("score_cache", (("created_at", ASCENDING),), "ttl_created_at",
+              {"expireAfterSeconds": int(SCORE_CACHE_TTL_DAYS * 86400)}),
+]
+
+# Collections whose documents carry a normalized name for prefix search
+NAME_COLLECTIONS = ("predict", "transaction.predict")
+# Collections the incremental scanner shards by _scanBucket
+SCAN_COLLECTIONS = ("predict",)
+
+
+_OPTION_DEFAULTS = {"unique": False, "sparse": False, "partialFilterExpression": None, "expireAfterSeconds": None}
+
+
+def _same_definition(info, spec):
+    keys = [(field, direction if isinstance(direction, str) else int(direction))
+            for field, direction in info.get("key", [])]
+    if keys != list(spec.keys):
+        return False
+    return all(info.get(option, default) == spec.options.get(option, default)
+               for option, default in _OPTION_DEFAULTS.items())
+
+
+def reconcile_indexes(db=None, specs=INDEXES, replace=INDEX_REPLACE_CONFLICTING) -> Dict[str, list]:
+    """Create declared indexes that are missing and report drift.
+
+    An index with the declared name but another definition is a conflict:
+    it is rebuilt when `replace` is set, otherwise only reported. An
+    equivalent index under a different name counts as present. Indexes
+    nobody declared are listed as `extra` and never dropped.
+    """
+    db = db if db is not None else get_db()
+    report = {"created": [], "present": [], "conflicts": [], "extra": [], "failed": []}
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for name, col_specs in by_collection.items():
+        col = db[name]
+        try:
+            existing = col.index_information()
+        except PyMongoError as e:
+            logger.error(f"❌ Could not list indexes on {name}: {e}")
+            report["failed"] += [f"{name}.{spec.name}" for spec in col_specs]
+            continue
+        for spec in col_specs:
+            label = f"{name}.{spec.name}"
+            info = existing.get(spec.name)
+            if info is not None and _same_definition(info, spec):
+                report["present"].append(label)
+                continue
+            if info is None and any(_same_definition(other, spec) for other in existing.values()):
+                report["present"].append(label)
+                continue
+            if info is not None:
+                if not replace:
+                    logger.warning(f"⚠️ Index {label} differs from its declaration; set INDEX_REPLACE_CONFLICTING to rebuild")
+                    report["conflicts"].append(label)
+                    continue
+                col.drop_index(spec.name)
+            try:
+                col.create_index(list(spec.keys), name=spec.name, **spec.options)
+                report["created"].append(label)
+                logger.info(f"✅ Created index {label}")
+            except OperationFailure as e:
+                # Same keys under another name, or existing duplicates blocking a unique index
+                level = logging.WARNING if e.code in INDEX_CONFLICT_CODES else logging.ERROR
+                logger.log(level, f"⚠️ Could not create index {label}: {e}")
+                report["conflicts" if e.code in INDEX_CONFLICT_CODES else "failed"].append(label)
+        declared = {spec.name for spec in col_specs}
+        report["extra"] += [f"{name}.{idx}" for idx in existing if idx != "_id_" and idx not in declared]
+    return report
+
+
+def _backfill(col, query, projection, fields, batch_size=NAME_BACKFILL_BATCH, stop_event=None, after=None) -> int:
+    """$set fields(doc) on every document matching `query`; returns the number updated.
+
+    Walks `_id` upwards from `after` (the whole collection when None), so
+    a pass that resumes from the previous one only reads the documents
+    inserted since, through the _id index.
+    """
+    updated, last_id = 0, after
+    while stop_event is None or not stop_event.is_set():
+        page = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        docs = list(col.find(page, projection).sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        col.bulk_write([UpdateOne({"_id": doc["_id"]}, {"$set": fields(doc)}) for doc in docs], ordered=False)
+        updated += len(docs)
+        last_id = docs[-1]["_id"]
+    return updated
+
+
+def backfill_name_norm(col, batch_size=NAME_BACKFILL_BATCH, stop_event=None, after=None) -> int:
+    """Stamp nameNorm on documents written without it; returns the number updated."""
+    updated = _backfill(col, {NAME_NORM_FIELD: {"$exists": False}, "name": {"$type": "string"}}, {"name": 1},
+                        lambda doc: {NAME_NORM_FIELD: normalize_name(doc["name"])}, batch_size, stop_event, after)
+    if updated:
+        logger.info(f"✅ Backfilled {NAME_NORM_FIELD} on {updated} documents in {col.name}")
+    return updated
+
+
+def backfill_scan_bucket(col, batch_size=NAME_BACKFILL_BATCH, stop_event=None, after=None) -> int:
+    """Stamp _scanBucket on documents written without it; returns the number updated.
+
+    The bucket is the one bulk_insert_transactions gives the same
+    transactionId; documents without one are bucketed by _id. Until a
+    document is stamped, scan shard 0 owns it.
+    """
+    updated = _backfill(col, {SCAN_BUCKET_FIELD: {"$exists": False}},
+                        {TXN_ID_FIELD: 1, "transaction_id": 1},
+                        lambda doc: {SCAN_BUCKET_FIELD: scan_bucket(canonical_txn_id(doc) or doc["_id"])},
+                        batch_size, stop_event, after)
+    if updated:
+        logger.info(f"✅ Backfilled {SCAN_BUCKET_FIELD} on {updated} documents in {col.name}")
+    return updated
+
+
+# (field, collections, backfill) kept up to date by run_index_maintenance
+BACKFILLS = (
+    (NAME_NORM_FIELD, NAME_COLLECTIONS, backfill_name_norm),
+    (SCAN_BUCKET_FIELD, SCAN_COLLECTIONS, backfill_scan_bucket),
+)
+
+
+def _backfill_start(newest) -> Optional[Any]:
+    """Where the next pass starts: a little before the newest _id the last one saw (from scratch for non-ObjectId ids)."""
+    if not isinstance(newest, ObjectId):
+        return None
+    return ObjectId.from_datetime(newest.generation_time - timedelta(seconds=NAME_BACKFILL_LOOKBACK_SECONDS))
+
+
+def run_index_maintenance(stop_event=None, interval=NAME_BACKFILL_INTERVAL_SECONDS):
+    """Background task: reconcile declared indexes, then keep nameNorm and _scanBucket backfilled.
+
+    The first pass covers every document; later ones, every `interval`
+    seconds, pick up documents other writers stored without those fields.
+    """
+    try:
+        report = reconcile_indexes()
+        logger.info(f"✅ Indexes reconciled: {len(report['created'])} created, {len(report['present'])} present, "
+                    f"{len(report['conflicts'])} conflicting, {len(report['failed'])} failed")
+    except PyMongoError as e:
+        logger.error(f"❌ Index reconciliation failed: {e}")
+    newest = {}   # (field, collection) -> newest _id when the last pass started
+    while stop_event is None or not stop_event.is_set():
+        for field, names, backfill in BACKFILLS:
+            for name in names:
+                col = get_db()[name]
+                try:
+                    top = col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+                    backfill(col, stop_event=stop_event, after=_backfill_start(newest.get((field, name))))
+                    newest[field, name] = top["_id"] if top else None
+                except PyMongoError as e:
+                    logger.error(f"❌ {field} backfill failed on {name}: {e}")
+        if stop_event is None:
+            return
+        stop_event.wait(interval)
+
+
+# ---------- explain ---------------------------------------------------------
+def plan_stages(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flattened stages of an explain() winning plan (classic and slot-based engine layouts)."""
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)
+    stages, stack = [], [plan]
+    while stack:
+        stage = stack.pop()
+        if not stage:
+            continue
+        stages.append(stage)
+        stack.extend(stage.get("inputStages", []))
+        if "inputStage" in stage:
+            stack.append(stage["inputStage"])
+    return stages
+
+
+def plan_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Whether a plan scans the collection, sorts in memory, and which indexes it uses."""
+    stages = plan_stages(explain)
+    names = [stage.get("stage") for stage in stages]
+    return {
+        "stages": names,
+        "collscan": "COLLSCAN" in names,
+        "blocking_sort": "SORT" in names,
+        "indexes": sorted({stage["indexName"] for stage in stages if stage.get("indexName")}),
+        "empty": names == ["EOF"],
+    }
@@ -0,0 +1,392 @@
+# fraud_ai_system/backend/src/ingest.py
+"""Streaming ingest for large transaction payloads.
+
+The request body (NDJSON, or one JSON array) is split into records as
+chunks arrive, each record is checked by a validator compiled from the
+db_model.Transaction fields, and valid documents are written in
+INGEST_CHUNK_SIZE batches while the next batch is parsed. Only the
+unparsed tail of the body, the batch being built and the batch being
+written are held in memory, whatever the payload size. Invalid records
+are reported one by one instead of failing the whole request.
+"""
+import asyncio
+import codecs
+import json
+import logging
+import os
+import typing
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from fraud_ai_system.backend.src.db import run_blocking
+from fraud_ai_system.backend.src.db_handler import INGEST_CHUNK_SIZE, bulk_insert_transactions
+from fraud_ai_system.backend.src.db_model import Transaction
+from fraud_ai_system.backend.src.utils import orjson
+
+logger = logging.getLogger(__name__)
+
+# A single record longer than this is rejected instead of buffered
+INGEST_MAX_RECORD_BYTES = int(os.getenv("INGEST_MAX_RECORD_BYTES", str(1024 * 1024)))
+# Per-record errors listed in the response; the rest are only counted
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "1000"))
+
+_MISSING = object()
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+# ---------- validation ------------------------------------------------------
+# Messages match the pydantic errors POST /fraud returns for the same input
+_MSG = {
+    "missing": "Field required",
+    "dict_type": "Input should be a valid dictionary",
+    "list_type": "Input should be a valid list",
+    "string_type": "Input should be a valid string",
+    "float_type": "Input should be a valid number",
+    "float_parsing": "Input should be a valid number, unable to parse string as a number",
+}
+
+
+class _ValidatorBuilder:
+    """Generates one Python function per model, in the style of features.CompiledFeatures.
+
+    Coercion follows pydantic's lax mode for the types db_model uses: str
+    accepts only strings, float accepts numbers, bools and numeric strings,
+    Optional[...] accepts None, and unknown keys are dropped. Output dicts
+    use the alias (stored) field names, like `.dict(by_alias=True)`.
+    """
+
+    def __init__(self):
+        self.ns: Dict[str, Any] = {"_MISSING": _MISSING, "_MSG": _MSG}
+        self.sources: List[str] = []
+        self._done = set()
+        self._depth = 0
+
+    def model(self, model) -> str:
+        fn = f"v_{model.__name__}"
+        if fn in self._done:
+            return fn
+        self._done.add(fn)
+        lines = [
+            f"def {fn}(raw, loc, errors):",
+            "    if not isinstance(raw, dict):",
+            "        errors.append((loc, 'dict_type'))",
+            "        return None",
+            "    n = len(errors)",
+            "    out = {}",
+        ]
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            lines.append(f"    v = raw.get({key!r}, _MISSING)")
+            if key != name:
+                lines.append(f"    if v is _MISSING:")
+                lines.append(f"        v = raw.get({name!r}, _MISSING)")
+            lines.append("    if v is _MISSING:")
+            if field.is_required():
+                lines.append(f"        errors.append((loc + ({key!r},), 'missing'))")
+            else:
+                default = f"d_{fn}_{name}"
+                self.ns[default] = field.default
+                lines.append(f"        out[{key!r}] = {default}")
+            lines.append("    else:")
+            # errors are reported under whichever key the record used
+            where = f"loc + ({key!r},)" if key == name else f"loc + ({key!r} if {key!r} in raw else {name!r},)"
+            lines += self._value(field.annotation, f"out[{key!r}]", "v", where, "        ")
+        lines.append("    return out if len(errors) == n else None")
+        self.sources.append("\n".join(lines))
+        return fn
+
+    def _value(self, annotation, target, value, loc, indent) -> List[str]:
+        origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+        if origin is typing.Union and type(None) in args:
+            inner = next(arg for arg in args if arg is not type(None))
+            return ([f"{indent}if {value} is None:", f"{indent}    {target} = None", f"{indent}else:"]
+                    + self._value(inner, target, value, loc, indent + "    "))
+        if annotation is str:
+            return [f"{indent}if type({value}) is str:",
+                    f"{indent}    {target} = {value}",
+                    f"{indent}else:",
+                    f"{indent}    errors.append(({loc}, 'string_type'))"]
+        if annotation is float:
+            return [f"{indent}t = type({value})",
+                    f"{indent}if t is float:",
+                    f"{indent}    {target} = {value}",
+                    f"{indent}elif t is int or t is bool or t is str:",
+                    f"{indent}    try:",
+                    f"{indent}        {target} = float({value})",
+                    f"{indent}    except (ValueError, OverflowError):",
+                    f"{indent}        errors.append(({loc}, 'float_parsing'))",
+                    f"{indent}else:",
+                    f"{indent}    errors.append(({loc}, 'float_type'))"]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return [f"{indent}{target} = {self.model(annotation)}({value}, {loc}, errors)"]
+        if origin in (list, List) and len(args) == 1:
+            self._depth += 1
+            i, x, y, items = (f"{var}{self._depth}" for var in ("i", "x", "y", "items"))
+            return ([f"{indent}if type({value}) is list or type({value}) is tuple:",
+                     f"{indent}    {items} = []",
+                     f"{indent}    for {i}, {x} in enumerate({value}):",
+                     f"{indent}        {y} = None"]
+                    + self._value(args[0], y, x, f"{loc} + ({i},)", indent + "        ")
+                    + [f"{indent}        {items}.append({y})",
+                       f"{indent}    {target} = {items}",
+                       f"{indent}else:",
+                       f"{indent}    errors.append(({loc}, 'list_type'))"])
+        raise TypeError(f"No compiled validator for field type {annotation!r}")
+
+    def build(self, model):
+        entry = self.model(model)
+        source = "\n\n".join(self.sources)
+        exec(compile(source, f"<validator {model.__name__}>", "exec"), self.ns)
+        return self.ns[entry], source
+
+
+class CompiledValidator:
+    """Validates a parsed record against a pydantic model without building model instances."""
+
+    def __init__(self, model=Transaction):
+        self.model = model
+        self._validate, self.source = _ValidatorBuilder().build(model)
+
+    def __call__(self, raw) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, str]]]:
+        """(document, []) for a valid record, (None, errors) otherwise."""
+        errors = []
+        doc = self._validate(raw, (), errors)
+        if doc is not None:
+            return doc, []
+        return None, [{"loc": ".".join(map(str, loc)), "type": kind, "msg": _MSG[kind]} for loc, kind in errors]
+
+
+_validator = None
+
+
+def get_validator():
+    global _validator
+    if _validator is None:
+        _validator = CompiledValidator()
+    return _validator
+
+
+# ---------- parsing ---------------------------------------------------------
+def _utf8_len(text):
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class RecordStream:
+    """Incremental splitter for an NDJSON or JSON array body.
+
+    feed() takes raw body chunks and returns the (index, record, error,
+    offset) tuples completed so far, where offset is the byte position just
+    past the record; close() flushes the tail. The format is picked from
+    the first non-blank byte: "[" is a JSON array, anything else NDJSON.
+    A bad NDJSON line is reported and skipped; a syntax error inside an
+    array ends the stream, as there is no safe point to resume.
+
+    To pick up where an earlier pass stopped, seek the input to a
+    record's offset and pass `resume=(offset, next_index, format)`.
+    """
+
+    def __init__(self, max_record_bytes=INGEST_MAX_RECORD_BYTES, resume=None):
+        self.max_record_bytes = max_record_bytes
+        self.format = None
+        self.index = 0
+        self.done = False
+        self._base = 0                 # stream offset of the first unconsumed byte
+        self._buf = b""
+        self._text = ""
+        self._skip_line = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._expect_value = True
+        self._invalid_utf8 = None
+        if resume is not None:
+            self._base, self.index, self.format = resume
+            self._expect_value = self.format != "array"
+
+    def feed(self, chunk: bytes) -> List[Tuple[int, Any, Optional[str], int]]:
+        if self.done or not chunk:
+            return []
+        if self.format is None:
+            self._buf += chunk
+            head = self._buf.lstrip()
+            self._base += len(self._buf) - len(head)
+            if not head:
+                self._buf = b""
+                return []
+            self.format = "array" if head[:1] == b"[" else "ndjson"
+            chunk, self._buf = head, b""
+            if self.format == "array":
+                chunk = chunk[1:]
+                self._base += 1
+        if self.format == "ndjson":
+            return self._feed_lines(chunk, final=False)
+        return self._feed_array(self._decode(chunk), final=False)
+
+    def close(self) -> List[Tuple[int, Any, Optional[str], int]]:
+        if self.done or self.format is None:
+            return []
+        if self.format == "ndjson":
+            return self._feed_lines(b"\n", final=True)
+        records = self._feed_array(self._decode(b"", final=True), final=True)
+        if not self.done:
+            records.append(self._error("Unexpected end of body: JSON array is not closed", self._base))
+            self.done = True
+        return records
+
+    def _decode(self, chunk, final=False):
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError as e:
+            self._invalid_utf8 = str(e)
+            return ""
+
+    def _error(self, msg, offset):
+        record = (self.index, None, msg, offset)
+        self.index += 1
+        return record
+
+    def _feed_lines(self, chunk, final):
+        records = []
+        data = self._buf + chunk
+        pos = 0
+        while True:
+            nl = data.find(b"\n", pos)
+            if nl < 0:
+                break
+            line, offset, pos = data[pos:nl], self._base + nl + 1, nl + 1
+            if self._skip_line:
+                self._skip_line = False
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > self.max_record_bytes:
+                records.append(self._error(f"Record exceeds {self.max_record_bytes} bytes", offset))
+                continue
+            try:
+                records.append((self.index, _loads(line), None, offset))
+                self.index += 1
+            except ValueError as e:
+                records.append(self._error(f"Invalid JSON: {e}", offset))
+        self._buf, self._base = data[pos:], self._base + pos
+        if len(self._buf) > self.max_record_bytes and not self._skip_line:
+            # Drop the oversized line up to its newline rather than buffering it
+            records.append(self._error(f"Record exceeds {self.max_record_bytes} bytes", self._base))
+            self._skip_line = True
+        if self._skip_line:
+            self._buf, self._base = b"", self._base + len(self._buf)
+        return records
+
+    def _feed_array(self, text, final):
+        records = []
+        if self._invalid_utf8:
+            self.done = True
+            return [self._error(f"Body is not valid UTF-8: {self._invalid_utf8}", self._base)]
+        self._text += text
+        buf, pos, end = self._text, 0, len(self._text)
+        mark, mark_offset = 0, self._base   # a char position and its byte offset
+
+        def offset_of(i):
+            nonlocal mark, mark_offset
+            mark, mark_offset = i, mark_offset + _utf8_len(buf[mark:i])
+            return mark_offset
+
+        while not self.done:
+            while pos < end and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos == end:
+                break
+            if self._expect_value:
+                if buf[pos] == "]" and self.index == 0:
+                    self.done = True
+                    break
+                try:
+                    value, stop = self._json.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    # Usually the record just continues in the next chunk; only give up at the
+                    # end of the body or once the pending record is too long to be one
+                    if final:
+                        records.append(self._error(f"Invalid JSON: {e.msg}", offset_of(pos)))
+                        self.done = True
+                    elif end - pos > self.max_record_bytes:
+                        records.append(self._error(f"Record exceeds {self.max_record_bytes} bytes", offset_of(pos)))
+                        self.done = True
+                    break
+                if stop == end and not final:
+                    break  # a number or literal may continue in the next chunk
+                records.append((self.index, value, None, offset_of(stop)))
+                self.index += 1
+                pos, self._expect_value = stop, False
+            elif buf[pos] == ",":
+                pos, self._expect_value = pos + 1, True
+            elif buf[pos] == "]":
+                self.done = True
+            else:
+                records.append(self._error(
+                    f"Invalid JSON: expected ',' or ']' after record, got {buf[pos]!r}", offset_of(pos)))
+                self.done = True
+        if not self.done:
+            self._base = offset_of(pos)
+        self._text = "" if self.done else buf[pos:]
+        return records
+
+
+# ---------- ingest ----------------------------------------------------------
+async def ingest_stream(chunks, collection="predict", chunk_size=INGEST_CHUNK_SIZE,
+                        max_errors=INGEST_MAX_ERRORS, validator=None) -> Dict[str, Any]:
+    """Parse, validate and insert a streamed body; returns counts and per-record errors.
+
+    `chunks` is an async iterator of body bytes (Request.stream()). One
+    batch is written while the next one is parsed; writes go through
+    bulk_insert_transactions, so re-sending a payload only counts
+    duplicates.
+    """
+    validator = validator or get_validator()
+    stream = RecordStream()
+    report = {"received": 0, "inserted": 0, "duplicates": 0, "failed": 0, "invalid": 0, "errors": []}
+    batch: List[Dict[str, Any]] = []
+    writing: Optional[asyncio.Future] = None
+
+    async def wait_for_write():
+        nonlocal writing
+        if writing is not None:
+            pending, writing = writing, None
+            counts = await pending
+            report["inserted"] += counts["inserted"]
+            report["duplicates"] += counts["duplicates"]
+            report["failed"] += counts["failed"]
+
+    def handle(records):
+        for index, raw, error, _ in records:
+            report["received"] += 1
+            errors = [{"loc": "", "type": "json_invalid", "msg": error}] if error else None
+            if errors is None:
+                doc, errors = validator(raw)
+                if doc is not None:
+                    batch.append(doc)
+                    continue
+            report["invalid"] += 1
+            if len(report["errors"]) < max_errors:
+                txn_id = raw.get("transactionId") if isinstance(raw, dict) else None
+                report["errors"].append({"index": index, "transactionId": txn_id, "errors": errors})
+
+    async def flush(final=False):
+        nonlocal batch, writing
+        while len(batch) >= chunk_size or (final and batch):
+            docs, batch = batch[:chunk_size], batch[chunk_size:]
+            await wait_for_write()
+            writing = asyncio.ensure_future(
+                run_blocking(bulk_insert_transactions, docs, collection=collection, chunk_size=chunk_size))
+
+    try:
+        async for chunk in chunks:
+            handle(stream.feed(chunk))
+            await flush()
+        handle(stream.close())
+        await flush(final=True)
+    finally:
+        await wait_for_write()
+    report["errors_truncated"] = report["invalid"] > len(report["errors"])
+    if report["invalid"]:
+        logger.info(f"ℹ️ Streamed ingest into {collection}: {report['invalid']} of {report['received']} records rejected")
+    return report
@@ -1,19 +1,27 @@
 import sys
+import logging
 import os
 import threading
 import time
 from dotenv import load_dotenv
 
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("fraud_ai_system")
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fraud_ai_system.backend.src.apply_rules import apply_rules
-from fraud_ai_system.backend.src.ml_model import predict,load_model
+from fraud_ai_system.backend.src.model_registry import get_registry
+from fraud_ai_system.backend.src.rule_engine import get_rule_registry
 from fraud_ai_system.backend.src.api import router
-from fraud_ai_system.backend.src.db_handler import fetch_transactions, save_suspicious_transaction
+from fraud_ai_system.backend.src.scan_coordinator import get_scanner
+from fraud_ai_system.backend.src.history_store import get_history_store
+from fraud_ai_system.backend.src.blocklist import run_refresher
+from fraud_ai_system.backend.src.db import init_client, close_client
+from fraud_ai_system.backend.src.scoring_executor import get_scoring_executor, shutdown_scoring_executor
+from fraud_ai_system.backend.src.flagged_writer import close_flagged_writer
+from fraud_ai_system.backend.src.indexes import run_index_maintenance
 
-model = load_model()
 # Add project path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -30,50 +38,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def process_transaction(transaction: dict) -> dict:
-    try:
-        rule_results = apply_rules(transaction)
-        ml_results = predict(model,transaction)
-    except Exception as e:
-        print(f"❌ Error processing transaction {transaction.get('transaction_id', 'unknown')}: {e}")
-        return {
-            "rules_flagged": False,
-            "ml_prediction": 0,
-            "risk_score": 0.0
-        }
-
-    return {
-        "rules_flagged": rule_results,
-        "ml_prediction": ml_results.get("prediction", 0),
-        "risk_score": ml_results.get("risk_score", 0.0)
-    }
+shutdown_event = threading.Event()
+FLAGGED_DRAIN_SECONDS = float(os.getenv("FLAGGED_DRAIN_SECONDS", "10"))
 
 def auto_scan_loop():
-    """Continuously scan transactions every 60 seconds."""
-    while True:
-        print("🔄 Scanning for new transactions...")
-        try:
-            transactions = fetch_transactions()
-            print(f"✅ Fetched {len(transactions)} transactions from MongoDB.")
-        except Exception as e:
-            print(f"❌ Failed to fetch transactions: {e}")
-            transactions = []
-
-        for txn in transactions:
-            result = process_transaction(txn)
-            if result["rules_flagged"] or result["ml_prediction"] == 1:
-                try:
-                    save_suspicious_transaction({**txn, **result})
-                    print(f"🚨 Suspicious transaction saved: {txn.get('transaction_id')}")
-                except Exception as e:
-                    print(f"❌ Failed to save suspicious transaction {txn.get('transaction_id')}: {e}")
-
-        print("✅ Scan complete. Waiting for next scan...")
-        time.sleep(60)  # wait 60 seconds
+    """Scan new transactions for whichever shards this process holds a lease on."""
+    get_history_store().warm_start()
+    logger.info("🔄 Scan coordinator started.")
+    get_scanner().run_forever(shutdown_event)
 
 @app.on_event("startup")
 def start_background_tasks():
-    """Start background scanning thread on FastAPI startup."""
+    """Open the shared Mongo client and scoring pool, and start background index/scanning/blocklist/model/rules-reload threads on FastAPI startup."""
+    init_client()
+    get_rule_registry().get()  # fail fast on a missing or broken rules file
+    index_thread = threading.Thread(target=run_index_maintenance, args=(shutdown_event,))
+    index_thread.daemon = True
+    index_thread.start()
+    get_scoring_executor()
     scan_thread = threading.Thread(target=auto_scan_loop)
     scan_thread.daemon = True
     scan_thread.start()
+    app.state.scan_thread = scan_thread
+    blocklist_thread = threading.Thread(target=run_refresher, args=(shutdown_event,))
+    blocklist_thread.daemon = True
+    blocklist_thread.start()
+    model_thread = threading.Thread(target=get_registry().run_watcher, args=(shutdown_event,))
+    model_thread.daemon = True
+    model_thread.start()
+    rules_thread = threading.Thread(target=get_rule_registry().run_watcher, args=(shutdown_event,))
+    rules_thread.daemon = True
+    rules_thread.start()
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    """Stop the background threads, drain the scoring pool and flagged writer, and close the shared Mongo client on FastAPI shutdown."""
+    shutdown_event.set()
+    # Let the scan shards finish their batch and release leases before the writer drains
+    scan_thread = getattr(app.state, "scan_thread", None)
+    if scan_thread is not None:
+        scan_thread.join(timeout=FLAGGED_DRAIN_SECONDS)
+    shutdown_scoring_executor()
+    close_flagged_writer(timeout=FLAGGED_DRAIN_SECONDS)
+    close_client()
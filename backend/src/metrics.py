@@ -0,0 +1,140 @@
+# fraud_ai_system/backend/src/metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, 10µs .. 10s
+DEFAULT_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels_text(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels_text(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render_prometheus():
+    """All registered metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- hot-path metrics ------------------------------------------------
+# Observed once per batch (or per Mongo call), never per rule per scalar txn,
+# so the cost stays negligible next to scoring itself.
+
+STAGE_SECONDS = Histogram(
+    "fraudshield_stage_seconds", "Time spent per pipeline stage (per call/batch)", ("stage",))
+RULE_SECONDS = Histogram(
+    "fraudshield_rule_seconds", "Time spent evaluating one rule over a batch", ("rule",))
+RULE_HITS = Counter(
+    "fraudshield_rule_hits_total", "Transactions that triggered each rule", ("rule",))
+TXNS_SCORED = Counter(
+    "fraudshield_transactions_scored_total", "Transactions scored by path", ("path",))
+BATCH_SIZE = Histogram(
+    "fraudshield_batch_size", "Transactions per scoring batch", (),
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000))
+SCORING_QUEUE_DEPTH = Gauge(
+    "fraudshield_scoring_queue_depth", "Scoring batches waiting for a worker")
+SCORING_ACTIVE = Gauge(
+    "fraudshield_scoring_active_workers", "Scoring workers busy with a batch")
+SCORING_WAIT_SECONDS = Histogram(
+    "fraudshield_scoring_wait_seconds", "Time a scoring batch waited for a worker")
+SCORING_REJECTED = Counter(
+    "fraudshield_scoring_rejected_total", "Scoring batches rejected because the queue was full")
+FLAGGED_BUFFERED = Gauge(
+    "fraudshield_flagged_buffered", "Flagged transactions waiting to be written")
+FLAGGED_WRITTEN = Counter(
+    "fraudshield_flagged_written_total", "Flagged transactions flushed to fraud_data")
+FLAGGED_FLUSH_FAILURES = Counter(
+    "fraudshield_flagged_flush_failures_total", "Flagged-transaction flushes that failed and were retried")
+SCORE_CACHE_LOOKUPS = Counter(
+    "fraudshield_score_cache_lookups_total", "Scoring cache lookups by tier and outcome", ("tier", "outcome"))
@@ -1,125 +1,103 @@
-import pandas as pd
-from datetime import datetime
 import numpy as np
 import joblib
 import os
+import warnings
+from fraud_ai_system.backend.src.metrics import STAGE_SECONDS
+from fraud_ai_system.backend.src.features import MODEL_FEATURES, MODEL_SOURCES, compile_features
+from fraud_ai_system.backend.src.geo import GEO_FIELDS, haversine
+from fraud_ai_system.backend.src.rule_engine import HISTORY_FIELDS
+from fraud_ai_system.backend.src.velocity import VELOCITY_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 MODEL_PATH = os.getenv("MODEL_PATH")  # get from environment variable
 if not MODEL_PATH:
-    MODEL_PATH = os.path.join("models", "risk_model.pkl")
+    MODEL_PATH = os.path.join("models", "riskmodel.pkl")
+
+# joblib memory-maps numpy payloads read-only, so forked workers share the pages
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+# Every column a model may be fitted on: document features, then the history's velocity and geo values
+MODEL_INPUTS = MODEL_FEATURES + VELOCITY_FIELDS + GEO_FIELDS
+
+def resolve_model_path(path=None):
+    """MODEL_PATH (or `path`), relative paths taken from the backend directory."""
+    path = path or MODEL_PATH
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
 
-def load_model():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    model_path = os.path.join(base_dir, "models", "risk_model.pkl")
+def load_model(path=None, mmap_mode=MODEL_MMAP_MODE):
+    model_path = resolve_model_path(path)
 
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model file not found at {model_path}")
 
-    model = joblib.load(model_path)
+    model = joblib.load(model_path, mmap_mode=mmap_mode)
     # model is just the classifier, not a tuple
     return model
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    phi1 = np.radians(lat1)
-    phi2 = np.radians(lat2)
-    delta_phi = np.radians(lat2 - lat1)
-    delta_lambda = np.radians(lon2 - lon1)
-    a = np.sin(delta_phi/2.0)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(delta_lambda/2.0)**2
-    return R * 2 * np.arcsin(np.sqrt(a))
-
-def extract_features(txn):
-    features = {}
-
-    # Amount
-    features['amount'] = float(txn.get('amount'))
-    if isinstance(features['amount'], dict):
-        features['amount'] = float(features['amount'].get('$numberDecimal', 0))
-    # Transaction Type (label encode later)
-    features['transactionType'] = txn.get('transactionType', 'unknown')
-
-    # Status (label encode later)
-    features['status'] = txn.get('status', 'unknown')
-
-    # Date-time features
-    created_at = txn.get('createdAt', {}).get('$date', None)
-    if created_at:
-        dt = pd.to_datetime(created_at)
-        features['createdAt_unix'] = int(dt.timestamp())
-        features['createdAt_hour'] = dt.hour
-        features['createdAt_weekday'] = dt.weekday()
-    else:
-        features['createdAt_unix'] = 0
-        features['createdAt_hour'] = 0
-        features['createdAt_weekday'] = 0
-
-    # metaData latitude & longitude
-    meta = txn.get('metaData', {})
-    features['meta_lat'] = float(meta.get('lat') or 0)
-    features['meta_long'] = float(meta.get('long') or 0)
-
-    # Vendor info
-    features['vendorId'] = txn.get('vendorId', 'unknown')
-    features['vendorServiceType'] = txn.get('vendorServiceType', 'unknown')
-
-    # Partner commission amount
-    partner = txn.get('partnerDetails', {})
-    features['partner_commissionAmount'] = float(partner.get('commissionAmount', 0))
-
-    # Admin wallet balances
-    admin = txn.get('adminDetails', {})
-    features['admin_oldMainWalletBalance'] = float(admin.get('oldMainWalletBalance', 0))
-    features['admin_newMainWalletBalance'] = float(admin.get('newMainWalletBalance', 0))
-
-    # Operator keys
-    operator = txn.get('operator', {})
-    features['operator_key1'] = operator.get('key1', 'unknown')
-    features['operator_key2'] = operator.get('key2', 'unknown')
-
-    # Mobile number (can encode or use as is)
-    features['mobileNumber'] = txn.get('mobileNumber', 'unknown')
-
-    # checkStatus length
-    check_status = txn.get('checkStatus', [])
-    features['checkStatus_count'] = len(check_status)
-
-    # Geo distance can be computed if you have lat/lon of vendor or admin etc.
-    # Assuming vendor lat/long not available, skip or add if you have it
-
-    return features
-
-def predict(model, txn):
-    # Extract amount safely
-    amount_value = txn.get('amount')
-    if isinstance(amount_value, dict):
-        amount_value = amount_value.get('value') or amount_value.get('amount')
-    try:
-        amount = float(amount_value)
-    except (TypeError, ValueError):
-        amount = 0.0  # fallback if conversion fails
-
-    # Extract hour from 'CreatedAT' field
-    hour = 0
-    created_at_str = txn.get('CreatedAT')
-    if created_at_str:
-        try:
-            dt = datetime.fromisoformat(created_at_str)
-            hour = dt.hour
-        except Exception:
-            hour = 0  # fallback if parsing fails
-
-    features = {
-        'amount': amount,
-        'hour': hour,
-        # Add other features here as needed
-    }
-
-    X = pd.DataFrame([features])
-
-    prediction = model.predict(X)
-    risk_score = model.predict_proba(X)[:, 1]  # assuming binary classifier
-
-    return {
-        "prediction": int(prediction[0]),
-        "risk_score": float(risk_score[0])
-    }
+def model_columns(model):
+    """MODEL_INPUTS columns `model` was fitted on, in its order.
+
+    Models fitted on a DataFrame name them in feature_names_in_; older
+    ones took the first n_features_in_ (amount, hour).
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return MODEL_INPUTS[:getattr(model, "n_features_in_", len(MODEL_FEATURES))]
+    names = tuple(str(name) for name in names)
+    unknown = [name for name in names if name not in MODEL_INPUTS]
+    if unknown:
+        raise ValueError(f"Model was fitted on unknown features {unknown}")
+    return names
+
+def extract_features(txn, history=None):
+    """Model inputs for one transaction as {column: value}; the same values build_feature_matrix serves."""
+    histories = None if history is None else [history]
+    return dict(zip(MODEL_INPUTS, build_feature_matrix([txn], histories=histories, columns=MODEL_INPUTS)[0].tolist()))
+
+def build_feature_matrix(txns, features=None, histories=None, columns=MODEL_FEATURES):
+    """One contiguous float64 row per transaction, one column per name in `columns` (see MODEL_INPUTS).
+
+    Pass `features` when the batch was already extracted for the rules.
+    Velocity and geo columns come from `histories` and are 0 without one.
+    """
+    sources = [MODEL_SOURCES[MODEL_FEATURES.index(name)] for name in columns if name in MODEL_FEATURES]
+    if sources and (features is None or not all(name in features for name in sources)):
+        features = compile_features(MODEL_SOURCES).extract(txns)
+    if tuple(columns) == MODEL_FEATURES:
+        return features.matrix(MODEL_SOURCES)
+    X = np.zeros((len(txns), len(columns)), dtype=np.float64)
+    for j, name in enumerate(columns):
+        if name in MODEL_FEATURES:
+            X[:, j] = features.array(MODEL_SOURCES[MODEL_FEATURES.index(name)])
+        elif histories is not None:
+            section = HISTORY_FIELDS[name]
+            X[:, j] = [(h.get(section) or {}).get(name, 0) if h else 0 for h in histories]
+    return X
+
+def predict_batch(model, txns, features=None, histories=None):
+    """Score a batch with a single predict_proba call.
+
+    The label is taken from the most probable class, so there is no
+    second pass through model.predict. Columns follow model_columns, so
+    models fitted with or without the velocity features both work.
+    """
+    if len(txns) == 0:
+        return []
+    with STAGE_SECONDS.time("ml_features"):
+        X = build_feature_matrix(txns, features, histories, model_columns(model))
+    with STAGE_SECONDS.time("ml_inference"):
+        # X is a plain ndarray; models fitted on a DataFrame would warn on every call
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            proba = model.predict_proba(X)
+    labels = np.asarray(model.classes_)[proba.argmax(axis=1)]
+    risk_scores = proba[:, 1]  # assuming binary classifier
+
+    return [
+        {"prediction": int(label), "risk_score": float(score)}
+        for label, score in zip(labels.tolist(), risk_scores.tolist())
+    ]
+
+def predict(model, txn, history=None):
+    return predict_batch(model, [txn], histories=None if history is None else [history])[0]
@@ -0,0 +1,106 @@
+# fraud_ai_system/backend/src/model_registry.py
+
+import hashlib
+import logging
+import os
+import threading
+
+from fraud_ai_system.backend.src.ml_model import load_model, resolve_model_path, MODEL_MMAP_MODE
+
+logger = logging.getLogger(__name__)
+
+MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "30"))
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """One model per process, loaded lazily and swapped atomically on change.
+
+    The live (version, model) pair is replaced with a single assignment, so
+    scoring that already fetched a model keeps using it while a new file
+    loads in the background. A file that fails to load (e.g. half-written)
+    leaves the current model in place and is retried when it changes again.
+    Deploy new models by writing a temp file and renaming it over the old.
+    """
+
+    def __init__(self, path=None, mmap_mode=MODEL_MMAP_MODE):
+        self.path = resolve_model_path(path)
+        self.mmap_mode = mmap_mode
+        self._current = (None, None)   # (version, model)
+        self._stat = None
+        self._load_lock = threading.Lock()
+        self._checked = False
+
+    @property
+    def version(self):
+        return self.current()[0]
+
+    def get(self):
+        """Current model, or None when no usable model file exists (rules-only scoring)."""
+        return self.current()[1]
+
+    def current(self):
+        """The live (version, model) pair, read once so the two always belong together."""
+        if not self._checked:
+            self.check_reload()
+        return self._current
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check_reload(self):
+        """Load the model file if it changed since the last check; returns True on swap."""
+        with self._load_lock:
+            self._checked = True
+            stat = self._file_stat()
+            if stat is None or stat == self._stat:
+                return False
+            try:
+                version = _file_digest(self.path)
+                if version == self._current[0]:
+                    self._stat = stat
+                    return False
+                model = load_model(self.path, mmap_mode=self.mmap_mode)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load model {self.path}: {e}")
+                self._stat = stat  # retry once the file changes again
+                return False
+            self._stat = stat
+            self._current = (version, model)
+            logger.info(f"✅ Loaded model {os.path.basename(self.path)} version {version}")
+            return True
+
+    def run_watcher(self, stop_event, interval=MODEL_RELOAD_SECONDS):
+        while not stop_event.wait(interval):
+            self.check_reload()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    # Read the reference once; the lock is only taken to create it
+    registry = _registry
+    if registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+            registry = _registry
+    return registry
+
+
+def get_model():
+    return get_registry().get()
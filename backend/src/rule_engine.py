@@ -0,0 +1,682 @@
+# fraud_ai_system/backend/src/rule_engine.py
+"""Declarative rule sets compiled into a short-circuiting evaluator.
+
+Rules live in a versioned JSON file (RULES_PATH, config/rules.json by
+default). Each rule is a list of clauses over feature names from
+features.py or the per-transaction context fields (last_imei,
+flagged_acct, blocked, the velocity.py window counts such as
+mobile_count_1m and the geo.py travel_kmh / hotspot_frauds), all of
+which must hold for it to fire:
+
+    {"name": "night_big_txn", "weight": 0.2,
+     "when": [{"field": "hour", "op": "between", "value": [1, 3]},
+              {"field": "amount", "op": "gt", "value": 200000}],
+     "reason": "Very high amount during 1–3 AM window",
+     "trigger": {"type": "Night High Amount", "blocked": "₹{amount:,.0f} at {dt:%H:%M}"}}
+
+Reason and trigger templates are str.format strings over the same
+fields, with `{field|TEXT}` standing in TEXT when the field is empty;
+they are only formatted for rows whose explanation is returned.
+
+Weights and the threshold are summed as integer points (1/1000ths), so
+the verdict does not depend on the order rules run in. That lets
+verdict-only callers run rules cheapest-per-point first, skipping clauses
+once one fails and dropping each row as soon as it can no longer cross
+the threshold or already has. The ranking uses each clause's observed
+pass rate, so a cheap, selective clause shields the expensive ones.
+
+RuleRegistry reloads the file when it changes; a file that does not
+parse or compile leaves the current rule set in place.
+"""
+import hashlib
+import json
+import logging
+import operator
+import os
+import re
+import string
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_ai_system.backend.src.blocklist import IPPrefixSet
+from fraud_ai_system.backend.src.features import FEATURES, FEATURES_BY_NAME, FeatureBatch, compile_features
+from fraud_ai_system.backend.src.geo import GEO_FIELDS
+from fraud_ai_system.backend.src.metrics import RULE_HITS, RULE_SECONDS
+from fraud_ai_system.backend.src.velocity import VELOCITY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.getenv("RULES_PATH", os.path.join("config", "rules.json"))
+RULES_RELOAD_SECONDS = float(os.getenv("RULES_RELOAD_SECONDS", "10"))
+
+POINT_SCALE = 1000   # weights and thresholds are kept in 1/1000ths
+
+# Fields computed per transaction from history / blocklist: (relative cost, features they read)
+CONTEXT_FIELDS = {
+    "last_imei": (1, ()),
+    "flagged_acct": (2, ("benef_acct",)),
+    "blocked": (20, ()),
+    **{name: (1, ()) for name in VELOCITY_FIELDS + GEO_FIELDS},
+}
+
+# Numeric context fields and the history section (a dict of them) each is read from
+HISTORY_FIELDS = {**{name: "velocity" for name in VELOCITY_FIELDS}, **{name: "geo" for name in GEO_FIELDS}}
+
+NUMERIC_OPS = {
+    "gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le,
+    "eq": operator.eq, "ne": operator.ne,
+}
+
+_UNSET = object()
+
+RuleResult = Tuple[bool, float, List[str], List[Dict[str, str]]]
+
+
+# ---------- templates -------------------------------------------------------
+# Attribute names may not start with "_": no way from a rules file to dunders or internals
+_FIELD_RE = re.compile(r"([A-Za-z_]\w*)((?:\.[A-Za-z]\w*|\[\d+\])*)(?:\|(.*))?", re.S)
+_CONVERSIONS = {None: "", "s": "str", "r": "repr", "a": "ascii"}
+
+class Template:
+    """A reason/trigger template compiled to one function of a row mapping.
+
+    Templates use str.format syntax (attribute and index access, !r/!s/!a,
+    format specs) plus `{field|TEXT}` for TEXT when the field is empty.
+    Attributes starting with an underscore are rejected.
+    Literal text is embedded with repr(), so nothing from the file is
+    ever evaluated as code.
+    """
+
+    def __init__(self, template: str, rule: str):
+        self.template = template
+        self.fields: List[str] = []
+        pieces = []
+        for literal, field_name, spec, conversion in string.Formatter().parse(template):
+            if literal:
+                pieces.append(repr(literal))
+            if field_name is None:
+                continue
+            m = _FIELD_RE.fullmatch(field_name)
+            if not m or "{" in (spec or "") or conversion not in _CONVERSIONS:
+                raise ValueError(f"Rule {rule!r}: bad template field {{{field_name}}}")
+            root, access, fallback = m.groups()
+            self.fields.append(root)
+            expr = f"row[{root!r}]{access}"
+            if fallback is not None:
+                expr = f"({expr} or {fallback!r})"
+            if conversion:
+                expr = f"{_CONVERSIONS[conversion]}({expr})"
+            pieces.append(f"format({expr}, {spec or ''!r})")
+        source = f"def render(row):\n    return ''.join(({', '.join(pieces)},))" if pieces else \
+            "def render(row):\n    return ''"
+        ns: Dict[str, Any] = {}
+        exec(compile(source, f"<template {rule}>", "exec"), ns)
+        self.render = ns["render"]
+
+
+# ---------- context ---------------------------------------------------------
+def _fill_context(name, col, rows, txns, histories, blocklist, benef_accts):
+    """Compute context field `name` into `col` for `rows` (benef_accts is indexed like txns)."""
+    if name == "last_imei":
+        for i in rows:
+            history = histories[i]
+            col[i] = history.get("last_imei") if history else None
+    elif name == "flagged_acct":
+        for i in rows:
+            history, acct = histories[i], benef_accts[i]
+            col[i] = acct if history and acct and acct in history.get("flagged_accounts", set()) else None
+    elif name == "blocked":
+        match = blocklist.match if blocklist else None
+        for i in rows:
+            col[i] = match(txns[i]) if match else None
+    else:
+        section = HISTORY_FIELDS[name]
+        for i in rows:
+            history = histories[i]
+            col[i] = (history.get(section) or {}).get(name, 0) if history else 0
+
+class _Row(dict):
+    """One transaction's features; context fields are looked up on first access."""
+
+    def __init__(self, features, txn, history, blocklist):
+        super().__init__(features)
+        self.txn = txn
+        self.history = history
+        self.blocklist = blocklist
+
+    def __missing__(self, name):
+        history = self.history
+        if name == "last_imei":
+            value = history.get("last_imei") if history else None
+        elif name == "flagged_acct":
+            acct = self.get("benef_acct")
+            value = acct if history and acct and acct in history.get("flagged_accounts", set()) else None
+        elif name == "blocked":
+            value = self.blocklist.match(self.txn) if self.blocklist else None
+        elif name in HISTORY_FIELDS:
+            value = (history.get(HISTORY_FIELDS[name]) or {}).get(name, 0) if history else 0
+        else:
+            raise KeyError(name)
+        self[name] = value
+        return value
+
+class RuleContext:
+    """Columns one batch is evaluated against.
+
+    Feature columns come from the FeatureBatch the caller already
+    extracted (anything a rule needs beyond it is extracted here); context
+    fields are computed per row, only for rows a clause actually reaches.
+    """
+
+    def __init__(self, txns, histories, blocklist, features: FeatureBatch, needed: Sequence[str]):
+        self.n = len(txns)
+        self.txns = txns
+        self.histories = histories
+        self.blocklist = blocklist
+        self.features = features
+        missing = [name for name in needed if name not in features]
+        self.extra = compile_features(missing).extract(txns) if missing else None
+        self._context: Dict[str, list] = {}
+
+    def _batch(self, name):
+        return self.features if name in self.features else self.extra
+
+    def array(self, name):
+        if name in CONTEXT_FIELDS:
+            # Numeric clauses on context fields (the velocity and geo values)
+            col = self._context_column(name, range(self.n))
+            return np.fromiter((np.nan if v is None else v for v in col), dtype=np.float64, count=self.n)
+        return self._batch(name).array(name)
+
+    def _context_column(self, name, rows):
+        col = self._context.get(name)
+        if col is None:
+            col = self._context[name] = [_UNSET] * self.n
+        todo = [i for i in rows if col[i] is _UNSET]
+        if todo:
+            benef = self._batch("benef_acct")["benef_acct"] if name == "flagged_acct" else None
+            _fill_context(name, col, todo, self.txns, self.histories, self.blocklist, benef)
+        return col
+
+    def value(self, name, i):
+        if name not in CONTEXT_FIELDS:
+            return self._batch(name)[name][i]
+        return self._context_column(name, (i,))[i]
+
+    def values(self, name, idx):
+        if name not in CONTEXT_FIELDS:
+            col = self._batch(name)[name]
+            return col if idx is None else [col[i] for i in idx.tolist()]
+        if idx is None:
+            return self._context_column(name, range(self.n))
+        rows = idx.tolist()
+        col = self._context_column(name, rows)
+        return [col[i] for i in rows]
+
+class _BatchRow:
+    """Mapping view of row i, for formatting templates."""
+
+    def __init__(self, ctx, i):
+        self.ctx = ctx
+        self.i = i
+
+    def __getitem__(self, name):
+        return self.ctx.value(name, self.i)
+
+
+# ---------- compilation -----------------------------------------------------
+def _check_field(name, rule):
+    if name not in FEATURES_BY_NAME and name not in CONTEXT_FIELDS:
+        raise ValueError(f"Rule {rule!r}: unknown field {name!r}")
+
+class Clause:
+    def __init__(self, spec: Dict[str, Any], rule: str):
+        self.field = spec["field"]
+        self.op = spec["op"]
+        self.ref = spec.get("ref")
+        self.value = value = spec.get("value")
+        _check_field(self.field, rule)
+        if self.ref is not None:
+            _check_field(self.ref, rule)
+        self.evaluated = 0
+        self.passed = 0
+
+        op = self.op
+        plain_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        self.numeric = self.ref is None and (op == "between" or (op in NUMERIC_OPS and plain_number))
+        if self.numeric:
+            if op == "between":
+                lo, hi = value
+                self.test_value = lambda v: lo <= v <= hi
+                self.test_array = lambda a: (a >= lo) & (a <= hi)
+            else:
+                fn = NUMERIC_OPS[op]
+                self.test_value = lambda v: fn(v, value)
+                self.test_array = lambda a: fn(a, value)
+        elif op in ("eq", "ne") and self.ref is not None:
+            fn = NUMERIC_OPS[op]
+            self.test_pair = fn
+        elif op in ("eq", "ne"):
+            fn = NUMERIC_OPS[op]
+            self.test_value = lambda v: fn(v, value)
+        elif op == "set":
+            self.test_value = bool
+        elif op == "unset":
+            self.test_value = operator.not_
+        elif op in ("matches", "not_matches"):
+            pattern = re.compile(value)
+            if op == "matches":
+                self.test_value = lambda v: bool(v) and pattern.fullmatch(v) is not None
+            else:
+                self.test_value = lambda v: not v or pattern.fullmatch(v) is None
+        elif op == "prefix":
+            prefixes = IPPrefixSet(value)
+            self.test_value = prefixes.__contains__
+        elif op in ("in", "not_in"):
+            members = frozenset(value)
+            self.test_value = members.__contains__ if op == "in" else (lambda v: v not in members)
+        else:
+            raise ValueError(f"Rule {rule!r}: unknown op {op!r}")
+
+        fields = [self.field] + ([self.ref] if self.ref else [])
+        self.fields = tuple(fields)
+        self.cost = 1 if self.numeric else 3 + sum(CONTEXT_FIELDS.get(f, (0,))[0] for f in fields)
+        self.test = self._row_test()
+
+    def _row_test(self):
+        """test(row) for scalar evaluation, with the field lookups bound in."""
+        field, ref = self.field, self.ref
+        if ref is not None:
+            pair = self.test_pair
+            return lambda row: pair(row[field], row[ref])
+        if self.numeric and self.op == "between":
+            lo, hi = self.value
+            return lambda row: lo <= row[field] <= hi
+        if self.numeric:
+            fn, value = NUMERIC_OPS[self.op], self.value
+            return lambda row: fn(row[field], value)
+        test_value = self.test_value
+        return lambda row: test_value(row[field])
+
+    @property
+    def pass_rate(self):
+        return (self.passed + 1) / (self.evaluated + 2)
+
+    def test_batch(self, ctx: RuleContext, idx) -> np.ndarray:
+        """Boolean mask over `idx` (every row when None)."""
+        if self.numeric:
+            arr = ctx.array(self.field)
+            mask = self.test_array(arr if idx is None else arr[idx])
+        else:
+            values = ctx.values(self.field, idx)
+            count = len(values)
+            if self.ref is not None:
+                refs = ctx.values(self.ref, idx)
+                mask = np.fromiter((bool(self.test_pair(v, r)) for v, r in zip(values, refs)),
+                                   dtype=bool, count=count)
+            else:
+                mask = np.fromiter((bool(self.test_value(v)) for v in values), dtype=bool, count=count)
+        self.evaluated += len(mask)
+        self.passed += int(np.count_nonzero(mask))
+        return mask
+
+class Rule:
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec["name"]
+        weight = float(spec["weight"])
+        if weight < 0:
+            raise ValueError(f"Rule {self.name!r}: weight must not be negative")
+        self.points = round(weight * POINT_SCALE)
+        if not spec.get("when"):
+            raise ValueError(f"Rule {self.name!r}: needs at least one clause")
+        # Cheapest clause first; later ones only see rows the earlier ones passed
+        self.clauses = sorted((Clause(c, self.name) for c in spec["when"]), key=lambda c: c.cost)
+        self.tests = tuple(clause.test for clause in self.clauses)
+        self.cost = spec.get("cost")
+        trigger = spec.get("trigger") or {}
+        self.trigger_type = trigger.get("type", self.name)
+        self.reason = Template(spec.get("reason", self.name), self.name)
+        self.blocked = Template(trigger.get("blocked", ""), self.name)
+
+        fields = {f for clause in self.clauses for f in clause.fields}
+        for name in self.reason.fields + self.blocked.fields:
+            _check_field(name, self.name)
+            fields.add(name)
+        self.fields = fields
+
+    def expected_cost(self) -> float:
+        if self.cost is not None:
+            return float(self.cost)
+        cost, reach = 0.0, 1.0
+        for clause in self.clauses:
+            cost += reach * clause.cost
+            reach *= clause.pass_rate
+        return cost
+
+    def fires(self, row) -> bool:
+        for test in self.tests:
+            if not test(row):
+                return False
+        return True
+
+    def select(self, ctx: RuleContext, idx) -> np.ndarray:
+        """Indices among `idx` (every row when None) where every clause holds."""
+        for clause in self.clauses:
+            mask = clause.test_batch(ctx, idx)
+            idx = np.flatnonzero(mask) if idx is None else idx[mask]
+            if not idx.size:
+                break
+        return idx
+
+    def explain(self, row) -> Tuple[str, Dict[str, str]]:
+        return self.reason.render(row), {"type": self.trigger_type, "blocked": self.blocked.render(row)}
+
+class RuleSet:
+    """A compiled rule set: scalar and batch evaluation of one config version."""
+
+    def __init__(self, spec: Dict[str, Any], version: str):
+        self.version = version
+        self.threshold = round(float(spec["threshold"]) * POINT_SCALE)
+        self.levels = sorted(((float(lv["min"]), lv["level"], lv["action"]) for lv in spec.get("levels", ())),
+                             reverse=True)
+        self.rules = [Rule(r) for r in spec["rules"]]
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        self.max_points = sum(r.points for r in self.rules)
+
+        needed = {f for rule in self.rules for f in rule.fields}
+        for name in list(needed):
+            needed.update(CONTEXT_FIELDS.get(name, (0, ()))[1])
+        # Spec order keeps the compiled plan (and its cache key) stable
+        self.features = tuple(f.name for f in FEATURES if f.name in needed)
+        self._plan = compile_features(self.features)
+
+        # History fields the rules read -> the sorted thresholds they are compared with
+        # (None when a clause needs the exact value), so a verdict cache can key on buckets
+        cuts: Dict[str, Optional[set]] = {}
+        for rule in self.rules:
+            for clause in rule.clauses:
+                for name in clause.fields:
+                    if name not in HISTORY_FIELDS:
+                        continue
+                    if clause.numeric and not clause.ref and name == clause.field and cuts.get(name, set()) is not None:
+                        bounds = clause.value if clause.op == "between" else (clause.value,)
+                        cuts.setdefault(name, set()).update(float(v) for v in bounds)
+                    else:
+                        cuts[name] = None
+        self.history_cuts = {name: tuple(sorted(c)) if c is not None else None for name, c in cuts.items()}
+
+        # Per-row decisive evaluation uses the order fixed here; batches re-sort with learned pass rates
+        self._row_order = self.ordered()
+        self._rank = {rule.name: i for i, rule in enumerate(self.rules)}
+
+    def __len__(self):
+        return len(self.rules)
+
+    # ---------- helpers ----------
+    def score(self, points) -> float:
+        return points / POINT_SCALE
+
+    def level(self, score: float) -> Tuple[str, str]:
+        for minimum, level, action in self.levels:
+            if score >= minimum:
+                return level, action
+        return "Low", "Approve"
+
+    def ordered(self) -> List[Rule]:
+        """Rules by expected cost per point, for verdict-only evaluation."""
+        return sorted(self.rules, key=lambda r: r.expected_cost() / r.points if r.points else float("inf"))
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "threshold": self.score(self.threshold),
+            "rules": [
+                {"name": rule.name, "weight": self.score(rule.points),
+                 "expected_cost": round(rule.expected_cost(), 3),
+                 "clause_pass_rates": [round(c.pass_rate, 4) for c in rule.clauses]}
+                for rule in self.rules
+            ],
+            "verdict_order": [rule.name for rule in self.ordered()],
+        }
+
+    def _decided(self, points, remaining):
+        return points >= self.threshold or points + remaining < self.threshold
+
+    # ---------- one transaction ----------
+    def row(self, txn, history=None, blocklist=None) -> _Row:
+        return _Row(zip(self._plan.names, self._plan.row(txn)), txn, history, blocklist)
+
+    def evaluate_row(self, row: _Row, decisive=False, observe=True) -> Tuple[int, List[Rule]]:
+        """(points, fired rules in config order); with `decisive`, stops once the verdict is fixed."""
+        points, fired = 0, []
+        if decisive:
+            remaining = self.max_points
+            for rule in self._row_order:
+                if self._decided(points, remaining):
+                    break
+                remaining -= rule.points
+                if rule.fires(row):
+                    points += rule.points
+                    fired.append(rule)
+            rank = self._rank
+            fired.sort(key=lambda rule: rank[rule.name])
+        else:
+            for rule in self.rules:
+                for test in rule.tests:
+                    if not test(row):
+                        break
+                else:
+                    points += rule.points
+                    fired.append(rule)
+        if observe:
+            for rule in fired:
+                RULE_HITS.inc(rule.name)
+        return points, fired
+
+    def apply(self, txn, history=None, blocklist=None, explain=True, observe=True) -> RuleResult:
+        row = self.row(txn, history, blocklist)
+        points, fired = self.evaluate_row(row, observe=observe)
+        reasons, triggers = [], []
+        if explain:
+            for rule in fired:
+                reason, trigger = rule.explain(row)
+                reasons.append(reason)
+                triggers.append(trigger)
+        return points >= self.threshold, self.score(points), reasons, triggers
+
+    def is_fraud(self, txn, history=None, blocklist=None) -> bool:
+        points, _ = self.evaluate_row(self.row(txn, history, blocklist), decisive=True)
+        return points >= self.threshold
+
+    # ---------- batches ----------
+    def context(self, txns, histories=None, blocklist=None, features: Optional[FeatureBatch] = None) -> RuleContext:
+        if histories is None:
+            histories = [None] * len(txns)
+        if features is None:
+            features = self._plan.extract(txns)
+        return RuleContext(txns, histories, blocklist, features, self.features)
+
+    def evaluate(self, ctx: RuleContext, decisive=False, rows=None, observe=True) -> "RuleOutcome":
+        """Run the rules over a batch.
+
+        By default every rule sees every row (or every row in `rows`), so
+        scores are exact. With `decisive` only the verdict is guaranteed:
+        rules run cheapest-per-point first and rows drop out once decided.
+        """
+        n = ctx.n
+        points = np.zeros(n, dtype=np.int64)
+        hits: Dict[str, np.ndarray] = {}
+        active = None if rows is None else np.asarray(rows, dtype=np.intp)
+        remaining = self.max_points
+        for rule in (self.ordered() if decisive else self.rules):
+            t0 = time.perf_counter()
+            fired = rule.select(ctx, active)
+            if observe:
+                RULE_SECONDS.observe(time.perf_counter() - t0, rule.name)
+                if fired.size:
+                    RULE_HITS.inc(rule.name, amount=int(fired.size))
+            if fired.size:
+                points[fired] += rule.points
+            hits[rule.name] = fired
+            if decisive:
+                remaining -= rule.points
+                candidates = np.arange(n) if active is None else active
+                p = points[candidates]
+                active = candidates[(p < self.threshold) & (p + remaining >= self.threshold)]
+                if not active.size:
+                    break
+        return RuleOutcome(self, ctx, points, hits)
+
+class RuleOutcome:
+    """Points and per-rule hits for a batch; explanations are formatted on request."""
+
+    def __init__(self, rules: RuleSet, ctx: RuleContext, points: np.ndarray, hits: Dict[str, np.ndarray]):
+        self.rules = rules
+        self.ctx = ctx
+        self.points = points
+        self.hits = hits
+
+    @property
+    def fraud(self) -> np.ndarray:
+        return self.points >= self.rules.threshold
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self.points / POINT_SCALE
+
+    def explanations(self, wanted) -> Tuple[List[list], List[list]]:
+        """Per-row reason and trigger lists, filled for rows where `wanted` is true (rules in config order)."""
+        n = self.ctx.n
+        reasons: List[list] = [[] for _ in range(n)]
+        triggers: List[list] = [[] for _ in range(n)]
+        for rule in self.rules.rules:
+            fired = self.hits.get(rule.name)
+            if fired is None or not fired.size:
+                continue
+            rows = fired.tolist() if wanted is True else fired[wanted[fired]].tolist()
+            for i in rows:
+                reason, trigger = rule.explain(_BatchRow(self.ctx, i))
+                reasons[i].append(reason)
+                triggers[i].append(trigger)
+        return reasons, triggers
+
+    def results(self, explain=True) -> List[RuleResult]:
+        """One (is_fraud, score, reasons, triggers) per row; `explain` is a bool or a per-row mask."""
+        n = self.ctx.n
+        fraud = self.fraud.tolist()
+        scores = self.scores.tolist()
+        if explain is False or explain is None:
+            return [(fraud[i], scores[i], [], []) for i in range(n)]
+        wanted = True if explain is True else np.asarray(explain, dtype=bool)
+        reasons, triggers = self.explanations(wanted)
+        return list(zip(fraud, scores, reasons, triggers))
+
+
+# ---------- loading ---------------------------------------------------------
+def resolve_rules_path(path=None):
+    """RULES_PATH (or `path`), relative paths taken from the backend directory."""
+    path = path or RULES_PATH
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+def compile_ruleset(spec: Dict[str, Any], version: str) -> RuleSet:
+    """Compile and smoke-test a spec: every rule must evaluate on an empty transaction both ways."""
+    rules = RuleSet(spec, version)
+    probe = [{}]
+    rules.apply(probe[0], observe=False)
+    rules.evaluate(rules.context(probe), observe=False).results()
+    return rules
+
+def load_ruleset(path=None) -> RuleSet:
+    path = resolve_rules_path(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    spec = json.loads(raw)
+    version = f"{spec.get('version', 0)}-{hashlib.sha256(raw).hexdigest()[:12]}"
+    return compile_ruleset(spec, version)
+
+
+class RuleRegistry:
+    """The live rule set, reloaded when its file changes.
+
+    Same swap discipline as ModelRegistry: a batch that already holds a
+    RuleSet finishes with it, and a file that fails to parse or compile
+    is logged and ignored until it changes again.
+    """
+
+    def __init__(self, path=None):
+        self.path = resolve_rules_path(path)
+        self._current: Optional[RuleSet] = None
+        self._stat = None
+        self._load_lock = threading.Lock()
+        self._checked = False
+
+    @property
+    def version(self):
+        return self.get().version
+
+    def get(self) -> RuleSet:
+        # check_reload swaps _current in one assignment, so a plain read needs no lock
+        current = self._current
+        if current is None:
+            if not self._checked:
+                self.check_reload()
+            current = self._current
+            if current is None:
+                raise RuntimeError(f"No usable rule set at {self.path}")
+        return current
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check_reload(self):
+        """Load the rules file if it changed since the last check; returns True on swap."""
+        with self._load_lock:
+            self._checked = True
+            stat = self._file_stat()
+            if stat is None or stat == self._stat:
+                return False
+            self._stat = stat
+            try:
+                rules = load_ruleset(self.path)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load rules {self.path}: {e}")
+                return False
+            if self._current is not None and rules.version == self._current.version:
+                return False
+            self._current = rules
+            logger.info(f"✅ Loaded {len(rules)} rules, version {rules.version}")
+            return True
+
+    def run_watcher(self, stop_event, interval=RULES_RELOAD_SECONDS):
+        while not stop_event.wait(interval):
+            self.check_reload()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_rule_registry():
+    global _registry
+    # Read the reference once; the lock is only taken to create it
+    registry = _registry
+    if registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RuleRegistry()
+            registry = _registry
+    return registry
+
+
+def get_rules() -> RuleSet:
+    return get_rule_registry().get()
@@ -0,0 +1,270 @@
+# fraud_ai_system/backend/src/scan_coordinator.py
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from fraud_ai_system.backend.src.db import get_db
+from fraud_ai_system.backend.src.incremental_scanner import CHECKPOINT_COLLECTION, IncrementalScanner
+
+logger = logging.getLogger(__name__)
+
+SCAN_SHARDS = int(os.getenv("SCAN_SHARDS", "1"))
+SCAN_LEASE_SECONDS = float(os.getenv("SCAN_LEASE_SECONDS", "30"))
+SCAN_HEARTBEAT_SECONDS = float(os.getenv("SCAN_HEARTBEAT_SECONDS", str(SCAN_LEASE_SECONDS / 3)))
+# How long a heartbeat waits for a stopped shard thread before leaving it to finish its batch
+SCAN_STOP_WAIT_SECONDS = float(os.getenv("SCAN_STOP_WAIT_SECONDS", "0.5"))
+
+LEASE_COLLECTION = "scan_leases"
+
+
+class ScanCoordinator:
+    """Splits the scan across every API process through Mongo leases.
+
+    The source collection is cut into SCAN_SHARDS slices by _scanBucket.
+    Each slice has a lease document in `scan_leases`; whoever holds it runs
+    that slice's IncrementalScanner (with its own checkpoint) in a thread.
+    Every process also heartbeats a membership document, and takes at most
+    ceil(shards / live members) leases, handing extras back when more
+    processes join. Leases are renewed on each heartbeat; one that is not
+    renewed within SCAN_LEASE_SECONDS expires and is picked up by another
+    process. SCAN_SHARDS=1 is plain leader election.
+
+    Stopping a shard never holds up the heartbeat: its thread is told to
+    stop after the batch in hand, and one that does not exit within
+    SCAN_STOP_WAIT_SECONDS is reaped on a later tick. A shard being handed
+    back keeps its lease renewed until its thread has exited, so two
+    scanners never run the same shard from one process's hand-over.
+    """
+
+    def __init__(self, name="auto_scan", shards=SCAN_SHARDS, lease_seconds=SCAN_LEASE_SECONDS,
+                 heartbeat_seconds=SCAN_HEARTBEAT_SECONDS, owner=None, stop_wait=SCAN_STOP_WAIT_SECONDS):
+        self.name = name
+        self.shards = max(1, shards)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stop_wait = stop_wait
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.scanners = {
+            k: IncrementalScanner(name=self.shard_name(k), shard=(k, self.shards))
+            for k in range(self.shards)
+        }
+        self.members = 1
+        self._held = {}   # shard -> (thread, stop_event)
+        self._stopping = {}   # shard -> (thread, release lease once it exits)
+        self._last_renewal = None
+
+    def shard_name(self, shard):
+        # A single shard keeps the pre-sharding checkpoint name
+        return self.name if self.shards == 1 else f"{self.name}:{shard}/{self.shards}"
+
+    def _leases(self):
+        return get_db()[LEASE_COLLECTION]
+
+    def _lease_id(self, shard):
+        return f"{self.shard_name(shard)}:lease"
+
+    # ---------- leases ----------
+    def try_acquire(self, shard):
+        now = datetime.utcnow()
+        try:
+            doc = self._leases().find_one_and_update(
+                {"_id": self._lease_id(shard),
+                 "$or": [{"owner": self.owner}, {"owner": None}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"group": self.name, "kind": "lease", "shard": shard, "owner": self.owner,
+                          "expires_at": now + timedelta(seconds=self.lease_seconds), "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False  # held by a live owner
+        return doc is not None and doc.get("owner") == self.owner
+
+    def renew(self, shard):
+        now = datetime.utcnow()
+        result = self._leases().update_one(
+            {"_id": self._lease_id(shard), "owner": self.owner},
+            {"$set": {"expires_at": now + timedelta(seconds=self.lease_seconds), "renewed_at": now}},
+        )
+        return result.matched_count == 1
+
+    def release(self, shard):
+        self._leases().update_one(
+            {"_id": self._lease_id(shard), "owner": self.owner},
+            {"$set": {"owner": None, "expires_at": datetime.utcnow()}},
+        )
+
+    def _fair_share(self):
+        now = datetime.utcnow()
+        leases = self._leases()
+        leases.update_one(
+            {"_id": f"{self.name}:member:{self.owner}"},
+            {"$set": {"group": self.name, "kind": "member", "owner": self.owner,
+                      "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+            upsert=True,
+        )
+        self.members = max(1, leases.count_documents(
+            {"group": self.name, "kind": "member", "expires_at": {"$gt": now}}))
+        return math.ceil(self.shards / self.members)
+
+    # ---------- shard threads ----------
+    def _seed_checkpoint(self, scanner):
+        """A shard with no checkpoint yet starts from the oldest watermark of this scan, not from zero."""
+        col = get_db()[CHECKPOINT_COLLECTION]
+        if col.find_one({"_id": scanner.name}, {"_id": 1}) is not None:
+            return
+        watermarks = [doc["last_id"] for doc in col.find({"_id": {"$regex": f"^{self.name}(:|$)"}},
+                                                         {"last_id": 1})
+                      if doc.get("last_id") is not None]
+        if watermarks:
+            col.update_one({"_id": scanner.name}, {"$setOnInsert": {"last_id": min(watermarks)}}, upsert=True)
+
+    def _start(self, shard):
+        scanner = self.scanners[shard]
+        self._seed_checkpoint(scanner)
+        scanner._loaded = False  # pick up the previous owner's watermark
+        stop = threading.Event()
+        thread = threading.Thread(target=scanner.run_forever, args=(stop,), daemon=True,
+                                  name=f"scan-{shard}")
+        self._held[shard] = (thread, stop)
+        thread.start()
+        logger.info(f"✅ Scan shard {shard}/{self.shards} acquired by {self.owner}")
+
+    def _stop(self, shard, release=True, wait=None):
+        """Stop a held shard; returns at most `wait` seconds later, whether or not its thread has exited."""
+        thread, stop = self._held.pop(shard)
+        stop.set()
+        thread.join(timeout=self.stop_wait if wait is None else wait)
+        if thread.is_alive():
+            logger.info(f"ℹ️ Scan shard {shard}/{self.shards} is finishing its batch before it stops")
+            self._stopping[shard] = (thread, release)
+        else:
+            self._stopped(shard, release)
+
+    def _stopped(self, shard, release):
+        if release:
+            try:
+                self.release(shard)
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Could not release scan shard {shard}: {e}")
+        logger.info(f"ℹ️ Scan shard {shard}/{self.shards} released by {self.owner}")
+
+    def _reap(self):
+        """Release shards whose stopped threads have exited; keep the rest of the hand-backs leased."""
+        for shard, (thread, release) in list(self._stopping.items()):
+            if not thread.is_alive():
+                del self._stopping[shard]
+                self._stopped(shard, release)
+            elif release and not self.renew(shard):
+                self._stopping[shard] = (thread, False)
+
+    def heartbeat(self):
+        """Renew held leases, hand back extras, and take free or expired ones up to the fair share.
+
+        A held shard whose scanner thread has exited is restarted, so a
+        live lease always has a live scanner behind it.
+        """
+        share = self._fair_share()
+        self._reap()
+        for shard in list(self._held):
+            if not self.renew(shard):
+                logger.warning(f"⚠️ Lost lease on scan shard {shard}/{self.shards}")
+                self._stop(shard, release=False)
+            elif not self._held[shard][0].is_alive():
+                logger.warning(f"⚠️ Scan shard {shard}/{self.shards} thread exited; restarting it")
+                self._held.pop(shard)
+                self._start(shard)
+        while len(self._held) > share:
+            self._stop(max(self._held))
+        # Start at an owner-specific offset so processes don't all race for shard 0
+        offset = hash(self.owner) % self.shards
+        for i in range(self.shards):
+            if len(self._held) >= share:
+                break
+            shard = (offset + i) % self.shards
+            if shard not in self._held and shard not in self._stopping and self.try_acquire(shard):
+                self._start(shard)
+        self._last_renewal = time.monotonic()
+
+    # ---------- loops ----------
+    def run_forever(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                self.heartbeat()
+            except PyMongoError as e:
+                logger.error(f"❌ Scan lease heartbeat failed: {e}")
+                # Others may take our shards once the leases run out; stop before that happens
+                if self._last_renewal is not None and \
+                        time.monotonic() - self._last_renewal > self.lease_seconds * 0.8:
+                    for shard in list(self._held):
+                        self._stop(shard, release=False)
+            stop_event.wait(self.heartbeat_seconds)
+        self.shutdown()
+
+    def shutdown(self):
+        for shard in list(self._held):
+            self._stop(shard, wait=self.lease_seconds)
+        for shard, (thread, release) in list(self._stopping.items()):
+            thread.join(timeout=self.lease_seconds)
+            del self._stopping[shard]
+            self._stopped(shard, release)
+        try:
+            self._leases().delete_one({"_id": f"{self.name}:member:{self.owner}"})
+        except PyMongoError:
+            pass
+
+    def scan_once(self):
+        """Drain every shard nobody else holds right now; returns the number of documents scanned."""
+        scanned = 0
+        for shard, scanner in self.scanners.items():
+            if shard in self._held or not self.try_acquire(shard):
+                continue
+            try:
+                self._seed_checkpoint(scanner)
+                scanner._loaded = False
+                scanned += scanner.drain()
+            finally:
+                self.release(shard)
+        return scanned
+
+    # ---------- observability ----------
+    def stats(self):
+        leases = list(self._leases().find({"group": self.name, "kind": "lease"},
+                                          {"shard": 1, "owner": 1, "expires_at": 1}).sort("shard", 1))
+        return {
+            "owner": self.owner,
+            "shards": self.shards,
+            "members": self.members,
+            "held": sorted(self._held),
+            "stopping": sorted(self._stopping),
+            "leases": [
+                {"shard": doc.get("shard"), "owner": doc.get("owner"),
+                 "expires_at": doc["expires_at"].isoformat() if doc.get("expires_at") else None}
+                for doc in leases
+            ],
+            "scanners": [self.scanners[shard].stats() for shard in sorted(self._held)],
+        }
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_scanner():
+    """Process-wide scan coordinator used by the background loop and /scan/status.
+
+    Its shard scanners score with whatever model the registry currently holds.
+    """
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = ScanCoordinator()
+        return _coordinator
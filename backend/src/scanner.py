@@ -1,36 +1,21 @@
 # fraud_ai_system/backend/src/scanner.py
 
-from fraud_ai_system.backend.src.db_handler import fetch_transactions, save_suspicious_transaction
-from fraud_ai_system.backend.src.apply_rules import apply_rules
-from fraud_ai_system.backend.src.ml_model import predict,load_model
+import logging
+from fraud_ai_system.backend.src.scan_coordinator import get_scanner
 
-model = load_model()
+logger = logging.getLogger(__name__)
 
 def scan_and_save_new_fraud():
-    try:
-        transactions = fetch_transactions(limit=200)  # Fetch latest 200
-        for txn in transactions:
-            try:
-                txn_id = txn.get("transaction_id") or txn.get("transactionId")
-                if not txn_id:
-                    continue
-
-                rules_flagged = apply_rules(txn)
-                ml_result = predict(model,txn)
-                risk_score = ml_result.get("risk_score", 0.0)
-                ml_prediction = ml_result.get("prediction", 0)
-
-                if rules_flagged or ml_prediction == 1:
-                    txn.update({
-                        "rules_flagged": rules_flagged,
-                        "ml_prediction": ml_prediction,
-                        "risk_score": risk_score
-                    })
-                    save_suspicious_transaction(txn)
+    """One-off scan pass, e.g. from a cron job or shell.
 
-            except Exception as err:
-                print(f"❌ Error processing transaction: {err}")
-
-        print("✅ Auto-scan complete. Suspicious data updated.")
+    Goes through the scan coordinator, so it only drains shards no running
+    API process currently holds and advances the same checkpoints instead
+    of rescoring the latest documents on its own.
+    """
+    try:
+        scanned = get_scanner().scan_once()
+        logger.info(f"✅ Auto-scan complete. {scanned} transactions scanned, suspicious data updated.")
+        return scanned
     except Exception as e:
-        print(f"❌ Error in auto-scanner: {e}")
+        logger.error(f"❌ Error in auto-scanner: {e}")
+        return 0
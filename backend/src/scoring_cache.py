@@ -0,0 +1,230 @@
+# fraud_ai_system/backend/src/scoring_cache.py
+
+import hashlib
+from bisect import bisect_left, bisect_right
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from fraud_ai_system.backend.src.apply_rules import ruleset_version
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.db import get_db, run_blocking
+from fraud_ai_system.backend.src.features import FEATURES, get_path
+from fraud_ai_system.backend.src.history_store import beneficiary_key, get_history_store
+from fraud_ai_system.backend.src.metrics import SCORE_CACHE_LOOKUPS
+from fraud_ai_system.backend.src.model_registry import get_registry
+from fraud_ai_system.backend.src.ml_model import model_columns
+from fraud_ai_system.backend.src.rule_engine import HISTORY_FIELDS, get_rules
+
+logger = logging.getLogger(__name__)
+
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "100000"))
+SCORE_CACHE_PERSIST = os.getenv("SCORE_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+CACHE_COLLECTION = "score_cache"
+
+# Every raw field the feature spec reads, plus what the blocklist matches on
+KEY_PATHS = tuple(dict.fromkeys(
+    [path for f in FEATURES for path in f.paths] + [("mobileNumber",)]
+))
+
+
+def _bucket(value, cuts):
+    """Where `value` sits among the thresholds `cuts`: enough to decide any comparison with them."""
+    if cuts is None:
+        return value
+    return bisect_left(cuts, value), bisect_right(cuts, value)
+
+
+def content_key(txn, history, context, cuts=None):
+    """Hash of everything a verdict depends on.
+
+    The transaction's scoring fields, the history bits rules 7 and 9 read,
+    its velocity and geo values, and `context` (ruleset, model and blocklist versions). Any change to
+    one of them gives a new key, so stale verdicts are never served.
+
+    `cuts` (see ScoringCache.history_cuts) narrows the velocity and geo
+    values to the ones the rules and model read, bucketed by the rules'
+    thresholds; without it every value is hashed as is.
+    """
+    values = tuple(get_path(txn, path, None) for path in KEY_PATHS)
+    if history:
+        flagged = history.get("flagged_accounts") or ()
+        acct = beneficiary_key(txn)
+        if cuts is None:
+            cuts = dict.fromkeys(HISTORY_FIELDS)
+        hist = (history.get("last_imei"), bool(acct and acct in flagged),
+                tuple(_bucket((history.get(HISTORY_FIELDS[name]) or {}).get(name, 0), c) for name, c in cuts.items()))
+    else:
+        hist = None
+    return hashlib.blake2b(repr((context, values, hist)).encode(), digest_size=16).hexdigest()
+
+
+class ScoringCache:
+    """Two-tier verdict cache: in-process LRU in front of the `score_cache` collection.
+
+    Entries are keyed by content_key, so a transaction is only rescored
+    when its scoring fields, its history, the rules, the model or the
+    blocklist changed. Persisted entries expire after SCORE_CACHE_TTL_DAYS
+    (indexes.SCORE_CACHE_TTL_DAYS; the TTL index is declared in indexes.INDEXES).
+    """
+
+    def __init__(self, max_size=SCORE_CACHE_SIZE, persist=SCORE_CACHE_PERSIST):
+        self.max_size = max_size
+        self.persist = persist
+        self._lru = OrderedDict()
+        self._cuts = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lru)
+
+    def context(self, model_version=None):
+        if model_version is None:
+            model_version = get_registry().version
+        return f"{ruleset_version()}|{model_version}|{get_blocklist().version}"
+
+    def history_cuts(self, model=None):
+        """content_key buckets: the rules' thresholds per history field they read, exact values for model inputs.
+
+        Velocity and geo values nobody reads are left out of the key, and the
+        ones rules read only matter up to which side of each threshold they
+        fall. That keeps keys stable for transactions without an event time,
+        whose values drift with the wall clock. Cached reasons show the values
+        from when the verdict was first computed.
+
+        `model` is the (version, model) pair being scored with, the live one
+        when omitted.
+        """
+        model_version, model = model or get_registry().current()
+        rules = get_rules()
+        version = (rules.version, model_version)
+        cached = self._cuts
+        if cached is None or cached[0] != version:
+            cuts = dict(rules.history_cuts)
+            if model is not None:
+                cuts.update((name, None) for name in model_columns(model) if name in HISTORY_FIELDS)
+            cached = self._cuts = (version, cuts)
+        return cached[1]
+
+    def _collection(self):
+        return get_db()[CACHE_COLLECTION]
+
+    # ---------- LRU ----------
+    def _get_local(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._lru.get(key)
+                if result is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = result
+        return found
+
+    def _put_local(self, items):
+        with self._lock:
+            for key, result in items:
+                self._lru[key] = result
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    # ---------- both tiers ----------
+    def lookup(self, keys):
+        """{key: verdict} for every key either tier knows; persisted hits are promoted to the LRU."""
+        found = self._get_local(keys)
+        SCORE_CACHE_LOOKUPS.inc("memory", "hit", amount=len(found))
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.persist:
+            try:
+                docs = list(self._collection().find({"_id": {"$in": missing}}, {"result": 1}))
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Score cache lookup failed: {e}")
+                docs = []
+            persisted = {doc["_id"]: doc["result"] for doc in docs}
+            self._put_local(persisted.items())
+            found.update(persisted)
+            SCORE_CACHE_LOOKUPS.inc("mongo", "hit", amount=len(persisted))
+            missing = [key for key in missing if key not in persisted]
+        SCORE_CACHE_LOOKUPS.inc("all", "miss", amount=len(missing))
+        return found
+
+    def store(self, entries):
+        """Remember (key, txn_id, verdict) triples in both tiers."""
+        entries = [(key, txn_id, result) for key, txn_id, result in entries if result is not None]
+        if not entries:
+            return
+        self._put_local((key, result) for key, _, result in entries)
+        if not self.persist:
+            return
+        now = datetime.utcnow()
+        ops = [UpdateOne({"_id": key},
+                         {"$setOnInsert": {"transactionId": txn_id, "result": result, "created_at": now}},
+                         upsert=True)
+               for key, txn_id, result in entries]
+        try:
+            self._collection().bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Score cache write failed: {e}")
+
+    async def score(self, batch, executor):
+        """Verdicts for a micro-batch, scoring only what neither tier has seen.
+
+        Returns (verdicts, fresh): one verdict (or None) per transaction,
+        and which of them were computed by this call.
+
+        The model is resolved once, so keys name the model that scored;
+        verdicts a process worker computed with another model version
+        (it caught up with a newer file) are stored under that version,
+        or not at all while this process has yet to load it.
+        """
+        model = get_registry().current()
+
+        def keys_for(indexes, histories, model):
+            context = self.context(model[0])
+            cuts = self.history_cuts(model)
+            return [content_key(batch[i], histories[i], context, cuts) for i in indexes]
+
+        def keys_and_hits():
+            # History lookups and hashing are CPU work: keep them off the event loop
+            histories = get_history_store().histories_for(batch, observe=False)
+            keys = keys_for(range(len(batch)), histories, model)
+            return histories, keys, self.lookup(keys)
+        histories, keys, hits = await run_blocking(keys_and_hits)
+
+        miss_idx = [i for i, key in enumerate(keys) if key not in hits]
+        verdicts = [hits.get(key) for key in keys]
+        fresh = [False] * len(batch)
+        if miss_idx:
+            version, scored = await executor.score([batch[i] for i in miss_idx], [histories[i] for i in miss_idx],
+                                                   model)
+            for i, result in zip(miss_idx, scored):
+                verdicts[i] = result
+                fresh[i] = result is not None
+            miss_keys = [keys[i] for i in miss_idx]
+            if version != model[0]:
+                # Keys need the scoring model's inputs: skip storing until this process has loaded it
+                current = get_registry().current()
+                miss_keys = await run_blocking(keys_for, miss_idx, histories, current) \
+                    if current[0] == version else []
+            await run_blocking(self.store, [(key, batch[i].get("transactionId"), verdicts[i])
+                                            for key, i in zip(miss_keys, miss_idx)])
+        # Callers may annotate verdicts; never hand out the cached objects themselves
+        return [dict(v) if v is not None else None for v in verdicts], fresh
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_scoring_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScoringCache()
+        return _cache
@@ -0,0 +1,298 @@
+# fraud_ai_system/backend/src/scoring_executor.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fraud_ai_system.backend.src.apply_rules import check_transaction, check_transactions
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.db import run_blocking
+from fraud_ai_system.backend.src.features import RULE_FEATURES, SCORING_FEATURES, extract_batch
+from fraud_ai_system.backend.src.history_store import beneficiary_key, get_history_store
+from fraud_ai_system.backend.src.metrics import (
+    SCORING_ACTIVE, SCORING_QUEUE_DEPTH, SCORING_REJECTED, SCORING_WAIT_SECONDS,
+)
+from fraud_ai_system.backend.src.ml_model import predict_batch
+from fraud_ai_system.backend.src.model_registry import get_registry
+from fraud_ai_system.backend.src.rule_engine import get_rule_registry
+
+logger = logging.getLogger(__name__)
+
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "thread")   # thread | process
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Batches allowed to wait for a worker before new work is rejected
+SCORING_QUEUE_SIZE = int(os.getenv("SCORING_QUEUE_SIZE", "16"))
+SCORING_RETRY_AFTER_SECONDS = int(os.getenv("SCORING_RETRY_AFTER_SECONDS", "1"))
+SCORING_MP_START = os.getenv("SCORING_MP_START", "spawn")
+
+
+class ScoringOverloaded(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+# ---------- worker side -----------------------------------------------------
+def _worker_model(model_version, model):
+    """The (version, model) pair to score with: `model` when the caller resolved one."""
+    if model is not None:
+        return model
+    registry = get_registry()
+    # Process workers have their own registry; catch up when the parent swapped models
+    if model_version is not None and registry.version != model_version:
+        registry.check_reload()
+    return registry.current()
+
+# Process workers: the blocklist as (version, index), first loaded by the pool initializer
+_blocklist = None
+
+# What process workers are sent instead of the blocklist itself
+BlocklistSnapshot = namedtuple("BlocklistSnapshot", "version path")
+
+def _worker_blocklist(blocklist):
+    """The index to match against; a snapshot is loaded from its file once per version."""
+    global _blocklist
+    if not isinstance(blocklist, BlocklistSnapshot):
+        return blocklist
+    if _blocklist is None or _blocklist[0] != blocklist.version:
+        with open(blocklist.path, "rb") as f:
+            index = pickle.load(f)
+        _blocklist = (blocklist.version, index)
+    return _blocklist[1]
+
+def _worker_rules(rules_version):
+    registry = get_rule_registry()
+    if rules_version is not None and registry.version != rules_version:
+        registry.check_reload()
+
+def score_batch(batch, histories, blocklist=None, model_version=None, rules_version=None, model=None):
+    """Rules + model for one micro-batch.
+
+    Returns one verdict dict per transaction (None for a transaction that
+    could not be scored). Runs on a scoring worker, so everything it needs
+    that lives in the API process arrives as arguments: thread workers
+    get the (version, model) pair itself, process workers its version.
+    """
+    return score_versioned(batch, histories, blocklist, model_version, rules_version, model)[1]
+
+def score_versioned(batch, histories, blocklist=None, model_version=None, rules_version=None, model=None):
+    """score_batch, plus the version of the model that scored it: (model version, verdicts)."""
+    version, model = _worker_model(model_version, model)
+    _worker_rules(rules_version)
+    blocklist = _worker_blocklist(blocklist)
+    features = None
+    try:
+        features = extract_batch(batch, SCORING_FEATURES if model is not None else RULE_FEATURES)
+        results = check_transactions(batch, histories, blocklist, features)
+    except Exception as err:
+        # A malformed document fails the whole batch; rescore one by one so it can be skipped
+        logger.warning(f"Batch scoring failed, falling back to per-transaction: {err}")
+        results, features = [], None
+        for txn, history in zip(batch, histories):
+            try:
+                results.append(check_transaction(txn, history, blocklist))
+            except Exception as txn_err:
+                logger.warning(f"Skipping bad transaction: {txn_err}")
+                results.append(None)
+
+    if model is None:
+        return version, results
+    kept = [i for i, result in enumerate(results) if result is not None]
+    scored = [(batch[i], results[i]) for i in kept]
+    try:
+        ml_results = predict_batch(model, [txn for txn, _ in scored],
+                                   features if len(scored) == len(batch) else None,
+                                   [histories[i] for i in kept] if histories is not None else None)
+    except Exception as err:
+        logger.warning(f"Model scoring failed for batch: {err}")
+        return version, results
+
+    for (_, result), ml in zip(scored, ml_results):
+        result["ml_prediction"] = ml["prediction"]
+        result["ml_risk_score"] = ml["risk_score"]
+    return version, results
+
+def _timed_call(fn, *args):
+    # Wall clock, so the start time means the same thing in a worker process
+    return time.time(), fn(*args)
+
+def _compact_history(txn, history):
+    """History with flagged_accounts cut down to this transaction's beneficiary, for pickling."""
+    flagged = history.get("flagged_accounts")
+    if not flagged:
+        return history
+    acct = beneficiary_key(txn)
+    return {**history, "flagged_accounts": {acct} if acct and acct in flagged else set()}
+
+
+# ---------- executor --------------------------------------------------------
+class ScoringExecutor:
+    """Bounded pool that keeps CPU-bound scoring off the event loop.
+
+    At most `workers` batches run at once and `queue_size` more may wait;
+    beyond that submit() raises ScoringOverloaded straight away so callers
+    can shed load instead of queueing latency. Thread workers share the
+    process's model, blocklist and history; process workers get a trimmed
+    history shipped with each batch and load the model themselves. The
+    blocklist is written to a snapshot file once per version: workers load
+    it in the pool initializer, and again on the first batch that names a
+    newer version, the way rules are reloaded by version.
+    """
+
+    def __init__(self, kind=SCORING_EXECUTOR, workers=SCORING_WORKERS, queue_size=SCORING_QUEUE_SIZE):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown SCORING_EXECUTOR {kind!r} (expected 'thread' or 'process')")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_dir = None
+        self._snapshot = BlocklistSnapshot(None, None)
+        if kind == "process":
+            self._snapshot_dir = tempfile.mkdtemp(prefix="scoring-blocklist-")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context(SCORING_MP_START),
+                                             initializer=_worker_blocklist, initargs=(self._blocklist_snapshot(),))
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._closed = False
+        self._completed = 0
+        self._rejected = 0
+        self._waited = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # ---------- accounting ----------
+    def _publish(self):
+        active = min(self._in_flight, self.workers)
+        SCORING_ACTIVE.set(active)
+        SCORING_QUEUE_DEPTH.set(self._in_flight - active)
+
+    def _done(self, submitted_at, future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            if not future.cancelled() and future.exception() is None:
+                wait = max(0.0, future.result()[0] - submitted_at)
+                self._waited += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                SCORING_WAIT_SECONDS.observe(wait)
+            self._publish()
+
+    # ---------- submission ----------
+    def submit(self, fn, *args):
+        """Queue fn(*args); the future resolves to (started_at, result)."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scoring executor is shut down")
+            if self._in_flight >= self.workers + self.queue_size:
+                self._rejected += 1
+                SCORING_REJECTED.inc()
+                raise ScoringOverloaded(f"{self._in_flight} scoring batches in flight")
+            self._in_flight += 1
+            self._publish()
+        submitted_at = time.time()
+        try:
+            future = self._pool.submit(_timed_call, fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                self._publish()
+            raise
+        future.add_done_callback(lambda f: self._done(submitted_at, f))
+        return future
+
+    async def run(self, fn, *args):
+        _, result = await asyncio.wrap_future(self.submit(fn, *args))
+        return result
+
+    def _blocklist_snapshot(self):
+        """The live blocklist as process workers see it; written out only when its version changed."""
+        blocklist = get_blocklist()
+        with self._snapshot_lock:
+            if blocklist.version != self._snapshot.version:
+                path = os.path.join(self._snapshot_dir, "blocklist.pkl")
+                fd, tmp = tempfile.mkstemp(dir=self._snapshot_dir)
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(blocklist, f, protocol=pickle.HIGHEST_PROTOCOL)
+                # Renamed into place, so a worker never reads a half-written file
+                os.replace(tmp, path)
+                self._snapshot = BlocklistSnapshot(blocklist.version, path)
+            return self._snapshot
+
+    def submit_score(self, batch, histories=None, model=None, fn=score_batch):
+        """Queue one micro-batch for scoring; the future resolves to (started_at, verdicts).
+
+        `model` is the (version, model) pair to score with, the live one
+        when omitted; process workers are sent only its version and load
+        that model themselves.
+        """
+        if histories is None:
+            histories = get_history_store().histories_for(batch, observe=False)
+        if model is None:
+            model = get_registry().current()
+        if self.kind == "thread":
+            return self.submit(fn, batch, histories, None, None, None, model)
+        histories = [_compact_history(txn, h) for txn, h in zip(batch, histories)]
+        return self.submit(fn, batch, histories, self._blocklist_snapshot(), model[0],
+                           get_rule_registry().version)
+
+    async def score(self, batch, histories=None, model=None):
+        """Score one micro-batch on the pool; returns (model version, one verdict or None per transaction)."""
+        # The history lookup is CPU work of its own: do it off the event loop too
+        future = await run_blocking(self.submit_score, batch, histories, model, score_versioned)
+        _, result = await asyncio.wrap_future(future)
+        return result
+
+    def stats(self):
+        with self._lock:
+            active = min(self._in_flight, self.workers)
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "active_workers": active,
+                "queue_depth": self._in_flight - active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": round(self._wait_total / self._waited, 6) if self._waited else 0.0,
+                "max_wait_seconds": round(self._wait_max, 6),
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        if self._snapshot_dir is not None:
+            shutil.rmtree(self._snapshot_dir, ignore_errors=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_scoring_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ScoringExecutor()
+            logger.info(f"✅ Scoring executor ready ({_executor.kind}, {_executor.workers} workers, "
+                        f"queue {_executor.queue_size})")
+        return _executor
+
+
+def shutdown_scoring_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
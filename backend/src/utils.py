@@ -1,46 +1,136 @@
+import base64
+import json
+import logging
+import math
+import os
+import threading
+import zlib
 from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from uuid import UUID
+
+from bson import Binary, Decimal128, ObjectId, json_util
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+# Distinct keys counted at once; past it the counts start over
+LOG_SAMPLE_MAX_KEYS = int(os.getenv("LOG_SAMPLE_MAX_KEYS", "1000"))
+_sample_counts = {}
+_sample_lock = threading.Lock()
+
+def log_sampled(logger, level, msg, *args, key=None, every=LOG_SAMPLE_EVERY):
+    """Emit the first and then one of every `every` calls per key (default: the message template).
+
+    For per-transaction messages on hot paths, so a burst costs one line
+    per `every` transactions instead of one each. Keys are meant to be
+    templates; if more than LOG_SAMPLE_MAX_KEYS pile up (say, a caller
+    formatting ids into the message) all counts are reset.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    key = key or msg
+    with _sample_lock:
+        n = _sample_counts.get(key, 0)
+        if not n and len(_sample_counts) >= LOG_SAMPLE_MAX_KEYS:
+            _sample_counts.clear()
+        _sample_counts[key] = n + 1
+    if n % every == 0:
+        logger.log(level, msg + (f" [sampled 1/{every}, {n + 1} so far]" if n else ""), *args)
+
+# Micro-batch size used by the scan loop and /predict
+SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", "500"))
+
+# Canonical transaction id field (the API alias); legacy documents may carry transaction_id
+TXN_ID_FIELD = "transactionId"
+
+# Ingest-time hash of the transaction id; scan shards select their slice with $mod
+SCAN_BUCKET_FIELD = "_scanBucket"
+
+def scan_bucket(txn_id):
+    return zlib.crc32(str(txn_id).encode())
+
+# Trimmed, case-folded copy of `name` stamped at ingest; name search is an indexed prefix match on it
+NAME_NORM_FIELD = "nameNorm"
+
+def normalize_name(name):
+    """Collapse whitespace and case-fold, so "  Ravi  KUMAR" and "ravi kumar" compare equal."""
+    return " ".join(str(name).split()).casefold()
+
+def canonical_txn_id(txn):
+    return txn.get(TXN_ID_FIELD) or txn.get("transaction_id")
+
+def normalize_txn_id(txn):
+    """Copy a legacy transaction_id onto the canonical field; returns the id (or None)."""
+    txn_id = canonical_txn_id(txn)
+    if txn_id:
+        txn[TXN_ID_FIELD] = txn_id
+    return txn_id
+
+def chunked(items, size=SCORING_BATCH_SIZE):
+    """Yield lists of at most `size` items from any iterable."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
 
 def parse_date(date_str, fmt='%Y-%m-%d %H:%M:%S'):
     try:
         return datetime.strptime(date_str, fmt)
     except (ValueError, TypeError) as e:
-        print(f"Date parse error for '{date_str}': {e}")
+        log_sampled(logger, logging.DEBUG, "Date parse error for %r: %s", date_str, e)
         return None
 
-def extract_features(transaction):
-    parsed_time = parse_date(transaction.get('timestamp'))
-    features = {
-        'amount': transaction.get('amount', 0),
-        'hour': parsed_time.hour if parsed_time else 0,
-        # Future: add weekday, location anomalies, device ID flags, etc.
-    }
-    return features
-
-def extract_features(transaction: dict) -> dict:
-    partner = transaction.get("partnerDetails", {}) or {}
-    admin = transaction.get("adminDetails", {}) or {}
-    agent = transaction.get("agentDetails", {}) or {}
-    meta = transaction.get("metaData", {}) or {}
-    operator = transaction.get("operator", {}) or {}
-
-    features = {
-        "partner_amount": partner.get("amount", 0),
-        "partner_credit": partner.get("credit", 0),
-        "partner_debit": partner.get("debit", 0),
-        "partner_TDS": partner.get("TDS", 0),
-        "partner_GST": partner.get("GST", 0),
-        "admin_commission": admin.get("commissionAmount", 0),
-        "admin_credited": admin.get("creditedAmount", 0),
-        "admin_TDS": admin.get("TDSAmount", 0),
-        "agent_commission": agent.get("commissionAmount", 0),
-        "agent_credited": agent.get("creditedAmount", 0),
-        "agent_TDS": agent.get("TDSAmount", 0),
-        "ip_address": transaction.get("ipAddress", meta.get("ipAddress", "")),
-        "device_type": meta.get("deviceType", ""),
-        "latitude": meta.get("lat", ""),
-        "longitude": meta.get("long", ""),
-        "operator_ifsc": operator.get("key2", ""),
-        "mobile_number": operator.get("mobileNumber", "")
-    }
-
-    return features
+# ---------- BSON → JSON -----------------------------------------------------
+# Same relaxed Extended JSON shapes bson.json_util produces ({"$oid": ...},
+# {"$date": ...}), encoded in a single pass instead of dumps → loads → dumps.
+# Dates are encoded by json_util itself, so they match it exactly (no ".000"
+# on whole seconds, {"$numberLong": ...} before 1970). One difference: NaN
+# and ±Infinity are written as null, not {"$numberDouble": "NaN"}, because
+# plain floats never reach the `default` hook.
+
+def _finite(obj):
+    """Copy of `obj` with non-finite floats replaced by None, as orjson writes them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+def bson_default(obj):
+    if isinstance(obj, ObjectId):
+        return {"$oid": str(obj)}
+    if isinstance(obj, datetime):
+        return json_util.default(obj)
+    if isinstance(obj, Decimal128):
+        return {"$numberDecimal": str(obj)}
+    if isinstance(obj, Decimal):
+        return {"$numberDecimal": str(obj)}
+    if isinstance(obj, (Binary, bytes)):
+        subtype = getattr(obj, "subtype", 0)
+        return {"$binary": {"base64": base64.b64encode(bytes(obj)).decode(), "subType": f"{subtype:02x}"}}
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps_bson(doc) -> bytes:
+    """Encode a document (or list) holding BSON types straight to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(doc, default=bson_default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    try:
+        return json.dumps(doc, default=bson_default, ensure_ascii=False, separators=(",", ":"),
+                          allow_nan=False).encode()
+    except ValueError:
+        # NaN / Infinity somewhere in the document: null them like the orjson path does
+        return json.dumps(_finite(doc), default=bson_default, ensure_ascii=False, separators=(",", ":")).encode()
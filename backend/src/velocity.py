@@ -0,0 +1,153 @@
+# fraud_ai_system/backend/src/velocity.py
+"""Sliding-window transaction counts and amounts per mobile, IMEI, IP and beneficiary.
+
+Each key keeps, for every window in VELOCITY_WINDOWS, a ring of
+VELOCITY_BUCKETS time buckets plus the running count and amount over the
+ring. Moving the ring forward clears only the buckets that fell out, so
+recording and reading cost a handful of list operations per window,
+whatever its length. Windows are bucket-aligned: "last 10 minutes" covers
+the current bucket and the ones before it, up to 10 minutes in total.
+
+Time is the transaction's event time (the `dt` feature), falling back to
+the wall clock when it has none, so a replay or a bulk load counts bursts
+as they happened. Keys are evicted least recently seen first beyond
+VELOCITY_MAX_KEYS per dimension. Values are read before the transaction
+itself is recorded, so they count the transactions that came before it.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+from fraud_ai_system.backend.src.features import compile_features
+
+# (field suffix, seconds)
+VELOCITY_WINDOWS = (("1m", 60), ("10m", 600), ("60m", 3600))
+VELOCITY_BUCKETS = int(os.getenv("VELOCITY_BUCKETS", "6"))
+VELOCITY_MAX_KEYS = int(os.getenv("VELOCITY_MAX_KEYS", "50000"))
+
+VELOCITY_DIMENSIONS = ("mobile", "imei", "ip", "benef")
+# Context fields for rules and model columns: <dimension>_<count|amount>_<window>
+VELOCITY_FIELDS = tuple(f"{dim}_{metric}_{label}" for dim in VELOCITY_DIMENSIONS
+                        for label, _ in VELOCITY_WINDOWS for metric in ("count", "amount"))
+
+_KEY_FEATURES = ("signal_amount", "imei", "ip", "benef_acct", "dt")
+
+
+class VelocityStore:
+    """Windowed counters for every key seen recently; see the module docstring.
+
+    A key's state is one flat list: per window its head bucket, running
+    count and amount, then the ring's counts and amounts.
+    """
+
+    def __init__(self, buckets=VELOCITY_BUCKETS, max_keys=VELOCITY_MAX_KEYS):
+        self.buckets = max(1, buckets)
+        self.max_keys = max_keys
+        self.widths = tuple(seconds / self.buckets for _, seconds in VELOCITY_WINDOWS)
+        self.stride = 3 + 2 * self.buckets
+        self._keys = {dim: OrderedDict() for dim in VELOCITY_DIMENSIONS}
+        self._plan = compile_features(_KEY_FEATURES)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def stats(self):
+        return {dim: len(keys) for dim, keys in self._keys.items()}
+
+    # ---------- ring arithmetic ----------
+    def _new_entry(self, buckets):
+        entry = []
+        for bucket in buckets:
+            entry += [bucket, 0, 0.0] + [0] * self.buckets + [0.0] * self.buckets
+        return entry
+
+    def _totals(self, entry, base, bucket):
+        """(count, amount) over the window ending at `bucket`, without moving the ring."""
+        head, n = entry[base], self.buckets
+        if bucket == head:
+            return entry[base + 1], entry[base + 2]
+        counts, amounts = base + 3, base + 3 + n
+        if bucket > head:
+            # Held buckets that have already left the window ending at `bucket`
+            if bucket - head >= n:
+                return 0, 0.0
+            count, amount = entry[base + 1], entry[base + 2]
+            for b in range(head - n + 1, bucket - n + 1):
+                count -= entry[counts + b % n]
+                amount -= entry[amounts + b % n]
+            return count, (amount if count else 0.0)
+        # Out of order: sum the held buckets that fall inside its window
+        count, amount = 0, 0.0
+        for b in range(max(head - n + 1, bucket - n + 1), bucket + 1):
+            count += entry[counts + b % n]
+            amount += entry[amounts + b % n]
+        return count, amount
+
+    def _record(self, entry, base, bucket, amount):
+        head, n = entry[base], self.buckets
+        counts, amounts = base + 3, base + 3 + n
+        if bucket > head:
+            if bucket - head >= n:
+                entry[base + 1:base + 3 + 2 * n] = [0, 0.0] + [0] * n + [0.0] * n
+            else:
+                for b in range(head + 1, bucket + 1):
+                    slot = b % n
+                    entry[base + 1] -= entry[counts + slot]
+                    entry[base + 2] -= entry[amounts + slot]
+                    entry[counts + slot] = 0
+                    entry[amounts + slot] = 0.0
+                if not entry[base + 1]:
+                    entry[base + 2] = 0.0   # drop float drift once the window is empty
+            entry[base] = bucket
+        elif bucket <= head - n:
+            return   # older than anything the ring holds
+        slot = bucket % n
+        entry[counts + slot] += 1
+        entry[amounts + slot] += amount
+        entry[base + 1] += 1
+        entry[base + 2] += amount
+
+    # ---------- batches ----------
+    def observe_batch(self, txns: Sequence[Dict], record=True) -> List[Dict[str, float]]:
+        """Velocity fields for each transaction in order, recording each one after it is read.
+
+        A later transaction in the batch sees the earlier ones, as if they
+        had been scored one at a time. With record=False nothing is stored.
+        """
+        features = self._plan.extract(txns)
+        amounts, imeis, ips, accts, dts = (features[name] for name in _KEY_FEATURES)
+        widths, stride = self.widths, self.stride
+        now = time.time()
+        out = []
+        with self._lock:
+            for i, txn in enumerate(txns):
+                dt = dts[i]
+                t = dt.timestamp() if dt else now
+                buckets = [int(t // width) for width in widths]
+                amount = amounts[i]
+                values = []
+                for dim, key in zip(VELOCITY_DIMENSIONS, (txn.get("mobileNumber"), imeis[i], ips[i], accts[i])):
+                    if key and not isinstance(key, str):
+                        key = str(key)   # ids stored as numbers, or malformed sub-documents
+                    keys = self._keys[dim]
+                    entry = keys.get(key) if key else None
+                    if entry is None:
+                        values += [0, 0.0] * len(widths)
+                        if not key or not record:
+                            continue
+                        entry = keys[key] = self._new_entry(buckets)
+                        while len(keys) > self.max_keys:
+                            keys.popitem(last=False)
+                    else:
+                        for w, bucket in enumerate(buckets):
+                            values += self._totals(entry, w * stride, bucket)
+                        if not record:
+                            continue
+                        keys.move_to_end(key)
+                    for w, bucket in enumerate(buckets):
+                        self._record(entry, w * stride, bucket, amount)
+                out.append(dict(zip(VELOCITY_FIELDS, values)))
+        return out
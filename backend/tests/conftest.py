@@ -0,0 +1,99 @@
+# fraud_ai_system/backend/tests/conftest.py
+"""Shared fixtures. Run from the checkout (or from the directory holding it):
+
+    python -m pytest
+
+Mongo is replaced by mongomock; nothing here needs a server.
+"""
+import atexit
+import copy
+import importlib.util
+import inspect
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+
+def _expose_checkout():
+    """Make the checkout importable as `fraud_ai_system` when it is not already.
+
+    The modules import each other as fraud_ai_system.backend...; a checkout
+    under another directory name gets a symlink of that name on sys.path.
+    A path entry (not a sys.modules alias) also reaches spawned workers.
+    """
+    if importlib.util.find_spec("fraud_ai_system") is not None:
+        return
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parent = tempfile.mkdtemp(prefix="fraud_ai_system-")
+    link = os.path.join(parent, "fraud_ai_system")
+    os.symlink(root, link, target_is_directory=True)
+    sys.path.insert(0, parent)
+
+    def cleanup():
+        os.unlink(link)
+        os.rmdir(parent)
+    atexit.register(cleanup)
+
+
+_expose_checkout()
+
+from fraud_ai_system.backend.benchmarks.synthetic import generate_transactions
+from fraud_ai_system.backend.src import blocklist, db, db_handler, history_store
+
+
+def _accept_bulk_sort(mongomock):
+    """pymongo >= 4.11 passes sort= to every bulk update; older mongomock builders reject it."""
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ("add_update", "add_replace"):
+        method = getattr(builder, name)
+        if "sort" in inspect.signature(method).parameters:
+            continue
+
+        def drop_sort(self, *args, _method=method, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock cannot sort bulk updates")
+            return _method(self, *args, **kwargs)
+        setattr(builder, name, drop_sort)
+
+
+@pytest.fixture
+def mongo():
+    mongomock = pytest.importorskip("mongomock")
+    _accept_bulk_sort(mongomock)
+    db.init_client(mongomock.MongoClient())
+    db_handler._indexed_collections.clear()
+    history_store._store = None
+    blocklist._index = blocklist.BlocklistIndex()
+    yield db.get_db()
+    history_store._store = None
+    db.close_client()
+
+
+@pytest.fixture(scope="session")
+def transactions():
+    """Synthetic transactions, with beneficiaries reused so the history rules fire too."""
+    txns = generate_transactions(1500, seed=7)
+    rng = random.Random(1)
+    for i, txn in enumerate(txns):
+        if i > 50 and rng.random() < 0.2:
+            txn["moneyTransferBeneficiaryDetails"] = dict(txns[rng.randint(0, i - 1)]["moneyTransferBeneficiaryDetails"])
+    return txns
+
+
+@pytest.fixture
+def malformed(transactions):
+    """Copies of a few transactions with the field shapes real dumps turn up."""
+    bad = copy.deepcopy(transactions[:7])
+    bad[0]["partnerDetails"]["amount"] = "N/A"
+    bad[1]["partnerDetails"] = None
+    bad[2]["lat"], bad[2]["long"] = "x", None
+    bad[3]["imeiNumber"] = ["123", "456"]
+    bad[4]["timestamp"] = "yesterday"
+    bad[5]["moneyTransferBeneficiaryDetails"] = "12345"
+    bad[6]["moneyTransferBeneficiaryDetails"] = {"accountNumber": 12345678, "ifsc": None}
+    for i, txn in enumerate(bad):
+        txn["transactionId"] = f"BAD{i:04d}"
+    return bad
@@ -0,0 +1,73 @@
+"""The batch rule paths give the same verdicts as the per-transaction one."""
+import pytest
+
+from fraud_ai_system.backend.src.apply_rules import (
+    apply_rules, apply_rules_batch, check_transaction, check_transactions, classify_batch, process_transactions,
+)
+from fraud_ai_system.backend.src.blocklist import BlocklistIndex
+from fraud_ai_system.backend.src.history_store import HistoryStore
+from fraud_ai_system.backend.src.rule_engine import get_rules
+
+
+@pytest.fixture(scope="module")
+def scored(transactions):
+    """(transactions, histories, blocklist) with histories built in stream order."""
+    txns = transactions[:600]
+    store = HistoryStore()
+    histories = []
+    for start in range(0, len(txns), 100):
+        batch = txns[start:start + 100]
+        histories += store.histories_for(batch)
+        store.record_results(batch, check_transactions(batch, histories[start:start + 100], BlocklistIndex()))
+    blocklist = BlocklistIndex()
+    blocklist.add("mobile", txns[3]["mobileNumber"])
+    blocklist.add("ip", "10.")
+    return txns, histories, blocklist
+
+
+def test_apply_rules_batch_matches_apply_rules(scored):
+    txns, histories, blocklist = scored
+    expected = [apply_rules(txn, history, blocklist) for txn, history in zip(txns, histories)]
+    assert apply_rules_batch(txns, histories, blocklist) == expected
+    assert any(fraud for fraud, *_ in expected)
+
+
+def test_unexplained_batch_keeps_verdicts_and_scores(scored):
+    txns, histories, blocklist = scored
+    full = apply_rules_batch(txns, histories, blocklist)
+    bare = apply_rules_batch(txns, histories, blocklist, explain=False)
+    assert [(fraud, score) for fraud, score, _, _ in bare] == [(fraud, score) for fraud, score, _, _ in full]
+    assert all(reasons == [] and triggers == [] for _, _, reasons, triggers in bare)
+
+
+def test_decisive_paths_match_full_evaluation(scored):
+    txns, histories, blocklist = scored
+    expected = [fraud for fraud, *_ in apply_rules_batch(txns, histories, blocklist)]
+    assert classify_batch(txns, histories, blocklist).tolist() == expected
+    rules = get_rules()
+    assert [rules.is_fraud(txn, history, blocklist) for txn, history in zip(txns, histories)] == expected
+
+
+def test_check_transactions_matches_check_transaction(scored):
+    txns, histories, blocklist = scored
+    expected = [check_transaction(txn, history, blocklist) for txn, history in zip(txns, histories)]
+    assert check_transactions(txns, histories, blocklist) == expected
+
+
+def test_flagged_only_matches_on_flagged_rows(mongo, scored):
+    txns, histories, _ = scored
+    full = process_transactions(txns, None, histories)
+    partial = process_transactions(txns, None, histories, flagged_only=True)
+    for f, p in zip(full, partial):
+        assert f["rules_flagged"] == p["rules_flagged"]
+        if f["rules_flagged"]:
+            assert f == p
+        else:
+            assert p["reasons"] == [] and p["risk_score"] <= f["risk_score"]
+
+
+def test_malformed_documents_do_not_fail_their_batch(mongo, transactions, malformed):
+    good = transactions[:20]
+    results = process_transactions(good + malformed)
+    assert len(results) == len(good) + len(malformed)
+    assert results[:len(good)] == process_transactions(good)
@@ -0,0 +1,53 @@
+"""Range headers for attachment downloads: suffix, open-ended and unsatisfiable ranges."""
+import asyncio
+import io
+
+import pytest
+
+from fraud_ai_system.backend.src.attachments import RangeNotSatisfiable, iter_range, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-10", (10, 10)),
+    (" bytes=10-19 ", (10, 19)),
+    ("bytes=990-2000", (990, 999)),     # end past the file is clamped
+    ("bytes=500-", (500, 999)),         # open-ended
+    ("bytes=999-", (999, 999)),
+    ("bytes=-100", (900, 999)),         # suffix: the last 100 bytes
+    ("bytes=-5000", (0, 999)),          # suffix longer than the file is the whole file
+    # Ignored, so the whole file is sent
+    ("bytes=-", None),
+    ("bytes=20-10", None),
+    ("bytes=0-9,20-29", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header, length", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-1005", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=0-", 0),
+    ("bytes=-10", 0),
+])
+def test_unsatisfiable_ranges(header, length):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, length)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=3-9", "bytes=-4", "bytes=990-2000"])
+def test_iter_range_streams_exactly_the_range(header):
+    data = bytes(range(256)) * 4
+    start, end = parse_range(header, len(data))
+
+    async def collect():
+        return [chunk async for chunk in iter_range(io.BytesIO(data), start, end, chunk_bytes=7)]
+    chunks = asyncio.run(collect())
+    assert b"".join(chunks) == data[start:end + 1]
+    assert all(len(chunk) <= 7 for chunk in chunks)
@@ -0,0 +1,71 @@
+"""Replaying a stream gives the trigger patterns, alerts and levels live scoring gave it."""
+import json
+from collections import Counter
+
+import pytest
+
+from fraud_ai_system.backend.src import backtest
+from fraud_ai_system.backend.src.apply_rules import check_transactions
+from fraud_ai_system.backend.src.blocklist import BlocklistIndex
+from fraud_ai_system.backend.src.history_store import HistoryStore
+from fraud_ai_system.backend.src.rule_engine import get_rules
+
+BATCH = 100
+
+
+@pytest.fixture
+def live(transactions):
+    """Score the stream batch by batch as the scanner does; (txns, blocklist, verdicts, pattern codes)."""
+    txns = [dict(txn) for txn in transactions[:800]]
+    blocklist = BlocklistIndex()
+    blocklist.add("mobile", txns[3]["mobileNumber"])
+    rules = get_rules()
+    bits = {rule.name: 1 << bit for bit, rule in enumerate(rules.rules)}
+    store = HistoryStore()
+    verdicts, codes = [], []
+    for start in range(0, len(txns), BATCH):
+        batch = txns[start:start + BATCH]
+        histories = store.histories_for(batch)
+        results = check_transactions(batch, histories, blocklist)
+        for txn, history in zip(batch, histories):
+            _, fired = rules.evaluate_row(rules.row(txn, history, blocklist), observe=False)
+            codes.append(sum(bits[rule.name] for rule in fired))
+        store.record_results(batch, results)
+        verdicts += results
+    return txns, blocklist, verdicts, codes
+
+
+def _batches(source, mongo, tmp_path, txns, labels):
+    if source == "file":
+        path = tmp_path / "export.ndjson"
+        with open(path, "w") as f:
+            for txn, label in zip(txns, labels):
+                f.write(json.dumps({**txn, "is_fraud": label}) + "\n")
+        return backtest.file_batches(str(path), batch_size=BATCH)
+    mongo["predict"].insert_many([dict(txn) for txn in txns])
+    mongo["fraud_data"].insert_many([{"transactionId": txn["transactionId"], "is_fraud": True}
+                                     for txn, label in zip(txns, labels) if label])
+    return backtest.mongo_batches(batch_size=BATCH)
+
+
+@pytest.mark.parametrize("source", ["file", "mongo"])
+def test_replay_matches_live_scoring(mongo, tmp_path, live, source):
+    txns, blocklist, verdicts, codes = live
+    # Label with the live verdicts, so the replay flags the same beneficiaries the live run did
+    labels = [verdict["status"] == "fraudulent" for verdict in verdicts]
+    assert 0 < sum(labels) < len(labels)
+    table = backtest.replay(_batches(source, mongo, tmp_path, txns, labels), workers=0, blocklist=blocklist)
+
+    assert table.skipped == 0
+    assert table.transactions == len(txns)
+    replayed = Counter()
+    for code, pos, neg in zip(table.codes.tolist(), table.positives.tolist(), table.negatives.tolist()):
+        replayed[code, True] += pos
+        replayed[code, False] += neg
+    assert +replayed == Counter(zip(codes, labels))
+
+    report = backtest.sweep(table, [backtest.base_config(table)], workers=0)[0]
+    assert report["alerts"] == report["tp"] == sum(labels)
+    assert report["fp"] == 0
+    assert report["levels_count"] == {level: Counter(v["risk_level"] for v in verdicts)[level]
+                                      for level in report["levels_count"]}
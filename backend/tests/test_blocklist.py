@@ -0,0 +1,69 @@
+"""IPPrefixSet matches like the prefixes it was given and counts each one once; BlocklistIndex.version tracks changes."""
+import ipaddress
+import random
+
+from bson import ObjectId
+
+from fraud_ai_system.backend.src.blocklist import BlocklistIndex, IPPrefixSet
+
+PREFIXES = ["10.", "192.168.", "172.16.0.0/16", "203.0.113.7", "198.51.100.0/24", "100.64.0.0/10", "8.8.8.8/32"]
+
+
+def _reference(prefixes, ip):
+    """What each prefix means, checked the slow way."""
+    for prefix in prefixes:
+        if "/" in prefix:
+            if ipaddress.IPv4Address(ip) in ipaddress.ip_network(prefix, strict=False):
+                return True
+        elif prefix.endswith("."):
+            if ip.startswith(prefix):
+                return True
+        elif ip == prefix:
+            return True
+    return False
+
+
+def test_membership_matches_reference():
+    rng = random.Random(3)
+    ips = ["10.0.0.1", "100.1.2.3", "192.168.255.1", "192.169.0.1", "172.16.9.9", "172.17.0.1",
+           "203.0.113.7", "203.0.113.70", "198.51.100.200", "100.64.0.1", "100.127.255.255", "100.128.0.0",
+           "8.8.8.8", "8.8.8.9"]
+    ips += [".".join(str(rng.choice([10, 100, 172, 192, 198, 203, rng.randint(0, 255)])) if i == 0
+                     else str(rng.randint(0, 255)) for i in range(4)) for _ in range(2000)]
+    prefixes = IPPrefixSet(PREFIXES)
+    for ip in ips:
+        assert (ip in prefixes) == _reference(PREFIXES, ip), ip
+    assert "not an ip" not in prefixes
+
+
+def test_len_counts_each_prefix_once_however_it_is_written():
+    prefixes = IPPrefixSet(PREFIXES)
+    assert len(prefixes) == len(PREFIXES)
+    for same in ["10.0.0.0/8", " 10. ", "192.168.0.0/16", "172.16.", "203.0.113.7/32", "8.8.8.8",
+                 "198.51.100.9/24", "100.100.0.0/10", "2001:db8::/32"]:
+        prefixes.add(same)
+    assert len(prefixes) == len(PREFIXES)
+    prefixes.add("100.0.0.0/10")
+    assert len(prefixes) == len(PREFIXES) + 1
+
+
+def test_version_changes_with_the_entries_only():
+    docs = [{"_id": ObjectId(), "type": kind, "value": value}
+            for kind, value in [("mobile", "9000000001"), ("IMEI Number", "351756051523999"),
+                                ("ip", "10."), ("beneficiary", "12345HDFC0001")]]
+    index = BlocklistIndex().load(docs)
+    assert len(index) == 4 and index.last_id == docs[-1]["_id"]
+    version = index.version
+
+    # Re-adding what is already there is not a change
+    assert index.add("phone", "9000000001") and index.add("ipaddress", "10.0.0.0/8")
+    assert index.version == version
+    # Unknown types and blank values are refused
+    assert not index.add("email", "x@example.com") and not index.add("mobile", "  ")
+    assert index.version == version
+
+    index.add("utr", "UTR1")
+    assert index.version != version
+    # A rebuild that lost an entry has the same last_id but another version
+    rebuilt = BlocklistIndex().load(docs[:2] + docs[3:])
+    assert rebuilt.last_id == index.last_id and rebuilt.version != version
@@ -0,0 +1,39 @@
+"""Identifier features fall back to metaData when the top-level field is absent."""
+import copy
+
+from fraud_ai_system.backend.src.apply_rules import check_transaction, check_transactions
+from fraud_ai_system.backend.src.blocklist import BlocklistIndex
+from fraud_ai_system.backend.src.features import extract_batch, extract_row
+from fraud_ai_system.backend.src.history_store import HistoryStore
+
+
+def _device_only_in_metadata(txn, imei):
+    txn = copy.deepcopy(txn)
+    txn.pop("imeiNumber", None)
+    txn["metaData"] = {**(txn.get("metaData") or {}), "imeiNumber": imei}
+    return txn
+
+
+def test_imei_falls_back_to_metadata(transactions):
+    txn = _device_only_in_metadata(transactions[0], "351756051523999")
+    assert extract_row(txn, ("imei",))["imei"] == "351756051523999"
+    # The top-level field wins when both are present
+    both = dict(txn, imeiNumber="490154203237518")
+    assert extract_batch([txn, both], ("imei",))["imei"] == ["351756051523999", "490154203237518"]
+
+
+def test_metadata_imei_drives_device_rules(transactions):
+    first = _device_only_in_metadata(transactions[0], "351756051523999")
+    second = _device_only_in_metadata(first, "490154203237518")
+    store = HistoryStore()
+    store.observe(first)
+    history = store.histories_for([second], observe=False)[0]
+    assert history["last_imei"] == "351756051523999"
+
+    blocklist = BlocklistIndex()
+    scalar = check_transaction(second, history, blocklist)
+    assert scalar == check_transactions([second], [history], blocklist)[0]
+    assert "IMEI changed vs. previous device" in scalar["reasons"]
+
+    blocklist.add("imei", "490154203237518")
+    assert check_transactions([second], [history], blocklist)[0]["status"] == "fraudulent"
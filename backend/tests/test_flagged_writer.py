@@ -0,0 +1,95 @@
+"""FlaggedWriter retries failed flushes without losing or duplicating rows, and blocks producers when full."""
+import threading
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from fraud_ai_system.backend.src import flagged_writer
+from fraud_ai_system.backend.src.flagged_writer import FlaggedWriter
+
+RESULT = {"status": "fraudulent", "rules_flagged": True, "risk_score": 0.9, "reasons": ["probe"], "triggers": []}
+
+
+class Outage:
+    """Makes flushes fail (before the bulk write) until it is over or `failures` have happened."""
+
+    def __init__(self, monkeypatch, failures=None):
+        self.failures = failures
+        self.calls = 0
+        self.over = threading.Event()
+        ensure = flagged_writer.ensure_txn_id_index
+
+        def failing(col):
+            self.calls += 1
+            if not self.over.is_set() and (self.failures is None or self.calls <= self.failures):
+                raise AutoReconnect("connection refused")
+            return ensure(col)
+        monkeypatch.setattr(flagged_writer, "ensure_txn_id_index", failing)
+
+
+@pytest.fixture
+def writer(mongo):
+    writers = []
+
+    def make(**kwargs):
+        writers.append(FlaggedWriter(collection="fraud_data", flush_seconds=0.05, retry_max_seconds=0.2, **kwargs))
+        return writers[-1]
+    yield make
+    for w in writers:
+        w.close(timeout=5)
+
+
+def _txns(transactions, n):
+    return [dict(txn) for txn in transactions[:n]]
+
+
+def test_failed_flushes_are_retried_in_order(mongo, transactions, writer, monkeypatch):
+    outage = Outage(monkeypatch, failures=3)
+    w = writer(flush_size=50)
+    txns = _txns(transactions, 120)
+    for txn in txns + txns[:10]:      # re-adds are stored once
+        assert w.add(txn, RESULT)
+    assert w.flush(timeout=10)
+    assert w.failed_flushes == 3 and outage.calls > 3
+    stored = [doc["transactionId"] for doc in mongo["fraud_data"].find({}, {"transactionId": 1}).sort("_id", 1)]
+    assert stored == [txn["transactionId"] for txn in txns]
+    assert w.written_total == len(txns) and len(w) == 0
+
+
+def test_full_buffer_blocks_producers_until_mongo_is_back(mongo, transactions, writer, monkeypatch):
+    outage = Outage(monkeypatch)
+    w = writer(flush_size=10, max_buffer=30)
+    txns = _txns(transactions, 45)
+    for txn in txns[:30]:
+        w.add(txn, RESULT)
+
+    producer = threading.Thread(target=lambda: [w.add(txn, RESULT) for txn in txns[30:]], daemon=True)
+    producer.start()
+    producer.join(0.5)
+    assert producer.is_alive()
+    assert len(w) <= 30
+    assert not w.flush(timeout=0.2)
+    assert mongo["fraud_data"].count_documents({}) == 0
+
+    outage.over.set()
+    producer.join(10)
+    assert not producer.is_alive()
+    assert w.flush(timeout=10)
+    assert mongo["fraud_data"].count_documents({}) == len(txns)
+
+
+def test_add_without_an_id_is_refused(mongo, writer):
+    w = writer()
+    assert not w.add({"amount": 1}, RESULT)
+    assert len(w) == 0
+
+
+def test_close_drains_the_buffer(mongo, transactions, writer):
+    w = writer(flush_size=1000)
+    for txn in _txns(transactions, 25):
+        w.add(txn, RESULT)
+    assert w.close(timeout=5)
+    assert mongo["fraud_data"].count_documents({"is_fraud": True}) == 25
+    with pytest.raises(RuntimeError):
+        w.add(dict(transactions[30]), RESULT)
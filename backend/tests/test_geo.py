@@ -0,0 +1,92 @@
+"""Haversine distances, implied travel speed, and hotspot counts over a cell and its neighbours."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from fraud_ai_system.backend.src.geo import GEO_MIN_SECONDS, GeoStore, geohash, haversine
+
+MUMBAI = (19.0760, 72.8777)
+DELHI = (28.7041, 77.1025)
+BASE = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def _txn(point, seconds=0, mobile="9000000001", imei=None):
+    txn = {"mobileNumber": mobile, "lat": point[0], "long": point[1],
+           "timestamp": (BASE + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")}
+    if imei:
+        txn["imeiNumber"] = imei
+    return txn
+
+
+def test_haversine_known_distances():
+    assert haversine(*MUMBAI, *DELHI) == pytest.approx(1153, rel=0.01)
+    assert haversine(*DELHI, *MUMBAI) == pytest.approx(haversine(*MUMBAI, *DELHI))
+    assert haversine(0.0, 0.0, 0.0, 1.0) == pytest.approx(111.19, rel=1e-3)
+    # Vectorised over arrays, as observe_batch calls it
+    km = haversine(np.array([MUMBAI[0], 0.0]), np.array([MUMBAI[1], 179.5]), np.array([DELHI[0], 0.0]),
+                   np.array([DELHI[1], -179.5]))
+    assert km.tolist() == pytest.approx([1153, 111.19], rel=0.01)
+
+
+def test_travel_speed():
+    store = GeoStore()
+    first, two_hours_later = store.observe_batch([_txn(MUMBAI), _txn(DELHI, 7200)])
+    assert first == {"travel_km": 0.0, "travel_kmh": 0.0, "hotspot_frauds": 0.0}
+    assert two_hours_later["travel_km"] == pytest.approx(1153, rel=0.01)
+    assert two_hours_later["travel_kmh"] == pytest.approx(two_hours_later["travel_km"] / 2)
+
+    # Near-simultaneous: elapsed time is floored, so the speed is large but finite
+    back = store.observe_batch([_txn(MUMBAI, 7201)])[0]
+    assert back["travel_kmh"] == pytest.approx(back["travel_km"] / (GEO_MIN_SECONDS / 3600))
+
+    # A short hop is location noise
+    nearby = (MUMBAI[0] + 0.05, MUMBAI[1])
+    assert store.observe_batch([_txn(nearby, 7300)])[0]["travel_kmh"] == 0.0
+
+
+def test_device_move_counts_for_another_customer():
+    store = GeoStore()
+    store.observe_batch([_txn(MUMBAI, mobile="9000000001", imei="351756051523999")])
+    moved = store.observe_batch([_txn(DELHI, 3600, mobile="9000000002", imei="351756051523999")])[0]
+    assert moved["travel_kmh"] == pytest.approx(1153, rel=0.01)
+
+
+def test_missing_and_null_island_coordinates_are_ignored():
+    store = GeoStore()
+    store.observe_batch([_txn(MUMBAI)])
+    for point in [(0.0, 0.0), ("x", None), (None, None), (95.0, 10.0)]:
+        assert store.observe_batch([_txn(point, 3600)])[0] == {"travel_km": 0.0, "travel_kmh": 0.0,
+                                                                "hotspot_frauds": 0.0}
+    # None of them replaced the last known location
+    assert store.observe_batch([_txn(DELHI, 7200)])[0]["travel_km"] == pytest.approx(1153, rel=0.01)
+
+
+def _cell_steps(store):
+    return 180.0 / store.lat_cells, 360.0 / store.lon_cells
+
+
+def test_hotspot_counts_a_cell_and_its_eight_neighbours():
+    store = GeoStore(precision=6)
+    dlat, dlon = _cell_steps(store)
+    # The middle of a cell, so offsets of whole cells land in the middle of others
+    rows, cols = store._cells_of(np.array([MUMBAI[0]]), np.array([MUMBAI[1]]))
+    center = ((rows[0] + 0.5) * dlat - 90.0, (cols[0] + 0.5) * dlon - 180.0)
+    store.record_fraud([_txn(center), _txn(center, 10), _txn((center[0] + dlat, center[1] - dlon), 20)])
+
+    def frauds(point, seconds=60):
+        return store.observe_batch([_txn(point, seconds, mobile=None)], record=False)[0]["hotspot_frauds"]
+    assert frauds(center) == 3
+    assert frauds((center[0] + dlat, center[1])) == 3              # neighbour of both cells
+    assert frauds((center[0] - dlat, center[1] - dlon)) == 2       # next to the centre only
+    assert frauds((center[0] + 2 * dlat, center[1] - dlon)) == 1   # next to the upper cell only
+    assert frauds((center[0] - 2 * dlat, center[1])) == 0
+    assert frauds(center, seconds=store.ttl_seconds + 120) == 0    # expired
+    assert store.hotspots(1) == [{"geohash": geohash(*center, 6), "frauds": 2, "last_seen": pytest.approx(
+        (BASE + timedelta(seconds=10)).timestamp())}]
+
+
+def test_hotspot_neighbours_wrap_at_the_antimeridian():
+    store = GeoStore(precision=5)
+    store.record_fraud([_txn((10.0, 179.99))])
+    assert store.observe_batch([_txn((10.0, -179.99), mobile=None)], record=False)[0]["hotspot_frauds"] == 1
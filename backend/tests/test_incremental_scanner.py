@@ -0,0 +1,111 @@
+"""Malformed documents pass through the scanner without stalling its watermark."""
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from fraud_ai_system.backend.src import incremental_scanner
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.incremental_scanner import CHECKPOINT_COLLECTION, IncrementalScanner
+
+
+class RecordingWriter:
+    """Stands in for the write-behind FlaggedWriter; keeps what was queued."""
+
+    def __init__(self):
+        self.ids = []
+
+    def add(self, txn, result):
+        self.ids.append(txn.get("transactionId"))
+        return True
+
+    def flush(self, timeout=None):
+        return True
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = RecordingWriter()
+    monkeypatch.setattr(incremental_scanner, "get_flagged_writer", lambda: writer)
+    return writer
+
+
+@pytest.fixture
+def predict(mongo, transactions, malformed):
+    docs = [dict(txn) for txn in transactions[:200]]
+    # Malformed documents in the middle of the stream, not only at its edges
+    docs[100:100] = [dict(txn) for txn in malformed]
+    mongo["predict"].insert_many(docs)
+    return mongo["predict"]
+
+
+def test_malformed_documents_are_scanned_once(mongo, predict, writer, malformed):
+    # Flagged, so its numeric account number goes into the flagged-beneficiary history
+    get_blocklist().add("mobile", malformed[6]["mobileNumber"])
+    scanner = IncrementalScanner(name="test_scan", batch_size=64)
+    total = predict.count_documents({})
+    assert scanner.drain() == total
+    assert scanner.processed_total == total
+    assert "BAD0006" in writer.ids
+    assert "12345678" in scanner.history.histories_for([malformed[6]])[0]["flagged_accounts"]
+    newest = predict.find_one({}, {"_id": 1}, sort=[("_id", -1)])["_id"]
+    assert mongo[CHECKPOINT_COLLECTION].find_one({"_id": "test_scan"})["last_id"] == newest
+    assert len(writer.ids) == len(set(writer.ids)) == scanner.flagged_total
+
+    # A restarted scanner resumes from the checkpoint: nothing new past it, and
+    # only the lookback window (here, all of it) is checked again
+    assert IncrementalScanner(name="test_scan", batch_size=64, lookback_seconds=0).drain() == 0
+    again = IncrementalScanner(name="test_scan", batch_size=64)
+    assert again.drain() == again.late_total == total
+    assert mongo[CHECKPOINT_COLLECTION].find_one({"_id": "test_scan"})["last_id"] == newest
+
+
+def test_late_document_behind_the_watermark_is_scanned(mongo, predict, writer, transactions):
+    scanner = IncrementalScanner(name="test_scan", batch_size=64, lookback_seconds=300)
+    total = predict.count_documents({})
+    assert scanner.drain() == total
+    watermark = scanner.last_id
+
+    # Committed after the scan passed it, with an _id a few seconds older than the watermark
+    late = dict(transactions[500], _id=ObjectId.from_datetime(watermark.generation_time - timedelta(seconds=5)))
+    # Too old for the window: documented as missed
+    stale = dict(transactions[501], _id=ObjectId.from_datetime(watermark.generation_time - timedelta(seconds=900)))
+    predict.insert_many([late, stale])
+    assert late["_id"] < watermark
+
+    assert scanner.drain() == 1
+    assert scanner.late_total == 1
+    assert scanner.processed_total == total + 1
+    assert scanner.last_id == watermark
+    assert mongo[CHECKPOINT_COLLECTION].find_one({"_id": "test_scan"})["last_id"] == watermark
+    # Each late document is scanned once
+    assert scanner.drain() == 0
+
+
+def test_failed_batch_is_retried_without_killing_the_loop(mongo, predict, writer, monkeypatch):
+    scanner = IncrementalScanner(name="test_scan", batch_size=64, min_interval=0.01, max_interval=0.05)
+    score = scanner.score
+    failures = {"left": 1}
+
+    def flaky(docs, projected=False):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise ValueError("could not convert string to float: 'N/A'")
+        return score(docs, projected)
+
+    monkeypatch.setattr(scanner, "score", flaky)
+    stop = threading.Event()
+    thread = threading.Thread(target=scanner.run_forever, args=(stop,), daemon=True)
+    thread.start()
+    total = predict.count_documents({})
+    deadline = time.monotonic() + 30
+    while scanner.processed_total < total and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    thread.join(timeout=5)
+
+    assert failures["left"] == 0
+    assert scanner.processed_total == total
+    assert not thread.is_alive()
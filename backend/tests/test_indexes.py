@@ -0,0 +1,35 @@
+"""Index maintenance backfills the fields other writers leave out."""
+from fraud_ai_system.backend.src.indexes import backfill_scan_bucket, run_index_maintenance
+from fraud_ai_system.backend.src.utils import NAME_NORM_FIELD, SCAN_BUCKET_FIELD, normalize_name, scan_bucket
+
+
+def test_maintenance_spreads_unbucketed_documents_over_shards(mongo, transactions):
+    docs = [dict(txn, name=f"  Customer {i}  ") for i, txn in enumerate(transactions[:200])]
+    docs[0] = {"transaction_id": "LEGACY1", "name": "Legacy"}      # pre-canonical id field
+    docs[1] = {"status": "SUCCESS"}                               # no id at all
+    mongo["predict"].insert_many(docs)
+    # Without the field every document belongs to shard 0 (see incremental_scanner.shard_query)
+    assert mongo["predict"].count_documents({SCAN_BUCKET_FIELD: {"$exists": True}}) == 0
+
+    run_index_maintenance()
+
+    for doc in mongo["predict"].find():
+        key = doc.get("transactionId") or doc.get("transaction_id") or doc["_id"]
+        assert doc[SCAN_BUCKET_FIELD] == scan_bucket(key)
+        if "name" in doc:
+            assert doc[NAME_NORM_FIELD] == normalize_name(doc["name"])
+    # mongomock has no $mod, so split the shards here as shard_query does on the server
+    counts = [0] * 4
+    for doc in mongo["predict"].find({}, {SCAN_BUCKET_FIELD: 1}):
+        counts[doc[SCAN_BUCKET_FIELD] % 4] += 1
+    assert all(count > len(docs) // 8 for count in counts)
+
+
+def test_scan_bucket_backfill_resumes_after_a_given_id(mongo, transactions):
+    col = mongo["predict"]
+    col.insert_many([dict(txn) for txn in transactions[:10]])
+    assert backfill_scan_bucket(col) == 10
+    after = col.find_one(sort=[("_id", -1)])["_id"]
+    col.insert_many([dict(txn) for txn in transactions[10:15]])
+    assert backfill_scan_bucket(col, after=after) == 5
+    assert col.count_documents({SCAN_BUCKET_FIELD: {"$exists": False}}) == 0
@@ -0,0 +1,116 @@
+"""CompiledValidator agrees with the pydantic model; RecordStream splits the same however the body is chunked."""
+import copy
+import json
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from fraud_ai_system.backend.src.db_model import Transaction
+from fraud_ai_system.backend.src.ingest import CompiledValidator, RecordStream
+
+VALUES = [None, 1, 2.5, True, False, "3.5", " 4 ", "x", "", [], {}, [1], "1e3", "nan", 10 ** 400]
+
+
+def _paths(doc, prefix=()):
+    for key, value in list(doc.items()):
+        yield prefix + (key,)
+        if isinstance(value, dict):
+            yield from _paths(value, prefix + (key,))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                yield prefix + (key, i)
+                if isinstance(item, dict):
+                    yield from _paths(item, prefix + (key, i))
+
+
+def _mutate(doc, rng):
+    """Delete or retype up to three fields, anywhere in the document."""
+    doc = copy.deepcopy(doc)
+    for _ in range(rng.randint(0, 3)):
+        path = rng.choice(list(_paths(doc)))
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        if rng.random() < 0.3 and isinstance(parent, dict):
+            del parent[path[-1]]
+        else:
+            parent[path[-1]] = rng.choice(VALUES)
+    if rng.random() < 0.2:
+        doc["transaction_id"] = doc.pop("transactionId", "T")
+    if rng.random() < 0.1:
+        doc["extra"] = {"junk": 1}
+    return doc
+
+
+def _pydantic(raw):
+    """(document, sorted error locations) the way POST /fraud sees the record."""
+    try:
+        model = Transaction(**raw)
+    except ValidationError as e:
+        return None, sorted(".".join(map(str, err["loc"])) for err in e.errors())
+    # pydantic 2 renamed .dict(); POST /fraud serialises the same either way
+    dump = model.model_dump if hasattr(model, "model_dump") else model.dict
+    return dump(by_alias=True), None
+
+
+def test_compiled_validator_matches_pydantic(transactions):
+    validator = CompiledValidator()
+    rng = random.Random(1)
+    valid = 0
+    for _ in range(3000):
+        raw = _mutate(rng.choice(transactions[:200]), rng)
+        expected, expected_errors = _pydantic(raw)
+        doc, errors = validator(raw)
+        if expected is None:
+            assert doc is None
+            assert sorted(err["loc"] for err in errors) == expected_errors
+        else:
+            valid += 1
+            # via JSON so nan == nan
+            assert errors == []
+            assert json.dumps(doc, sort_keys=True) == json.dumps(expected, sort_keys=True)
+    assert 0 < valid < 3000
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "array"])
+def test_record_stream_is_chunking_independent(transactions, fmt):
+    records = transactions[:300] + [1, "s", None, [1, 2], {"a": "é "}]
+    lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    body = ("\n".join(lines) + "\n" if fmt == "ndjson" else "[ " + " ,\n".join(lines) + " ]").encode()
+    rng = random.Random(fmt)
+    for _ in range(10):
+        stream, out, pos = RecordStream(), [], 0
+        while pos < len(body):
+            step = rng.randint(1, 3000)
+            out += stream.feed(body[pos:pos + step])
+            pos += step
+        out += stream.close()
+        assert stream.format == fmt
+        assert [error for _, _, error, _ in out if error] == []
+        assert [record for _, record, _, _ in out] == records
+        assert [index for index, _, _, _ in out] == list(range(len(records)))
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "array"])
+def test_record_stream_resumes_at_any_record_offset(transactions, fmt):
+    records = transactions[:50]
+    lines = [json.dumps(record) for record in records]
+    body = ("\n".join(lines) + "\n" if fmt == "ndjson" else "[" + ",\n".join(lines) + "]").encode()
+    stream = RecordStream()
+    first = stream.feed(body) + stream.close()
+    for index, _, _, offset in first[:-1]:
+        resumed = RecordStream(resume=(offset, index + 1, fmt))
+        rest = resumed.feed(body[offset:]) + resumed.close()
+        assert [(i, record) for i, record, _, _ in rest] == [(i, record) for i, record, _, _ in first[index + 1:]]
+
+
+def test_record_stream_reports_bad_records_and_continues():
+    stream = RecordStream(max_record_bytes=200)
+    body = b'{"a":1}\nnot json\n\n{"b":2}\n{"c":"' + b"x" * 500 + b'"}\n{"d":4}'
+    out = []
+    for i in range(0, len(body), 7):
+        out += stream.feed(body[i:i + 7])
+    out += stream.close()
+    assert [record for _, record, error, _ in out if not error] == [{"a": 1}, {"b": 2}, {"d": 4}]
+    assert [index for index, _, error, _ in out if error] == [1, 3]
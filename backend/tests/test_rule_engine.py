@@ -0,0 +1,38 @@
+"""Rule file templates reach row values only, and a rejected file leaves the live rules in place."""
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pytest
+
+from fraud_ai_system.backend.src.rule_engine import RuleRegistry, Template, resolve_rules_path
+
+
+@pytest.mark.parametrize("field", ["dt.__class__", "dt.__class__.__init__.__globals__", "dt._secret", "ip[0].__doc__"])
+def test_underscore_attributes_are_rejected(field):
+    with pytest.raises(ValueError, match="bad template field"):
+        Template("{" + field + "}", "probe")
+
+
+def test_attribute_and_index_access_still_render():
+    row = {"dt": datetime(2024, 1, 2, 13, 5), "blocked": ("ip", "10."), "utr": ""}
+    assert Template("{dt.hour} {blocked[1]} {utr|MISSING} {dt:%H:%M}", "probe").render(row) == "13 10. MISSING 13:05"
+
+
+def test_rejected_rules_file_keeps_the_live_rules(tmp_path):
+    path = str(tmp_path / "rules.json")
+    shutil.copy(resolve_rules_path(), path)
+    registry = RuleRegistry(path)
+    live = registry.get()
+
+    with open(path) as f:
+        spec = json.load(f)
+    spec["version"] = "next"
+    spec["rules"][0]["reason"] = "{dt.__class__.__init__.__globals__}"
+    with open(path, "w") as f:
+        json.dump(spec, f)
+    os.utime(path, ns=(0, 0))
+
+    assert registry.check_reload() is False
+    assert registry.get() is live
@@ -0,0 +1,89 @@
+"""Scan leases: fair-share rebalancing, takeover of expired leases, and hand-backs that never block the heartbeat."""
+import threading
+import time
+
+import pytest
+
+from fraud_ai_system.backend.src import scan_coordinator
+from fraud_ai_system.backend.src.incremental_scanner import IncrementalScanner
+from fraud_ai_system.backend.src.scan_coordinator import ScanCoordinator
+
+
+@pytest.fixture
+def coordinators(mongo):
+    made = []
+
+    def make(owner, **kwargs):
+        kwargs.setdefault("lease_seconds", 30)
+        coordinator = ScanCoordinator(name="test_scan", shards=4, owner=owner, stop_wait=0.2, **kwargs)
+        made.append(coordinator)
+        return coordinator
+    yield make
+    for coordinator in made:
+        coordinator.shutdown()
+
+
+def _owners(mongo):
+    return {doc["shard"]: doc["owner"] for doc in mongo[scan_coordinator.LEASE_COLLECTION].find({"kind": "lease"})}
+
+
+def test_members_rebalance_to_a_fair_share(mongo, coordinators):
+    a, b = coordinators("a"), coordinators("b")
+    a.heartbeat()
+    assert sorted(a._held) == [0, 1, 2, 3]
+
+    b.heartbeat()                 # joins; everything is still leased to a
+    assert b._held == {}
+    a.heartbeat()                 # sees two members and hands two shards back
+    assert len(a._held) == 2
+    b.heartbeat()
+    assert len(b._held) == 2
+    assert set(a._held).isdisjoint(b._held)
+    owners = _owners(mongo)
+    assert sorted(owners) == [0, 1, 2, 3]
+    assert all(owners[shard] == "a" for shard in a._held) and all(owners[shard] == "b" for shard in b._held)
+
+
+def test_expired_leases_are_taken_over_and_the_old_owner_stops(mongo, coordinators):
+    a = coordinators("a", lease_seconds=0.3)
+    a.heartbeat()
+    threads = [thread for thread, _ in a._held.values()]
+    time.sleep(0.4)               # a stalls past its lease
+
+    b = coordinators("b", lease_seconds=0.3)
+    b.heartbeat()
+    assert sorted(b._held) == [0, 1, 2, 3]
+
+    a.heartbeat()                 # renewals fail: a stops scanning and takes nothing back
+    assert a._held == {}
+    assert all(owner == "b" for owner in _owners(mongo).values())
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def test_a_busy_shard_does_not_delay_the_heartbeat(mongo, coordinators, monkeypatch):
+    release = threading.Event()
+
+    def busy(self, stop_event=None):
+        # Mid-batch: ignores the stop request until the batch is done
+        release.wait(10)
+    monkeypatch.setattr(IncrementalScanner, "run_forever", busy)
+
+    a = coordinators("a")
+    a.heartbeat()
+    coordinators("b").heartbeat()
+
+    started = time.monotonic()
+    a.heartbeat()                 # hands two busy shards back
+    assert time.monotonic() - started < 2
+    assert len(a._held) == 2 and len(a._stopping) == 2
+    # Still leased to a, so nobody else starts a second scanner on them
+    owners = _owners(mongo)
+    assert all(owners[shard] == "a" for shard in a._stopping)
+
+    release.set()
+    time.sleep(0.1)
+    a.heartbeat()                 # threads have exited: the leases go back
+    assert a._stopping == {}
+    assert all(_owners(mongo)[shard] is None for shard in range(4) if shard not in a._held)
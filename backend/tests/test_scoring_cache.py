@@ -0,0 +1,88 @@
+"""Cache keys follow the ruleset, model and blocklist versions, and name the model that actually scored."""
+import asyncio
+
+import pytest
+
+from fraud_ai_system.backend.src import scoring_cache
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.model_registry import get_registry
+from fraud_ai_system.backend.src.scoring_cache import ScoringCache
+from fraud_ai_system.backend.src.scoring_executor import ScoringExecutor
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """The live registry, rules-only at version v1; set `_current` to swap models."""
+    registry = get_registry()
+    monkeypatch.setattr(registry, "_checked", True)
+    monkeypatch.setattr(registry, "_current", ("v1", None))
+    return registry
+
+
+@pytest.fixture
+def executor():
+    executor = ScoringExecutor("thread", workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def _score(cache, batch, executor):
+    return asyncio.run(cache.score(batch, executor))
+
+
+def test_version_changes_invalidate_cached_verdicts(mongo, transactions, registry, executor, monkeypatch):
+    cache = ScoringCache(persist=True)
+    batch = [dict(txn) for txn in transactions[:20]]
+    verdicts, fresh = _score(cache, batch, executor)
+    assert all(fresh)
+    assert _score(cache, batch, executor) == (verdicts, [False] * len(batch))
+
+    monkeypatch.setattr(scoring_cache, "ruleset_version", lambda: "rules-v2")
+    assert all(_score(cache, batch, executor)[1])
+
+    registry._current = ("v2", None)
+    assert all(_score(cache, batch, executor)[1])
+
+    get_blocklist().add("mobile", "0000000000")
+    assert all(_score(cache, batch, executor)[1])
+    assert not any(_score(cache, batch, executor)[1])
+
+    # A fresh process finds the same entries in the collection
+    assert not any(_score(ScoringCache(persist=True), batch, executor)[1])
+
+
+def test_swap_while_scoring_keeps_the_resolved_model(mongo, transactions, registry, executor):
+    cache = ScoringCache(persist=False)
+    batch = [dict(txn) for txn in transactions[:20]]
+
+    class SwapMidBatch:
+        async def score(self, batch, histories, model):
+            registry._current = ("v2", None)   # the watcher swaps models after the keys were hashed
+            return await executor.score(batch, histories, model)
+
+    _score(cache, batch, SwapMidBatch())
+    # Everything scored by v1 is served to v1 keys and nothing is cached under v2
+    registry._current = ("v1", None)
+    assert not any(_score(cache, batch, executor)[1])
+    registry._current = ("v2", None)
+    assert all(_score(cache, batch, executor)[1])
+
+
+@pytest.mark.parametrize("loaded", [True, False])
+def test_verdicts_are_keyed_by_the_worker_model_version(mongo, transactions, registry, executor, loaded):
+    cache = ScoringCache(persist=False)
+    batch = [dict(txn) for txn in transactions[:20]]
+
+    class CaughtUpWorker:
+        """A process worker that reloaded a newer model file than the one the keys were made for."""
+        async def score(self, batch, histories, model):
+            if loaded:
+                registry._current = ("v2", None)
+            _, verdicts = await executor.score(batch, histories, ("v2", None))
+            return "v2", verdicts
+
+    _score(cache, batch, CaughtUpWorker())
+    registry._current = ("v1", None)
+    assert all(_score(cache, batch, executor)[1])
+    registry._current = ("v2", None)
+    assert not any(_score(cache, batch, executor)[1]) if loaded else all(_score(cache, batch, executor)[1])
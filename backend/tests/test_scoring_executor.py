@@ -0,0 +1,30 @@
+"""Process workers see blocklist changes, and the blocklist is only written out when its version changes."""
+import pytest
+
+from fraud_ai_system.backend.src.blocklist import get_blocklist
+from fraud_ai_system.backend.src.scoring_executor import ScoringExecutor
+
+
+@pytest.fixture
+def executor(mongo):
+    executor = ScoringExecutor("process", workers=2, queue_size=8)
+    yield executor
+    executor.shutdown()
+
+
+def _statuses(executor, batch):
+    futures = [executor.submit_score(batch, [{}] * len(batch)) for _ in range(4)]
+    return [[verdict["status"] for verdict in future.result()[1]] for future in futures]
+
+
+def test_blocklist_reaches_every_worker_once_per_version(executor, transactions):
+    batch = [dict(txn) for txn in transactions[:10]]
+    first = executor._blocklist_snapshot()
+    assert all(statuses[3] == "genuine" for statuses in _statuses(executor, batch))
+    assert executor._blocklist_snapshot() is first
+
+    get_blocklist().add("mobile", batch[3]["mobileNumber"])
+    assert all(statuses[3] == "fraudulent" for statuses in _statuses(executor, batch))
+    second = executor._blocklist_snapshot()
+    assert second.version != first.version
+    assert executor._blocklist_snapshot() is second
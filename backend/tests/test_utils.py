@@ -0,0 +1,43 @@
+"""log_sampled counts every call under concurrency and keeps a bounded number of keys."""
+import logging
+import threading
+
+import pytest
+
+from fraud_ai_system.backend.src import utils
+from fraud_ai_system.backend.src.utils import log_sampled
+
+
+@pytest.fixture
+def counts(monkeypatch):
+    counts = {}
+    monkeypatch.setattr(utils, "_sample_counts", counts)
+    return counts
+
+
+def test_concurrent_calls_are_all_counted(counts, caplog):
+    logger = logging.getLogger("test_sampled")
+    caplog.set_level(logging.INFO, logger="test_sampled")
+
+    def burst():
+        for _ in range(1000):
+            log_sampled(logger, logging.INFO, "skipped %s", "x", every=100)
+    threads = [threading.Thread(target=burst) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counts == {"skipped %s": 8000}
+    assert len(caplog.records) == 80
+
+
+def test_key_count_is_bounded(counts, monkeypatch):
+    monkeypatch.setattr(utils, "LOG_SAMPLE_MAX_KEYS", 10)
+    logger = logging.getLogger("test_sampled")
+    for i in range(95):
+        log_sampled(logger, logging.WARNING, f"missing id on row {i}")
+    assert 0 < len(counts) <= 10
+    # Reused templates keep counting between resets
+    for _ in range(5):
+        log_sampled(logger, logging.WARNING, "template")
+    assert counts["template"] == 5
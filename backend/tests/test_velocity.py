@@ -0,0 +1,78 @@
+"""Velocity windows roll over at bucket edges, and match a brute-force count in any arrival order."""
+import random
+from datetime import datetime, timedelta
+
+from fraud_ai_system.backend.src.velocity import VELOCITY_WINDOWS, VelocityStore
+
+# Local naive time on an hour boundary, so every window's buckets start at BASE
+BASE = datetime.fromtimestamp(3600 * 480000)
+
+
+def _txn(seconds, amount=100.0, mobile="9000000001"):
+    ts = BASE + timedelta(seconds=seconds)
+    return {"mobileNumber": mobile, "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+            "partnerDetails": {"amount": amount}}
+
+
+def _counts(store, seconds_list, field="mobile_count_1m"):
+    return [values[field] for values in store.observe_batch([_txn(s) for s in seconds_list])]
+
+
+def test_one_minute_window_rolls_over_at_bucket_edges():
+    # 6 buckets of 10s: the 1m window is the current bucket and the five before it
+    store = VelocityStore(buckets=6)
+    assert _counts(store, [0, 9, 10, 59]) == [0, 1, 2, 3]
+    # 60s opens bucket 6; bucket 0 (the first two) has left the window
+    assert _counts(store, [60]) == [2]
+    assert _counts(store, [69, 70]) == [3, 3]
+    # A gap longer than the window clears the ring
+    assert _counts(store, [200]) == [0]
+    values = store.observe_batch([_txn(201, amount=50.0)])[0]
+    assert (values["mobile_count_1m"], values["mobile_amount_1m"]) == (1, 100.0)
+    assert (values["mobile_count_10m"], values["mobile_amount_10m"]) == (8, 800.0)
+
+
+def test_late_transaction_counts_only_its_own_window():
+    store = VelocityStore(buckets=6)
+    _counts(store, [0, 30, 65])
+    # Arrives after 65s but happened at 35s: sees the window ending at its own bucket,
+    # less bucket 0, which the ring let go when 65s arrived
+    assert _counts(store, [35]) == [1]
+    # Older than anything the ring still holds for the 1m window: dropped from it
+    assert _counts(store, [5, 66]) == [0, 3]
+
+
+def _reference(history, bucket_sets, n):
+    """Brute force: prior transactions the ring can still hold that fall in each window."""
+    values = []
+    for w in range(len(VELOCITY_WINDOWS)):
+        buckets = [b[w] for b, _ in history]
+        if not buckets:
+            values += [0, 0.0]
+            continue
+        head, bucket = max(buckets), bucket_sets[w]
+        lo = max(head - n + 1, bucket - n + 1)
+        held = [amount for b, amount in history if lo <= b[w] <= bucket]
+        values += [len(held), float(sum(held))]
+    return values
+
+
+def test_matches_brute_force_in_any_order():
+    rng = random.Random(5)
+    n = 6
+    store = VelocityStore(buckets=n)
+    widths = [seconds / n for _, seconds in VELOCITY_WINDOWS]
+    history, t = [], 0
+    for _ in range(600):
+        # Mostly forward, with stragglers and the odd long gap
+        t += rng.choice([0, 1, 3, 10, 45, 700])
+        seconds = max(0, t - rng.choice([0, 0, 0, 5, 90]))
+        amount = float(rng.randint(1, 9) * 10)
+        txn = _txn(seconds, amount)
+        stamp = (BASE + timedelta(seconds=seconds)).timestamp()
+        buckets = [int(stamp // width) for width in widths]
+        values = store.observe_batch([txn])[0]
+        expected = _reference(history, buckets, n)
+        got = [values[f"mobile_{metric}_{label}"] for label, _ in VELOCITY_WINDOWS for metric in ("count", "amount")]
+        assert got == expected
+        history.append((buckets, amount))